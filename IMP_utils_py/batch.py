@@ -0,0 +1,160 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+import gin
+
+from IMP_utils_py.config.configurables import package_configurables
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics import (errorbar_l, errorbar_plot,
+                                  errorbar_residual_plot, hist_gauss,
+                                  residual_plot)
+# the package attribute 'grouped_fit' is the submodule once it is imported
+from IMP_utils_py.physics.grouped_fit import grouped_fit
+
+### logging setup
+logger = setup_logger()
+
+# mode -> command function
+BATCH_MODES = {
+    "errorbar-plot": errorbar_plot,
+    "residual-plot": residual_plot,
+    "errorbar-residual-plot": errorbar_residual_plot,
+    "hist-gauss": hist_gauss,
+    "errorbar-l": errorbar_l,
+    "grouped-fit": grouped_fit,
+}
+
+
+### manifest functions
+def read_manifest(manifest: Union[str, list]) -> list[list[str]]:
+    """
+    get the gin files of every job from the manifest
+
+    @params:
+        manifest: directory (every .gin file is one job), .gin file (one job), or text file with one job per line
+        (multiple gin files of one job are separated by spaces, lines starting with '#' are ignored). A list can combine all of them.
+
+    @return: list with list of gin files per job
+    """
+    if isinstance(manifest, str):
+        manifest = [manifest]
+
+    jobs = []
+    for entry in manifest:
+        if os.path.isdir(entry):
+            jobs += [[os.path.join(entry, file)] for file in sorted(os.listdir(entry)) if file.endswith(".gin")]
+        elif entry.endswith(".gin"):
+            jobs.append([entry])
+        elif os.path.isfile(entry):
+            with open(entry) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        jobs.append(line.split())
+        else:
+            raise ValueError(f"manifest entry '{entry}' is not a directory, .gin file, or manifest text file")
+
+    if not jobs:
+        logger.warning("no gin files found in manifest")
+    return jobs
+
+
+@gin.configurable
+def batch_job(modes: Optional[list] = None) -> list[str]:
+    """
+    modes of one job, bound in the gin files of the job (e.g. batch_job.modes = ["errorbar-plot", "residual-plot"])
+
+    The modes have to be named explicitly, because a base gin file like plotting.gin binds the parameters of every mode.
+    """
+    modes = list(modes or [])
+    unknown_modes = [mode for mode in modes if mode not in BATCH_MODES]
+    if unknown_modes:
+        raise ValueError(f"modes {unknown_modes} of batch_job.modes are not supported -> choose from {list(BATCH_MODES)}")
+    return modes
+
+
+### job functions
+def run_job(gin_files: list, gin_params: Optional[list], modes: list) -> list[tuple]:
+    """
+    run every mode of one job with its own gin bindings (top-level function to be usable in a process pool)
+
+    @return: list with (gin files, mode, duration in s, error message or None) per executed mode
+    """
+    results = []
+    gin.clear_config()
+    try:
+        # gin files can also bind non-batch functions (e.g. time_stop or GradeCalculator)
+        gin.parse_config_files_and_bindings(gin_files, gin_params, skip_unknown=package_configurables())
+        job_modes = [mode for mode in batch_job() if mode in modes]
+    except Exception as e:
+        return [(gin_files, "parse", 0.0, f"{type(e).__name__}: {e}")]
+
+    if not job_modes:
+        logger.warning(f"no batch mode in batch_job.modes of {gin_files} -> job skipped")
+
+    for mode in job_modes:
+        start = time.perf_counter()
+        error = None
+        try:
+            BATCH_MODES[mode]()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.debug(traceback.format_exc())
+        results.append((gin_files, mode, time.perf_counter() - start, error))
+    return results
+
+
+@gin.configurable
+def run_batch(
+    manifest: Union[str, list],
+    base_gin_files: Optional[list] = None,
+    gin_params: Optional[list] = None,
+    modes: Optional[list] = None,
+    max_workers: int = 1,
+) -> list[tuple]:
+    """
+    run all plot jobs from the manifest in one process (or a process pool) and report timing and failures at the end
+
+    @params:
+        manifest: see read_manifest
+        base_gin_files: gin files parsed before the gin files of every job (e.g. shared macros)
+        gin_params: gin bindings applied after the gin files of every job
+        modes: modes to run if they are in batch_job.modes of a job (default all of BATCH_MODES)
+        max_workers: 1 runs all jobs sequentially in this process, otherwise number of processes
+
+    @return: list with (gin files, mode, duration in s, error message or None)
+    """
+    if modes is None:
+        modes = list(BATCH_MODES)
+    unknown_modes = [mode for mode in modes if mode not in BATCH_MODES]
+    if unknown_modes:
+        raise ValueError(f"modes {unknown_modes} are not supported in batch mode -> choose from {list(BATCH_MODES)}")
+
+    jobs = [(base_gin_files or []) + job for job in read_manifest(manifest)]
+    logger.info(f"start batch with {len(jobs)} jobs")
+
+    start = time.perf_counter()
+    results = []
+    if max_workers == 1:
+        for job in jobs:
+            results += run_job(job, gin_params, modes)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run_job, job, gin_params, modes) for job in jobs]
+            for future in futures:
+                results += future.result()
+    total_time = time.perf_counter() - start
+
+    # report
+    failures = [result for result in results if result[3] is not None]
+    for gin_files, mode, duration, error in results:
+        status = "FAILED" if error is not None else "ok"
+        logger.info(f"{status:6} {duration:8.3f}s  {mode:14} {' '.join(gin_files)}")
+    for gin_files, mode, _, error in failures:
+        logger.error(f"{mode} ({' '.join(gin_files)}): {error}")
+    logger.info(f"batch finished: {len(results) - len(failures)} of {len(results)} jobs successful in {total_time:.3f}s")
+
+    return results
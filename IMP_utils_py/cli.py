@@ -1,10 +1,9 @@
+import importlib
+
 import gin
 from absl import app, flags
 
-from IMP_utils_py.physics import (errorbar_l, errorbar_phi, errorbar_plot,
-                                  eval_raw_data, hist_gauss, residual_plot,
-                                  time_stop)
-from IMP_utils_py.playground import GradeCalculator
+from IMP_utils_py.config.configurables import package_configurables
 
 flags.DEFINE_enum(
     "mode",
@@ -12,14 +11,23 @@ flags.DEFINE_enum(
     [
         "test",
         "time-stop",
+        "time-stop-benchmark",
         "eval-raw-data",
         "hist-gauss",
         "errorbar-phi",
         "errorbar-l",
         "errorbar-plot",
         "residual-plot",
+        "errorbar-residual-plot",
+        "grouped-fit",
+        "resample-fit",
+        "propagate-errors",
+        "convert-measurement",
         "grade-calculator-IMP",
         "grade-calculator-general",
+        "grade-calculator-cohort",
+        "batch",
+        "startup-benchmark",
     ],
     "just ask Samuel",
 )
@@ -27,33 +35,106 @@ flags.DEFINE_multi_string("gin_file", None, "List of paths to the config files."
 flags.DEFINE_multi_string(
     "gin_param", None, "Newline separated list of Gin parameter bindings."
 )
+flags.DEFINE_multi_string(
+    "batch_manifest",
+    None,
+    "Directories, gin files, or manifest text files with the jobs for batch mode.",
+)
+flags.DEFINE_integer(
+    "max_workers", 1, "Number of processes for batch mode (1 runs all jobs in this process)."
+)
+flags.DEFINE_enum(
+    "fit_cache",
+    "use",
+    ["use", "bypass", "clear"],
+    "Fit result cache for kafe2 fits: 'use' it, 'bypass' it (fit everything again), or 'clear' it before running.",
+)
 FLAGS = flags.FLAGS
 
+# module with the gin configurables of every mode
+# (imported only for the selected mode, because matplotlib, kafe2, pdfplumber, and tabula are slow to import)
+MODE_MODULES = {
+    "test": None,
+    "time-stop": "IMP_utils_py.physics.time_stop_script",
+    "time-stop-benchmark": "IMP_utils_py.physics.timing",
+    "eval-raw-data": "IMP_utils_py.physics.time_stop_script",
+    "hist-gauss": "IMP_utils_py.physics.time_stop_script",
+    "errorbar-phi": "IMP_utils_py.physics.time_stop_script",
+    "errorbar-l": "IMP_utils_py.physics.time_stop_script",
+    "errorbar-plot": "IMP_utils_py.physics.plotting",
+    "residual-plot": "IMP_utils_py.physics.plotting",
+    "errorbar-residual-plot": "IMP_utils_py.physics.plotting",
+    "grouped-fit": "IMP_utils_py.physics.grouped_fit",
+    "resample-fit": "IMP_utils_py.physics.resampling",
+    "propagate-errors": "IMP_utils_py.physics.error_propagation",
+    "convert-measurement": "IMP_utils_py.physics.measurement",
+    "grade-calculator-IMP": "IMP_utils_py.playground.grade_calculator",
+    "grade-calculator-general": "IMP_utils_py.playground.grade_calculator",
+    "grade-calculator-cohort": "IMP_utils_py.playground.grade_calculator",
+    "batch": "IMP_utils_py.batch",
+    "startup-benchmark": "IMP_utils_py.startup",
+}
+
 
 def main(*unused_argv):
-    gin.parse_config_files_and_bindings(FLAGS.gin_file, FLAGS.gin_param)
+    module = None
+    if MODE_MODULES[FLAGS.mode] is not None:
+        module = importlib.import_module(MODE_MODULES[FLAGS.mode])
+    gin_params = list(FLAGS.gin_param or [])
+    if FLAGS.fit_cache == "bypass":
+        gin_params.append("fit_model.use_cache = False")
+    elif FLAGS.fit_cache == "clear":
+        # imported before parsing to register cache_settings, cleared after parsing to use its bindings
+        from IMP_utils_py.physics.fit_cache import clear_fit_cache
+    # bindings of configurables from not imported modules are skipped (e.g. time_stop in a plotting.gin run)
+    gin.parse_config_files_and_bindings(FLAGS.gin_file, gin_params, skip_unknown=package_configurables())
+    if FLAGS.fit_cache == "clear":
+        clear_fit_cache()
     if FLAGS.mode == "test":
         pass
     elif FLAGS.mode == "time-stop":
-        time_stop()
+        module.time_stop()
+    elif FLAGS.mode == "time-stop-benchmark":
+        module.timing_benchmark()
     elif FLAGS.mode == "eval-raw-data":
-        eval_raw_data()
+        module.eval_raw_data()
     elif FLAGS.mode == "hist-gauss":
-        hist_gauss()
+        module.hist_gauss()
     elif FLAGS.mode == "errorbar-phi":
-        errorbar_phi()
+        module.errorbar_phi()
     elif FLAGS.mode == "errorbar-l":
-        errorbar_l()
+        module.errorbar_l()
     elif FLAGS.mode == "errorbar-plot":
-        errorbar_plot()
+        module.errorbar_plot()
     elif FLAGS.mode == "residual-plot":
-        residual_plot()
+        module.residual_plot()
+    elif FLAGS.mode == "errorbar-residual-plot":
+        module.errorbar_residual_plot()
+    elif FLAGS.mode == "grouped-fit":
+        module.grouped_fit()
+    elif FLAGS.mode == "resample-fit":
+        module.resample_fit()
+    elif FLAGS.mode == "propagate-errors":
+        module.propagate_errors()
+    elif FLAGS.mode == "convert-measurement":
+        module.convert_measurement()
     elif FLAGS.mode == "grade-calculator-IMP":
-        gc = GradeCalculator()
+        gc = module.GradeCalculator()
         gc.calculate_total_grade(IMP=True)
     elif FLAGS.mode == "grade-calculator-general":
-        gc = GradeCalculator()
+        gc = module.GradeCalculator()
         gc.calculate_total_grade(IMP=False)
+    elif FLAGS.mode == "grade-calculator-cohort":
+        module.grade_cohort()
+    elif FLAGS.mode == "batch":
+        module.run_batch(
+            manifest=FLAGS.batch_manifest,
+            base_gin_files=FLAGS.gin_file,
+            gin_params=gin_params,
+            max_workers=FLAGS.max_workers,
+        )
+    elif FLAGS.mode == "startup-benchmark":
+        module.startup_benchmark()
 
 
 def console_entry_point():
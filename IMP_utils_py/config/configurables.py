@@ -0,0 +1,53 @@
+import ast
+import importlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from pathlib import Path
+
+import gin
+
+PACKAGE_DIR = Path(__file__).resolve().parent.parent
+
+
+def _is_configurable_decorator(decorator: ast.expr) -> bool:
+    """True for @gin.configurable and @gin.configurable(...)"""
+    if isinstance(decorator, ast.Call):
+        decorator = decorator.func
+    return isinstance(decorator, ast.Attribute) and decorator.attr == "configurable" and isinstance(decorator.value, ast.Name) and decorator.value.id == "gin"
+
+
+@cache
+def package_configurables() -> tuple[str, ...]:
+    """
+    names of all gin configurables of the package, found in the source code without importing the modules
+
+    Used as skip_unknown for parsing gin files: bindings of configurables from not imported modules are skipped
+    (e.g. time_stop in a plotting.gin run), but misspelled bindings still raise an error.
+    """
+    names = set()
+    for path in sorted(PACKAGE_DIR.rglob("*.py")):
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and any(map(_is_configurable_decorator, node.decorator_list)):
+                names.add(node.name)
+    return tuple(sorted(names))
+
+
+### process pools
+def _parse_parent_config(config: str, modules: list):
+    """pool initializer: import the modules with the configurables and parse the gin config of the parent process"""
+    for module in modules:
+        importlib.import_module(module)
+    gin.clear_config()
+    gin.parse_config(config, skip_unknown=package_configurables())
+
+
+def gin_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    process pool whose workers have the gin config of this process
+
+    With the spawn start method (default on Windows and MacOS), the workers start with an empty gin config, so e.g.
+    model_plugins and the fit_model settings would be lost. The workers parse gin.config_str() of this process first.
+    """
+    modules = sorted(name for name in sys.modules if name.startswith("IMP_utils_py."))
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_parse_parent_config, initargs=(gin.config_str(), modules))
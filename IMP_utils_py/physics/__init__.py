@@ -1,3 +1,27 @@
-from .plotting import errorbar_plot, residual_plot
-from .time_stop_script import (errorbar_l, errorbar_phi, eval_raw_data,
-                               hist_gauss, time_stop)
+import importlib
+
+# the commands are imported lazily, because matplotlib, scipy and kafe2 are slow to import
+_COMMANDS = {
+    "errorbar_plot": "plotting",
+    "errorbar_residual_plot": "plotting",
+    "grouped_fit": "grouped_fit",
+    "residual_plot": "plotting",
+    "resample_fit": "resampling",
+    "propagate_errors": "error_propagation",
+    "convert_measurement": "measurement",
+    "errorbar_l": "time_stop_script",
+    "errorbar_phi": "time_stop_script",
+    "eval_raw_data": "time_stop_script",
+    "hist_gauss": "time_stop_script",
+    "time_stop": "time_stop_script",
+    "timing_benchmark": "timing",
+}
+
+__all__ = list(_COMMANDS)
+
+
+def __getattr__(name: str):
+    if name in _COMMANDS:
+        module = importlib.import_module(f"{__name__}.{_COMMANDS[name]}")
+        return getattr(module, name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
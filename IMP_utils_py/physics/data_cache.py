@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+CACHE_SUFFIX = ".cache.npz"
+CACHE_VERSION = 1
+
+# in-process LRU: (absolute path, mtime_ns, size) -> DataFrame
+_memory_cache: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+
+### helper functions
+def file_hash(path: str) -> str:
+    """sha1 hash of the file content"""
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def cache_path(data_path: str) -> str:
+    """location of the on-disk cache (next to the source file)"""
+    return data_path + CACHE_SUFFIX
+
+
+def _is_string_column(series: pd.Series) -> bool:
+    """True if all non-null values are strings"""
+    return bool(series.dropna().map(type).eq(str).all())
+
+
+### on-disk cache
+def save_cache(df: pd.DataFrame, path: str, stat: os.stat_result, sha1: str) -> bool:
+    """
+    save DataFrame column-wise as uncompressed .npz (numeric columns are stored with their dtype, string columns as
+    unicode arrays with null mask)
+
+    @return: False if the DataFrame has columns that cannot be stored without pickle (cache will not be written)
+    """
+    arrays = {}
+    string_columns = []
+    for idx, (name, series) in enumerate([("index", df.index.to_series())] + list(df.items())):
+        key = "index" if idx == 0 else f"c{idx - 1}"
+        if series.dtype.kind in "biufcmM":
+            arrays[key] = series.to_numpy()
+        elif _is_string_column(series):
+            mask = series.isna().to_numpy()
+            arrays[key] = np.where(mask, "", series.astype(object).to_numpy()).astype(str)
+            arrays[f"{key}_mask"] = mask
+            string_columns.append(key)
+        else:
+            logger.debug(f"column '{name}' with dtype {series.dtype} cannot be cached")
+            return False
+
+    meta = {
+        "version": CACHE_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1,
+        "columns": list(df.columns),
+        "index_name": df.index.name,
+        "dtypes": {"index": str(df.index.dtype), **{f"c{idx}": str(dtype) for idx, dtype in enumerate(df.dtypes)}},
+        "string_columns": string_columns,
+    }
+    try:
+        arrays["meta"] = np.array(json.dumps(meta))
+    except TypeError:
+        # column names that are not JSON serializable
+        return False
+
+    # write to temporary file first, so an interrupted write does not leave a truncated cache
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp", delete=False) as f:
+        try:
+            np.savez(f, **arrays)
+        except BaseException:
+            f.close()
+            Path(f.name).unlink()
+            raise
+    os.replace(f.name, path)
+    return True
+
+
+def load_cache(path: str, stat: os.stat_result, data_path: str) -> Optional[pd.DataFrame]:
+    """load DataFrame from .npz cache (None if the cache is missing or outdated)"""
+    if not Path(path).exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz["meta"]))
+            if meta["version"] != CACHE_VERSION:
+                return None
+            # same mtime and size -> no need to hash the file
+            touched = (meta["mtime_ns"], meta["size"]) != (stat.st_mtime_ns, stat.st_size)
+            if touched and (meta["size"] != stat.st_size or meta["sha1"] != file_hash(data_path)):
+                return None
+            arrays = {key: npz[key] for key in npz.files}
+        df = _restore_frame(arrays, meta)
+    except Exception as e:
+        # every broken cache file (e.g. truncated zip) is a cache miss
+        logger.warning(f"could not read cache '{path}' ({e}) -> cache will be rebuilt")
+        return None
+
+    if touched:
+        # same content with a new mtime (e.g. touch or copy) -> store the new mtime, so the next read does not hash again
+        try:
+            save_cache(df, path, stat, meta["sha1"])
+            logger.debug(f"mtime of cache '{path}' updated")
+        except OSError as e:
+            logger.warning(f"could not update cache '{path}' ({e})")
+    return df
+
+
+def _restore_frame(arrays: dict, meta: dict) -> pd.DataFrame:
+    """DataFrame from the arrays and meta data of the .npz cache"""
+
+    def restore(key: str) -> pd.Series:
+        values = arrays[key]
+        if key in meta["string_columns"]:
+            values = values.astype(object)
+            values[arrays[f"{key}_mask"]] = np.nan
+            series = pd.Series(values)
+            if meta["dtypes"][key] != "object":
+                series = series.astype(meta["dtypes"][key])
+            return series
+        return pd.Series(values)
+
+    index = pd.Index(restore("index"), name=meta["index_name"])
+    # .array keeps extension dtypes (e.g. pandas string dtype)
+    data = {idx: restore(f"c{idx}").array for idx in range(len(meta["columns"]))}
+    df = pd.DataFrame(data, index=index)
+    df.columns = meta["columns"]
+    return df
+
+
+### main function
+@gin.configurable
+def cached_read(
+    data_path: str,
+    reader: Callable[[str], pd.DataFrame],
+    use_disk_cache: bool = True,
+    memory_cache_size: int = 16,
+) -> pd.DataFrame:
+    """
+    read DataFrame with reader(data_path) and cache the result
+
+    @params:
+        use_disk_cache: if True, the parsed data is stored as '<data_path>.cache.npz' and reused as long as the
+        source file content does not change (checked with mtime/size and sha1 hash)
+        memory_cache_size: number of DataFrames kept in memory for repeated reads in one run (0 to deactivate)
+
+    @return: copy of the cached DataFrame (changes do not affect the cache)
+    """
+    stat = Path(data_path).stat()
+    key = (os.path.abspath(data_path), stat.st_mtime_ns, stat.st_size)
+    if key in _memory_cache:
+        _memory_cache.move_to_end(key)
+        logger.debug(f"'{data_path}' loaded from memory cache")
+        return _memory_cache[key].copy()
+
+    df = None
+    path = cache_path(data_path)
+    if use_disk_cache:
+        df = load_cache(path, stat, data_path)
+        if df is not None:
+            logger.debug(f"'{data_path}' loaded from cache '{path}'")
+
+    if df is None:
+        df = reader(data_path)
+        if use_disk_cache:
+            try:
+                if save_cache(df, path, stat, file_hash(data_path)):
+                    logger.debug(f"cache '{path}' saved")
+            except OSError as e:
+                logger.warning(f"could not write cache '{path}' ({e})")
+
+    if memory_cache_size > 0:
+        _memory_cache[key] = df
+        while len(_memory_cache) > memory_cache_size:
+            _memory_cache.popitem(last=False)
+        return df.copy()
+    return df
+
+
+def clear_cache(data_path: Optional[str] = None):
+    """clear in-process cache and remove the on-disk cache of data_path"""
+    _memory_cache.clear()
+    if data_path is not None:
+        Path(cache_path(data_path)).unlink(missing_ok=True)
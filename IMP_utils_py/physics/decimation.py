@@ -0,0 +1,173 @@
+from typing import Callable, Optional
+
+import numpy as np
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+DECIMATION_METHODS = ("none", "lttb", "min_max", "bin")
+
+
+### point selection
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    indices of the points selected with Largest-Triangle-Three-Buckets (x has to be sorted)
+
+    The first and last point are always kept. From every bucket in between, the point that spans the largest triangle
+    with the selected point of the previous bucket and the average of the next bucket is selected, so the visual shape
+    (peaks included) is kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    # average of every bucket (and of the last point for the last bucket)
+    sums_x = np.add.reduceat(x[:-1], edges[:-1])
+    sums_y = np.add.reduceat(y[:-1], edges[:-1])
+    sizes = np.diff(edges)
+    avg_x = np.append(sums_x / sizes, x[-1])
+    avg_y = np.append(sums_y / sizes, y[-1])
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # twice the triangle area (constant factor does not change the argmax)
+        area = np.abs(
+            (x[previous] - avg_x[bucket + 1]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def min_max(y: np.ndarray, n_out: int) -> np.ndarray:
+    """indices of the min and max point of every bucket of consecutive points (n_out / 2 buckets)"""
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n_out >= n:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    selected = np.concatenate([offsets + np.nanargmin(padded, axis=1), offsets + np.nanargmax(padded, axis=1)])
+    return np.unique(selected)
+
+
+def bin_points(x: np.ndarray, y: np.ndarray, dx: Optional[np.ndarray], dy: Optional[np.ndarray], n_bins: int) -> tuple:
+    """
+    aggregate points in n_bins equal-width x bins
+
+    @return: tuple (x mean, y mean, x error, y error) of the non-empty bins. The error bars are the errors of the
+    bin means:
+        x: mean of the x values with the measured dx combined in quadrature (sqrt(sum dx^2) / n, None without dx)
+        y: mean weighted with 1/dy^2 with the error of the weighted mean if all dy > 0, otherwise the mean with the
+        standard error of the mean
+    """
+    edges = np.linspace(x.min(), x.max(), n_bins + 1)
+    idx = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, n_bins - 1)
+    counts = np.bincount(idx, minlength=n_bins)
+    filled = counts > 0
+    counts = counts[filled]
+
+    x_mean = np.bincount(idx, weights=x, minlength=n_bins)[filled] / counts
+    x_error = None if dx is None else np.sqrt(np.bincount(idx, weights=dx**2, minlength=n_bins)[filled]) / counts
+    if dy is not None and np.all(dy > 0):
+        w = 1 / dy**2
+        w_sum = np.bincount(idx, weights=w, minlength=n_bins)[filled]
+        y_mean = np.bincount(idx, weights=w * y, minlength=n_bins)[filled] / w_sum
+        y_error = 1 / np.sqrt(w_sum)
+    else:
+        y_mean = np.bincount(idx, weights=y, minlength=n_bins)[filled] / counts
+        y_var = np.bincount(idx, weights=y**2, minlength=n_bins)[filled] / counts - y_mean**2
+        # sample std of the bin / sqrt(n) (0 for single points)
+        y_error = np.sqrt(np.maximum(y_var, 0) / np.maximum(counts - 1, 1))
+    return x_mean, y_mean, x_error, y_error
+
+
+def reduce_points(x, y, dx, dy, method: str, max_points: int) -> tuple:
+    """
+    reduce the points of one y-value set to at most max_points for drawing
+
+    @params:
+        method: 'none' / 'lttb' (Largest-Triangle-Three-Buckets) / 'min_max' (min and max of every bucket) / 'bin'
+        (max_points x bins with aggregated error bars)
+
+    @return: tuple (x, y, dx, dy) sorted by x (dx/dy are None if they were None)
+    """
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Decimation method '{method}' is not supported -> choose from {list(DECIMATION_METHODS)}")
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if method == "none" or len(x) <= max_points:
+        return x, y, dx, dy
+
+    dx = None if dx is None else np.asarray(dx, dtype=float)
+    dy = None if dy is None else np.asarray(dy, dtype=float)
+    # NaN values are not drawn anyway
+    valid = ~(np.isnan(x) | np.isnan(y))
+    order = np.argsort(x[valid], kind="stable")
+    x, y = x[valid][order], y[valid][order]
+    dx = None if dx is None else dx[valid][order]
+    dy = None if dy is None else dy[valid][order]
+
+    if method == "bin":
+        binned = bin_points(x, y, dx, dy, max_points)
+        logger.debug(f"binned {len(x)} points in {len(binned[0])} bins")
+        return binned
+
+    selected = lttb(x, y, max_points) if method == "lttb" else min_max(y, max_points)
+    logger.debug(f"decimated {len(x)} points to {len(selected)} points ({method})")
+    return (
+        x[selected],
+        y[selected],
+        None if dx is None else dx[selected],
+        None if dy is None else dy[selected],
+    )
+
+
+### curve sampling
+def adaptive_sample(
+    f: Callable[[np.ndarray], np.ndarray],
+    x_min: float,
+    x_max: float,
+    max_points: int = 1000,
+    n_initial: int = 17,
+    tolerance: float = 1e-3,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    sample the vectorized function f with more points where it is curved
+
+    Every interval is split in half as long as the function value at the midpoint deviates from the straight line
+    between the interval ends by more than tolerance * (y range). Straight lines keep the initial points.
+
+    @return: tuple (x, y) with at most max_points points
+    """
+    x = np.linspace(x_min, x_max, n_initial)
+    y = np.broadcast_to(f(x), x.shape).astype(float)
+    while len(x) < max_points:
+        x_mid = (x[:-1] + x[1:]) / 2
+        y_mid = np.broadcast_to(f(x_mid), x_mid.shape).astype(float)
+        deviation = np.abs(y_mid - (y[:-1] + y[1:]) / 2)
+        scale = np.ptp(y[np.isfinite(y)]) if np.isfinite(y).any() else 0.0
+        refine = np.flatnonzero(deviation > tolerance * (scale or 1))
+        if len(refine) == 0:
+            break
+        # largest deviations first if the point budget is not sufficient
+        budget = max_points - len(x)
+        if len(refine) > budget:
+            refine = np.sort(refine[np.argsort(deviation[refine])[::-1][:budget]])
+        x = np.insert(x, refine + 1, x_mid[refine])
+        y = np.insert(y, refine + 1, y_mid[refine])
+    return x, y
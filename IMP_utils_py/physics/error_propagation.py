@@ -0,0 +1,197 @@
+from functools import cache
+from typing import Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.measurement import is_measurement, measurement_errors
+from IMP_utils_py.physics.plotting import read_data
+
+### logging setup
+logger = setup_logger()
+
+
+### formula functions
+@cache
+def compile_formula(formula: str, names: tuple) -> tuple:
+    """
+    parse the formula with sympy and compile the formula and its partial derivatives to numpy functions (only once
+    per formula)
+
+    @params:
+        names: names that are variables in the formula (all other names are sympy constants/functions like pi, sqrt, sin)
+
+    @return: tuple (variables used in the formula, formula function, tuple of derivative functions in the order of
+    the variables). The functions take the variables as positional arguments.
+    """
+    import sympy
+
+    # every name is a symbol, also names like 'I', 'E', or 'S' that sympy would read as constants
+    symbols = {name: sympy.Symbol(name) for name in names}
+    try:
+        expr = sympy.sympify(formula, locals=symbols)
+    except Exception as e:
+        # e.g. SympifyError, SyntaxError, or AttributeError for numpy syntax like 'np.sqrt'
+        raise ValueError(f"Formula '{formula}' cannot be parsed ({type(e).__name__}: {e})")
+
+    variables = tuple(name for name in names if symbols[name] in expr.free_symbols)
+    unknown = expr.free_symbols - set(symbols.values())
+    if unknown:
+        raise ValueError(f"Formula '{formula}' contains unknown names {sorted(str(s) for s in unknown)} -> use column names or the symbols parameter")
+
+    args = [symbols[name] for name in variables]
+    function = sympy.lambdify(args, expr, "numpy")
+    derivatives = tuple(sympy.lambdify(args, sympy.diff(expr, arg), "numpy") for arg in args)
+    return variables, function, derivatives
+
+
+def expand_formula(formula: str, names: tuple, expanded: dict) -> str:
+    """
+    replace the new columns of previous formulas by their formulas, so the uncertainty of e.g. "g*l" with g derived
+    from l includes the correlation of g and l
+
+    @params:
+        names: names that are variables in the formulas (columns of the data)
+        expanded: dict with the name of a previous formula as key and its formula (already expanded) as value
+
+    @return: formula of the variables in names (unchanged if it uses no previous formula)
+    """
+    import sympy
+
+    symbols = {name: sympy.Symbol(name) for name in (*names, *expanded)}
+    try:
+        expr = sympy.sympify(formula, locals=symbols)
+    except Exception as e:
+        raise ValueError(f"Formula '{formula}' cannot be parsed ({type(e).__name__}: {e})")
+    used = [name for name in expanded if symbols[name] in expr.free_symbols]
+    if not used:
+        return formula
+    return str(expr.subs({symbols[name]: sympy.sympify(expanded[name], locals=symbols) for name in used}))
+
+
+def propagate(
+    formula: str,
+    values: dict,
+    errors: Optional[dict] = None,
+    covariances: Optional[dict] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    gaussian error propagation with symbolic derivatives, vectorized over arrays
+
+    u_f^2 = sum_i (df/dx_i * u_i)^2 + 2 * sum_{i<j} df/dx_i * df/dx_j * cov(x_i, x_j)
+
+    @params:
+        formula: sympy expression, e.g. "4*pi**2*l/T**2"
+        values: dict with variable name as key and values (scalar or array) as value
+        errors: dict with variable name as key and uncertainties as value (variables without errors are exact)
+        covariances: dict with (name, name) tuple as key and covariances as value
+
+    @return: tuple (values, uncertainties) of the formula
+    """
+    variables, function, derivatives = compile_formula(formula, tuple(values))
+    args = [np.asarray(values[name], dtype=float) for name in variables]
+    result = np.asarray(function(*args), dtype=float)
+    gradient = [np.asarray(derivative(*args), dtype=float) for derivative in derivatives]
+
+    errors = errors or {}
+    variance = np.zeros(np.broadcast(result, *args).shape)
+    for name, grad in zip(variables, gradient):
+        if name in errors:
+            variance = variance + (grad * np.asarray(errors[name], dtype=float)) ** 2
+    for (name_1, name_2), cov in (covariances or {}).items():
+        if name_1 in variables and name_2 in variables and name_1 != name_2:
+            grad_1 = gradient[variables.index(name_1)]
+            grad_2 = gradient[variables.index(name_2)]
+            variance = variance + 2 * grad_1 * grad_2 * np.asarray(cov, dtype=float)
+
+    if np.any(variance < 0):
+        logger.warning(f"negative variance for '{formula}' (covariances larger than the errors allow) -> uncertainty is NaN")
+    with np.errstate(invalid="ignore"):
+        return np.broadcast_to(result, variance.shape), np.sqrt(variance)
+
+
+def propagate_dataframe(
+    df: pd.DataFrame,
+    formulas: dict,
+    error_columns: Optional[dict] = None,
+    covariance_columns: Optional[dict] = None,
+    symbols: Optional[dict] = None,
+    error_suffix: str = "_error",
+) -> pd.DataFrame:
+    """
+    add value and uncertainty columns for every formula (all rows in one vectorized call per formula)
+
+    @params:
+        formulas: dict with new column name as key and formula as value, e.g. {"g": "4*pi**2*l/T**2"} (a formula can
+        use the new columns of the formulas before it, see expand_formula)
+        error_columns: dict with value column as key and error column as value, e.g. {"l": "u_l", "T": "u_T"}
+        covariance_columns: dict with "column_1,column_2" as key and covariance column as value
+        symbols: dict with formula name as key and column name as value for column names that are no valid python
+        names, e.g. {"l": "length in m"}
+        error_suffix: the uncertainty column of a formula is named <name><error_suffix>
+
+    @return: copy of df with the new columns
+    """
+    symbols = {**{column: column for column in df.columns if str(column).isidentifier()}, **(symbols or {})}
+    column_symbols = {column: name for name, column in symbols.items()}
+
+    def column_values(column: str) -> np.ndarray:
+        if column not in df.columns:
+            raise ValueError(f"Column '{column}' not found in the data")
+        return df[column].to_numpy(dtype=float)
+
+    values = {name: df[column] for name, column in symbols.items()}
+    errors = {}
+    for value_column, error_column in (error_columns or {}).items():
+        if value_column not in column_symbols:
+            raise ValueError(f"Column '{value_column}' is no valid python name -> add it to the symbols parameter")
+        errors[column_symbols[value_column]] = column_values(error_column)
+    covariances = {}
+    for key, cov_column in (covariance_columns or {}).items():
+        column_1, column_2 = (column.strip() for column in key.split(","))
+        covariances[(column_symbols.get(column_1, column_1), column_symbols.get(column_2, column_2))] = column_values(cov_column)
+
+    df = df.copy()
+    expanded = {}
+    for name, formula in formulas.items():
+        formula = expand_formula(formula, tuple(values), expanded)
+        variables = compile_formula(formula, tuple(values))[0]
+        value, error = propagate(formula, {name: column_values(symbols[name]) for name in variables}, errors, covariances)
+        df[name] = value
+        df[f"{name}{error_suffix}"] = error
+        if str(name).isidentifier():
+            expanded[name] = formula
+        logger.debug(f"added '{name}' and '{name}{error_suffix}' ({formula})")
+    return df
+
+
+### command function
+@gin.configurable
+def propagate_errors(
+    data_path: str,
+    results_path: str,
+    formulas: dict,
+    error_columns: Optional[dict] = None,
+    covariance_columns: Optional[dict] = None,
+    symbols: Optional[dict] = None,
+    error_suffix: str = "_error",
+) -> pd.DataFrame:
+    """
+    @params:
+        data_path: location of the csv/excel/measurement file with the data
+        results_path: location for the csv file with the data and the new columns
+        formulas, error_columns, covariance_columns, symbols, error_suffix: see propagate_dataframe (the error columns
+        of a measurement file are used for the value columns that are not in error_columns)
+
+    @output:
+        csv file with a value and uncertainty column for every formula
+    """
+    data = read_data(data_path)
+    if is_measurement(data_path):
+        error_columns = measurement_errors(data_path) | (error_columns or {})
+    results = propagate_dataframe(data, formulas, error_columns, covariance_columns, symbols, error_suffix)
+    results.to_csv(results_path)
+    logger.info(f"{len(formulas)} derived columns for {len(results)} rows saved")
+    return results
@@ -0,0 +1,140 @@
+import hashlib
+import inspect
+import os
+import tempfile
+from functools import cache
+from pathlib import Path
+from typing import Optional
+
+import gin
+import numpy as np
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+# Increase CACHE_VERSION if a change of the fit code (e.g. kafe2_fit) changes the results of cached fits. Changes of
+# the model are detected with the source code of the model function and the hash of the file that defines it (so
+# helper functions in the same file, e.g. j1_over_u for O8_bessel_function, are included). Helper functions from
+# other modules are not detected -> clear the cache with --fit_cache=clear after changing them.
+CACHE_VERSION = 2
+
+
+### settings
+@gin.configurable
+def cache_settings(cache_dir: Optional[str] = None, max_entries: int = 1000) -> tuple[str, int]:
+    """
+    location and max number of entries of the fit cache (least recently used entries are removed first)
+
+    @params:
+        cache_dir: None for '$XDG_CACHE_HOME/IMP_utils_py/fits' (default '~/.cache/IMP_utils_py/fits')
+    """
+    if cache_dir is None:
+        cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+        cache_dir = os.path.join(cache_home, "IMP_utils_py", "fits")
+    return cache_dir, max_entries
+
+
+### helper functions
+def _update_array(sha1, values):
+    """add array (or None) to hash"""
+    if values is None:
+        sha1.update(b"None")
+        return
+    values = np.ascontiguousarray(values, dtype=float)
+    sha1.update(str(values.shape).encode())
+    sha1.update(values.tobytes())
+
+
+@cache
+def _source_file_hash(path: str, mtime_ns: int, size: int) -> str:
+    """sha1 hash of a source file (mtime and size in the arguments, so a changed file is hashed again)"""
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+
+def _model_file_hash(model: callable) -> str:
+    """hash of the source file that defines the model ('' if there is no source file, e.g. builtins)"""
+    try:
+        path = inspect.getsourcefile(model)
+        if path is None:
+            return ""
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return ""
+    return _source_file_hash(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def fit_key(
+    x, y, dx, dy, model_type: str, model: callable, parameter_limits: Optional[dict], initial_values: Optional[dict] = None
+) -> str:
+    """
+    hash of data, model (incl. source code, source file, and initial values), parameter limits, and start values of
+    the fit
+    """
+    sha1 = hashlib.sha1(f"v{CACHE_VERSION} {model_type}".encode())
+    for values in (x, y, dx, dy):
+        _update_array(sha1, values)
+    try:
+        source = inspect.getsource(model)
+    except (OSError, TypeError):
+        source = getattr(model, "__qualname__", repr(model))
+    # the signature contains the initial values of the parameters
+    sha1.update(f"{source} {inspect.signature(model)} {_model_file_hash(model)}".encode())
+    sha1.update(repr(sorted((parameter_limits or {}).items())).encode())
+    sha1.update(repr(sorted((initial_values or {}).items())).encode())
+    return sha1.hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(cache_settings()[0], f"{key}.npz")
+
+
+### cache functions
+# field names of FitResult (fitting.py imports this module, so FitResult is not imported here)
+FIELDS = ("parameter_values", "parameter_errors", "parameter_cov_mat", "chi2", "ndf")
+
+
+def load_fit(key: str) -> Optional[tuple]:
+    """cached fit result as tuple in the order of FitResult (None if not cached)"""
+    path = _entry_path(key)
+    try:
+        with np.load(path, allow_pickle=False) as npz:
+            values, errors, cov_mat, chi2, ndf = (npz[field] for field in FIELDS)
+            result = (values, errors, cov_mat, float(chi2), int(ndf))
+        # mark as recently used
+        os.utime(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return result
+
+
+def save_fit(key: str, result: tuple):
+    """save fit result and remove least recently used entries if the cache is full"""
+    cache_dir, max_entries = cache_settings()
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        # write to temporary file first, because several processes can write at the same time
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f:
+            np.savez(f, **dict(zip(FIELDS, result)))
+        os.replace(f.name, _entry_path(key))
+
+        entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".npz")]
+        if len(entries) > max_entries:
+            entries.sort(key=os.path.getmtime)
+            for path in entries[: len(entries) - max_entries]:
+                # can already be removed by another process
+                Path(path).unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"could not write fit cache ({e})")
+
+
+def clear_fit_cache():
+    """remove all entries of the fit cache"""
+    cache_dir = cache_settings()[0]
+    if not os.path.isdir(cache_dir):
+        return
+    for name in os.listdir(cache_dir):
+        if name.endswith((".npz", ".tmp")):
+            Path(cache_dir, name).unlink()
+    logger.info(f"fit cache '{cache_dir}' cleared")
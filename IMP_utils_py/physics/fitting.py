@@ -0,0 +1,303 @@
+import os
+import sys
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+
+import gin
+import numpy as np
+
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.fit_cache import fit_key, load_fit, save_fit
+
+### logging setup
+logger = setup_logger()
+
+# model types with an analytic weighted least-squares solution
+CLOSED_FORM_MODELS = ("linear", "linear_zero", "constant")
+
+
+class FitResult(NamedTuple):
+    """result of a model fit (same fields for closed-form and kafe2 fits)"""
+    parameter_values: np.ndarray
+    parameter_errors: np.ndarray
+    parameter_cov_mat: np.ndarray
+    chi2: float
+    ndf: int
+
+
+@contextmanager
+def suppress_stdout():
+    """function to suppress console output"""
+    with open(os.devnull, "w") as devnull:
+        old_stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = old_stdout
+
+
+### closed-form fit engine
+def _as_array(values) -> Optional[np.ndarray]:
+    """convert pandas Series/list/scalar to float array (None stays None)"""
+    if values is None:
+        return None
+    return np.asarray(values, dtype=float)
+
+
+def _solve_weighted(model_type: str, x: np.ndarray, y: np.ndarray, w: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    weighted least-squares solution along the last axis
+
+    @return: (parameter values with shape (..., n_params), covariance matrices with shape (..., n_params, n_params))
+    """
+    S = np.sum(w, axis=-1)
+    Sy = np.sum(w * y, axis=-1)
+    if model_type == "constant":
+        params = (Sy / S)[..., np.newaxis]
+        cov = (1 / S)[..., np.newaxis, np.newaxis]
+        return params, cov
+
+    Sxx = np.sum(w * x * x, axis=-1)
+    Sxy = np.sum(w * x * y, axis=-1)
+    if model_type == "linear_zero":
+        params = (Sxy / Sxx)[..., np.newaxis]
+        cov = (1 / Sxx)[..., np.newaxis, np.newaxis]
+        return params, cov
+
+    # linear model: y = a * x + b
+    Sx = np.sum(w * x, axis=-1)
+    delta = S * Sxx - Sx**2
+    a = (S * Sxy - Sx * Sy) / delta
+    b = (Sxx * Sy - Sx * Sxy) / delta
+    params = np.stack([a, b], axis=-1)
+    cov = np.stack([np.stack([S, -Sx], axis=-1), np.stack([-Sx, Sxx], axis=-1)], axis=-2) / delta[..., np.newaxis, np.newaxis]
+    return params, cov
+
+
+def closed_form_fit(
+    x,
+    y,
+    dx=None,
+    dy=None,
+    model_type: str = "linear",
+    max_iter: int = 50,
+    rtol: float = 1e-10,
+) -> FitResult:
+    """
+    analytic weighted least-squares fit for 'linear', 'linear_zero' and 'constant' models
+
+    @params:
+        x, y: array-like values (last axis are the data points -> 2-D input fits many series at once)
+        dx, dy: array-like or scalar errors (None for no errors)
+        max_iter: max number of effective-variance iterations (only used if dx is given)
+        rtol: relative tolerance on the slope to stop the effective-variance iteration
+
+    @Note: x errors are projected on the y axis with the effective variance dy^2 + (a*dx)^2 (iterated until the slope
+    converges). kafe2 additionally minimizes the log-determinant of the covariance, so with x errors the results differ
+    (the slope e.g. by about half of its error), therefore fit_model uses kafe2 for data with x errors. Without x errors
+    both fits are identical. Without any errors all points have weight 1.
+    """
+    if model_type not in CLOSED_FORM_MODELS:
+        raise ValueError(f"Model '{model_type}' has no closed-form solution -> choose one of {CLOSED_FORM_MODELS}")
+
+    x = _as_array(x)
+    y = _as_array(y)
+    dx = _as_array(dx)
+    dy = _as_array(dy)
+    x = np.broadcast_to(x, y.shape)
+
+    # the constant model has a slope of zero -> x errors have no effect
+    use_dx = dx is not None and model_type != "constant"
+
+    def effective_variance(slope: np.ndarray) -> np.ndarray:
+        """dy^2 + (slope*dx)^2 (unit variance if no errors are given)"""
+        if dy is None and not use_dx:
+            return np.ones_like(y)
+        var = np.zeros_like(y) if dy is None else np.broadcast_to(dy**2, y.shape)
+        if use_dx:
+            var = var + (slope[..., np.newaxis] * dx) ** 2
+        return var
+
+    if use_dx and dy is None:
+        # start with unit weights, because the variance would be zero for slope = 0
+        var = np.ones_like(y)
+    else:
+        var = effective_variance(np.zeros(y.shape[:-1]))
+    params, cov = _solve_weighted(model_type, x, y, 1 / var)
+
+    if use_dx:
+        for _ in range(max_iter):
+            slope = params[..., 0]
+            var = effective_variance(slope)
+            params, cov = _solve_weighted(model_type, x, y, 1 / var)
+            if np.all(np.abs(params[..., 0] - slope) <= rtol * np.abs(slope)):
+                break
+        else:
+            logger.warning(f"effective-variance iteration did not converge in {max_iter} iterations")
+
+    if model_type == "linear":
+        y_model = params[..., 0, np.newaxis] * x + params[..., 1, np.newaxis]
+    elif model_type == "linear_zero":
+        y_model = params[..., 0, np.newaxis] * x
+    else:
+        y_model = params[..., 0, np.newaxis] * np.ones_like(x)
+    chi2 = np.sum((y - y_model) ** 2 / var, axis=-1)
+    ndf = y.shape[-1] - params.shape[-1]
+
+    errors = np.sqrt(np.diagonal(cov, axis1=-2, axis2=-1))
+    return FitResult(params, errors, cov, chi2, ndf)
+
+
+### kafe2 fit engine
+def kafe2_fit(
+    x,
+    y,
+    dx=None,
+    dy=None,
+    model: callable = None,
+    parameter_limits: Optional[dict] = None,
+    initial_values: Optional[dict] = None,
+) -> FitResult:
+    """
+    general (nonlinear) fit with kafe2
+
+    @params:
+        parameter_limits: dict with parameter name as key and (lower, upper) tuple as value
+        initial_values: dict with parameter name as key and start value as value (default: values in the model signature)
+    """
+    from kafe2 import Fit, XYContainer
+
+    xy_data = XYContainer(x, y)
+    if dx is not None:
+        xy_data.add_error("x", dx)
+    if dy is not None:
+        xy_data.add_error("y", dy)
+
+    # to suppress warning when model_type = 'constant'
+    with suppress_stdout():
+        my_fit = Fit(xy_data, model)
+        if initial_values:
+            my_fit.set_parameter_values(**initial_values)
+        for name, (lower, upper) in (parameter_limits or {}).items():
+            my_fit.limit_parameter(name, lower, upper)
+        my_fit.do_fit()
+
+    return FitResult(
+        np.asarray(my_fit.parameter_values),
+        np.asarray(my_fit.parameter_errors),
+        np.asarray(my_fit.parameter_cov_mat),
+        my_fit.goodness_of_fit,
+        my_fit.ndf,
+    )
+
+
+@gin.configurable
+def fit_model(
+    x,
+    y,
+    dx,
+    dy,
+    model_type: str,
+    model: callable,
+    parameter_limits: Optional[dict] = None,
+    initial_values: Optional[dict] = None,
+    engine: str = "auto",
+    use_cache: bool = True,
+) -> FitResult:
+    """
+    fit model to the data with the best available engine
+
+    @params:
+        initial_values: start values of the kafe2 fit (see kafe2_fit)
+        engine: 'auto' (closed-form fit for 'linear', 'linear_zero' and 'constant' without x errors, otherwise kafe2) /
+        'closed_form' (also with x errors, see closed_form_fit) / 'kafe2'
+        use_cache: if True, kafe2 fit results are saved and reused for the same data, model, and parameter limits (see fit_cache)
+    """
+    if engine == "auto":
+        # with x errors the closed-form fit is only an approximation of the kafe2 fit (see closed_form_fit)
+        engine = "closed_form" if model_type in CLOSED_FORM_MODELS and not parameter_limits and dx is None else "kafe2"
+
+    if engine == "closed_form":
+        logger.debug(f"closed-form fit ({model_type})")
+        return closed_form_fit(x, y, dx, dy, model_type)
+    elif engine == "kafe2":
+        if not use_cache:
+            logger.debug(f"kafe2 fit ({model_type})")
+            return kafe2_fit(x, y, dx, dy, model, parameter_limits, initial_values)
+
+        key = fit_key(x, y, dx, dy, model_type, model, parameter_limits, initial_values)
+        fit_result = load_fit(key)
+        if fit_result is not None:
+            logger.debug(f"kafe2 fit ({model_type}) loaded from fit cache")
+            return FitResult(*fit_result)
+        logger.debug(f"kafe2 fit ({model_type})")
+        fit_result = kafe2_fit(x, y, dx, dy, model, parameter_limits, initial_values)
+        save_fit(key, fit_result)
+        return fit_result
+    else:
+        raise ValueError(f"fit engine '{engine}' is not supported -> choose 'auto', 'closed_form', or 'kafe2'")
+
+
+### binned likelihood fit
+def gaussian_bin_probabilities(edges: np.ndarray, mu: float, sigma: float) -> np.ndarray:
+    """probabilities of the bins for a normal distribution truncated to the histogram range"""
+    from scipy.special import ndtr
+
+    cdf = ndtr((edges - mu) / sigma)
+    return np.diff(cdf) / (cdf[-1] - cdf[0])
+
+
+def fit_binned_gaussian(counts, edges, mu: Optional[float] = None, sigma: Optional[float] = None) -> FitResult:
+    """
+    binned maximum-likelihood fit of a normal distribution to histogram counts (multinomial likelihood, so empty bins
+    and bins with few entries are treated correctly)
+
+    @params:
+        counts, edges: histogram like np.histogram
+        mu, sigma: start values (default: mean and std of the bin centers)
+
+    @return: FitResult with the parameters (mu, sigma), the errors from the inverse Hessian of the negative
+    log-likelihood, and the likelihood ratio chi^2 (2 * sum n_i * ln(n_i/nu_i)) with ndf = bins - 3
+    """
+    from scipy.optimize import minimize
+
+    counts = np.asarray(counts, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    n_total = counts.sum()
+    if mu is None or sigma is None:
+        centers = (edges[1:] + edges[:-1]) / 2
+        mean = np.average(centers, weights=counts)
+        mu = mean if mu is None else mu
+        sigma = np.sqrt(np.average((centers - mean) ** 2, weights=counts)) if sigma is None else sigma
+    # width of a bin as lower limit for the scale of sigma (e.g. all values in one bin)
+    scale = max(sigma, np.min(np.diff(edges)) / 2)
+
+    def negative_log_likelihood(params: np.ndarray) -> float:
+        # standardized parameters, so the minimizer works for every unit
+        probabilities = gaussian_bin_probabilities(edges, mu + scale * params[0], scale * np.exp(params[1]))
+        return -np.sum(counts * np.log(np.maximum(probabilities, 1e-300)))
+
+    result = minimize(negative_log_likelihood, np.zeros(2), method="Nelder-Mead", options={"xatol": 1e-10, "fatol": 1e-12, "maxiter": 2000})
+    params = np.array([mu + scale * result.x[0], scale * np.exp(result.x[1])])
+
+    # Hessian of the negative log-likelihood in (mu, sigma) with central differences
+    def nll(values: np.ndarray) -> float:
+        return -np.sum(counts * np.log(np.maximum(gaussian_bin_probabilities(edges, *values), 1e-300)))
+
+    step = 1e-3 * params[1]
+    hessian = np.empty((2, 2))
+    for i in range(2):
+        for j in range(2):
+            shifts = [np.eye(2)[i] * step * si + np.eye(2)[j] * step * sj for si, sj in ((1, 1), (1, -1), (-1, 1), (-1, -1))]
+            values = [nll(params + shift) for shift in shifts]
+            hessian[i, j] = (values[0] - values[1] - values[2] + values[3]) / (4 * step**2)
+    try:
+        cov = np.linalg.inv(hessian)
+    except np.linalg.LinAlgError:
+        cov = np.full((2, 2), np.nan)
+
+    expected = n_total * gaussian_bin_probabilities(edges, *params)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi2 = 2 * np.sum(np.where(counts > 0, counts * np.log(counts / expected), 0))
+    return FitResult(params, np.sqrt(np.abs(np.diagonal(cov))), cov, float(chi2), len(counts) - 3)
@@ -0,0 +1,163 @@
+import math
+import os
+from typing import Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.configurables import gin_process_pool
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.models import get_model, model_types
+from IMP_utils_py.physics.plotting import fit_series, needs_kafe2, read_data
+from IMP_utils_py.physics.rendering import render_figure
+
+### logging setup
+logger = setup_logger()
+
+
+### helper functions
+def fit_group(
+    group, x: np.ndarray, y: np.ndarray, dx: Optional[np.ndarray], dy: Optional[np.ndarray], model_type: str
+) -> dict:
+    """
+    fit model to the data of one group (top-level function to be usable in a process pool)
+
+    @return: row of the results table
+    """
+    row = {"group": group, "n_points": len(x)}
+    try:
+        fit_result = fit_series(x, y, dx, dy, model_type, str(group))
+    except Exception as e:
+        logger.warning(f"fit of group '{group}' failed ({type(e).__name__}: {e})")
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+
+    values, errors = fit_result.parameter_values, fit_result.parameter_errors
+    chi2, ndf = fit_result.chi2, fit_result.ndf
+    for name, value, error in zip(get_model(model_type).parameter_names, values, errors):
+        row[name] = float(value)
+        row[f"{name}_error"] = float(error)
+    row["chi2"] = float(chi2)
+    row["ndf"] = int(ndf)
+    row["chi2_ndf"] = float(chi2) / ndf if ndf > 0 else np.nan
+    return row
+
+
+def evaluate_model(model_type: str, row: pd.Series, x: np.ndarray) -> np.ndarray:
+    """model values of the fit result (row of the results table) at x"""
+    model = get_model(model_type)
+    return model.evaluate(x, [row[name] for name in model.parameter_names])
+
+
+def small_multiples(
+    groups: list,
+    results: pd.DataFrame,
+    model_type: str,
+    graphic_path: str,
+    title: str,
+    x_label: str,
+    y_label: str,
+    max_facets: int,
+):
+    """one small errorbar plot with model per group"""
+    if len(groups) > max_facets:
+        logger.warning(f"only the first {max_facets} of {len(groups)} groups are plotted (see max_facets)")
+        groups = groups[:max_facets]
+
+    ncols = math.ceil(math.sqrt(len(groups)))
+    nrows = math.ceil(len(groups) / ncols)
+    rows = results.set_index("group", drop=False)
+    with render_figure(graphic_path, figsize=(2.5 * ncols, 2 * nrows)) as fig:
+        axes = fig.subplots(nrows, ncols, sharex=True, squeeze=False)
+        for ax, (group, x, y, dx, dy) in zip(axes.flat, groups):
+            ax.errorbar(x, y, yerr=dy, xerr=dx, linestyle="None", marker=".", elinewidth=0.5, capsize=2, color="blue")
+            row = rows.loc[group]
+            if "error" not in row or pd.isna(row.get("error")):
+                x_intervall = np.linspace(np.min(x), np.max(x), 200)
+                ax.plot(x_intervall, evaluate_model(model_type, row, x_intervall), "--", color="steelblue")
+            ax.set_title(str(group), fontsize=8)
+            ax.tick_params(labelsize=6)
+        for ax in axes.flat[len(groups):]:
+            ax.set_visible(False)
+
+        fig.suptitle(title)
+        fig.supxlabel(x_label)
+        fig.supylabel(y_label)
+        fig.tight_layout()
+
+    logger.info("small multiples plot saved")
+
+
+### command function
+@gin.configurable
+def grouped_fit(
+    data_path: str,
+    results_path: str,
+    group_column: str,
+    x_column: str,
+    x_error_column: str,
+    y_column: str,
+    y_error_column: str,
+    model_type: str,
+    max_workers: int = 1,
+    graphic_path: str = "",
+    title: str = "",
+    x_label: str = "",
+    y_label: str = "",
+    max_facets: int = 36,
+) -> pd.DataFrame:
+    """
+    fit model per group of a long-format dataset (one row per measurement and a column with the group/run id)
+
+    @params:
+        data_path: location of the csv/excel file with the data
+        results_path: location for the csv file with parameters, errors, and chi2 per group
+        group_column: column name for the group/run id
+        x_column, x_error_column, y_column, y_error_column: column names (use "" for no error column)
+        model_type: 'linear' / 'linear_zero' / 'constant' / 'weighted_average' / 'O8_bessel' (any model type with fit parameters)
+        max_workers: 1 fits all groups in this process, otherwise number of processes (only for kafe2 fits, the
+        closed-form fits always run in this process)
+        graphic_path: location for the png with one small plot per group ("" for no plot)
+        max_facets: max number of groups in the plot
+
+    @output:
+        results table saved in results_path (and returned)
+    """
+    if not get_model(model_type).fittable:
+        raise ValueError(f"Model '{model_type}' has no fit parameters -> choose {', '.join(repr(name) for name in model_types(fittable=True))}")
+
+    if max_workers < 1:
+        raise ValueError(f"max_workers ({max_workers}) has to be a positive integer -> choose max_workers >= 1")
+
+    data = read_data(data_path)
+    groups = [
+        (
+            group,
+            df_group[x_column].to_numpy(dtype=float),
+            df_group[y_column].to_numpy(dtype=float),
+            df_group[x_error_column].to_numpy(dtype=float) if x_error_column != "" else None,
+            df_group[y_error_column].to_numpy(dtype=float) if y_error_column != "" else None,
+        )
+        for group, df_group in data.sort_values(by=[group_column, x_column]).groupby(group_column, sort=True)
+    ]
+    logger.info(f"fit {len(groups)} groups with {model_type} model")
+
+    # more processes than CPU cores only add start-up time, and the closed-form fits are faster than starting processes
+    max_workers = min(max_workers, len(groups), os.cpu_count() or 1)
+    # dx of the first group (all groups have x errors or none)
+    if max_workers <= 1 or not needs_kafe2(get_model(model_type), groups[0][3]):
+        rows = [fit_group(*group, model_type) for group in groups]
+    else:
+        with gin_process_pool(max_workers) as executor:
+            futures = [executor.submit(fit_group, *group, model_type) for group in groups]
+            rows = [future.result() for future in futures]
+
+    results = pd.DataFrame(rows)
+    results.to_csv(results_path, index=False)
+    logger.info("results table saved")
+
+    if graphic_path != "":
+        small_multiples(groups, results, model_type, graphic_path, title, x_label, y_label, max_facets)
+
+    return results
@@ -0,0 +1,240 @@
+import json
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterator, Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+# file layout: MAGIC | header length (uint64, little endian) | JSON header | padding | one float64 array per column
+MEASUREMENT_SUFFIX = ".imp"
+MAGIC = b"IMPMEAS\0"
+FORMAT_VERSION = 1
+# the data starts at a multiple of ALIGNMENT bytes
+ALIGNMENT = 64
+DTYPE = np.dtype("<f8")
+
+
+### helper functions
+def is_measurement(path: str) -> bool:
+    """True for files in the binary measurement format (by suffix)"""
+    return path.endswith(MEASUREMENT_SUFFIX)
+
+
+def _header_bytes(header: dict) -> bytes:
+    """magic, length, and JSON header padded to ALIGNMENT bytes"""
+    header_json = json.dumps(header, ensure_ascii=False).encode()
+    size = len(MAGIC) + 8 + len(header_json)
+    padding = -size % ALIGNMENT
+    header_json += b" " * padding
+    return MAGIC + struct.pack("<Q", len(header_json)) + header_json
+
+
+def read_header(path: str) -> tuple[dict, int]:
+    """
+    @return: tuple (header, offset of the data in bytes)
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is no measurement file -> convert it with the convert-measurement mode")
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length).decode())
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"measurement file version {header.get('version')} is not supported -> convert the data again")
+    return header, len(MAGIC) + 8 + length
+
+
+def _numeric_columns(df: pd.DataFrame) -> list:
+    """columns that can be stored as float64 (other columns are skipped with a warning)"""
+    columns = []
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]) or df[column].isna().all():
+            columns.append(column)
+        else:
+            logger.warning(f"column '{column}' is not numeric -> not converted")
+    return columns
+
+
+def _check_chunk(chunk: pd.DataFrame, chunk_idx: int, all_columns: list, columns: list, index_stored: bool, range_index: bool):
+    """raise ValueError if a later chunk does not have the columns and the index kind of the first chunk"""
+    if list(chunk.columns) != all_columns:
+        raise ValueError(f"chunk {chunk_idx} has the columns {[str(c) for c in chunk.columns]} instead of {[str(c) for c in all_columns]} of the first chunk -> use chunks with the same columns")
+    not_numeric = [str(column) for column in columns if not (pd.api.types.is_numeric_dtype(chunk[column]) or chunk[column].isna().all())]
+    if not_numeric:
+        raise ValueError(f"columns {not_numeric} of chunk {chunk_idx} are not numeric like in the first chunk -> clean the data or convert it without chunks")
+    if index_stored and not pd.api.types.is_numeric_dtype(chunk.index):
+        raise ValueError(f"index of chunk {chunk_idx} is not numeric like in the first chunk -> use chunks with the same index kind")
+    if range_index and not (isinstance(chunk.index, pd.RangeIndex) and chunk.index.step == 1):
+        # the index of the first chunk is not stored -> the index of this chunk would be lost
+        raise ValueError(f"chunk {chunk_idx} has an index, but the first chunk has a default RangeIndex -> use chunks with the same index kind")
+
+
+### read functions
+def measurement_arrays(path: str) -> tuple[dict, np.memmap]:
+    """
+    memory-mapped data without copying (copy-on-write, changes are not written to the file)
+
+    @return: tuple (header, array with shape (number of arrays, number of rows)), every row of the array is one column
+    (index first if the header has a stored index)
+    """
+    header, offset = read_header(path)
+    n_arrays = len(header["columns"]) + int(header["index"]["stored"])
+    if 0 in (header["n_rows"], n_arrays):
+        return header, np.empty((n_arrays, header["n_rows"]), dtype=DTYPE)
+    return header, np.memmap(path, dtype=DTYPE, mode="c", offset=offset, shape=(n_arrays, header["n_rows"]))
+
+
+def read_measurement(path: str) -> pd.DataFrame:
+    """DataFrame with the memory-mapped columns (no copy and no parsing, the pages are read on access)"""
+    header, arrays = measurement_arrays(path)
+    if header["index"]["stored"]:
+        index = pd.Index(arrays[0], name=header["index"]["name"]).astype(header["index"]["dtype"])
+        arrays = arrays[1:]
+    else:
+        index = pd.RangeIndex(header["n_rows"], name=header["index"]["name"])
+    # the transposed array is one block of pandas (columns x rows) -> no copy (a dict of columns would be copied)
+    return pd.DataFrame(arrays.T, index=index, columns=header["columns"], copy=False)
+
+
+def measurement_chunks(path: str, chunk_size: int, columns: Optional[list] = None) -> Iterator[np.ndarray]:
+    """
+    chunks with shape (rows, columns) of the memory-mapped data (only one chunk is copied at a time)
+
+    @params:
+        columns: names of the columns (default: all columns without index)
+    """
+    header, arrays = measurement_arrays(path)
+    offset = int(header["index"]["stored"])
+    positions = [offset + header["columns"].index(column) for column in (columns or header["columns"])]
+    for start in range(0, header["n_rows"], chunk_size):
+        yield np.stack([arrays[position, start : start + chunk_size] for position in positions], axis=1)
+
+
+def measurement_errors(path: str) -> dict:
+    """dict with value column as key and its error column as value"""
+    return read_header(path)[0]["errors"]
+
+
+### write functions
+def write_measurement(df: pd.DataFrame, path: str, error_columns: Optional[dict] = None, metadata: Optional[dict] = None):
+    """
+    save the numeric columns of a DataFrame in the binary measurement format
+
+    @params:
+        error_columns: dict with value column as key and its error column as value, e.g. {"U": "u_U"}
+        metadata: JSON serializable dict (e.g. units or the measurement setup)
+    """
+    write_measurement_chunks([df], path, error_columns, metadata)
+
+
+def write_measurement_chunks(chunks, path: str, error_columns: Optional[dict] = None, metadata: Optional[dict] = None) -> dict:
+    """
+    same as write_measurement for DataFrame chunks with the same columns (e.g. pd.read_csv with chunksize), only one
+    chunk is in memory at a time
+
+    Every column is first written to its own temporary file, because the number of rows is only known at the end.
+
+    @return: header of the file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        columns = None
+        files = []
+        index = {"name": None, "stored": False, "dtype": "float64"}
+        n_rows = 0
+        try:
+            for chunk_idx, chunk in enumerate(chunks):
+                if columns is None:
+                    all_columns = list(chunk.columns)
+                    columns = _numeric_columns(chunk)
+                    index["name"] = chunk.index.name
+                    # a RangeIndex starting at 0 is not stored
+                    range_index = isinstance(chunk.index, pd.RangeIndex) and chunk.index.start == 0 and chunk.index.step == 1
+                    index["stored"] = not range_index
+                    if index["stored"] and not pd.api.types.is_numeric_dtype(chunk.index):
+                        logger.warning(f"index '{chunk.index.name}' is not numeric -> not converted")
+                        index["stored"] = False
+                    index["dtype"] = str(chunk.index.dtype)
+                    files = [open(os.path.join(tmp_dir, f"{idx}.bin"), "wb") for idx in range(len(columns) + int(index["stored"]))]
+                else:
+                    _check_chunk(chunk, chunk_idx, all_columns, columns, index["stored"], range_index)
+                arrays = [chunk[column] for column in columns]
+                if index["stored"]:
+                    arrays.insert(0, chunk.index.to_series())
+                for f, values in zip(files, arrays):
+                    f.write(pd.to_numeric(values).to_numpy(dtype=DTYPE, na_value=np.nan).tobytes())
+                n_rows += len(chunk)
+        finally:
+            for f in files:
+                f.close()
+        columns = columns or []
+
+        errors = {}
+        for value_column, error_column in (error_columns or {}).items():
+            for column in (value_column, error_column):
+                if column not in columns:
+                    raise ValueError(f"Column '{column}' not found in the numeric columns -> choose from {[str(c) for c in columns]}")
+            errors[value_column] = error_column
+
+        header = {
+            "version": FORMAT_VERSION,
+            "n_rows": n_rows,
+            "columns": [str(column) for column in columns],
+            "index": index,
+            "errors": errors,
+            "metadata": metadata or {},
+        }
+        tmp_path = os.path.join(tmp_dir, "measurement" + MEASUREMENT_SUFFIX)
+        with open(tmp_path, "wb") as f:
+            f.write(_header_bytes(header))
+            for idx in range(len(files)):
+                with open(os.path.join(tmp_dir, f"{idx}.bin"), "rb") as column_file:
+                    shutil.copyfileobj(column_file, f, 1 << 24)
+        os.replace(tmp_path, path)
+    return header
+
+
+### command function
+@gin.configurable
+def convert_measurement(
+    source_path: str,
+    target_path: str,
+    error_columns: Optional[dict] = None,
+    metadata: Optional[dict] = None,
+    chunk_size: Optional[int] = None,
+) -> dict:
+    """
+    convert a csv/excel file to the binary measurement format
+
+    @params:
+        source_path: csv file (first column is the index like in all commands) or xlsx file
+        target_path: location of the measurement file (ends with MEASUREMENT_SUFFIX)
+        error_columns, metadata: see write_measurement
+        chunk_size: if not None, the csv file is read in chunks of chunk_size rows (for files larger than the memory)
+
+    @output:
+        measurement file with one float64 array per numeric column
+    """
+    if not is_measurement(target_path):
+        raise ValueError(f"target_path '{target_path}' file format is not supported -> use {MEASUREMENT_SUFFIX}")
+
+    suffix = source_path.split(".")[-1]
+    if suffix == "csv":
+        chunks = pd.read_csv(source_path, index_col=0, chunksize=chunk_size) if chunk_size else [pd.read_csv(source_path, index_col=0)]
+    elif suffix == "xlsx":
+        chunks = [pd.read_excel(source_path)]
+    else:
+        raise ValueError(f"source_path '{source_path}' file format is not supported -> use .csv or .xlsx")
+
+    metadata = {"source": os.path.basename(source_path), **(metadata or {})}
+    header = write_measurement_chunks(chunks, target_path, error_columns, metadata)
+    logger.info(f"{header['n_rows']} rows and {len(header['columns'])} columns saved in '{target_path}'")
+    return header
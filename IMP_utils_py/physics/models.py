@@ -0,0 +1,336 @@
+import importlib
+import inspect
+from importlib.metadata import entry_points
+from typing import Callable, NamedTuple, Optional
+
+import gin
+import numpy as np
+
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.fitting import FitResult
+from IMP_utils_py.physics.statistics import weighted_average
+
+### logging setup
+logger = setup_logger()
+
+# entry point group of packages with additional models (name: model type, value: 'module:Model object')
+ENTRY_POINT_GROUP = "IMP_utils_py.models"
+
+
+### model functions
+def constant_model(x, a=1.0):
+    """y = a"""
+    return a
+
+
+def linear_zero_model(x, a=1.0):
+    """y = a * x"""
+    return a * x
+
+
+def linear_model(x, a=1.0, b=0.0):
+    """y = a * x + b"""
+    return a * x + b
+
+
+### special function for Grundpraktikum
+def O11_sqrt_Rs(alpha_e, n1: float, n2: float):
+    """
+    sqrt(R_s) = |(n1*cos(alpha_e) - n2*cos(alpha_g)) / (n1*cos(alpha_e) + n2*cos(alpha_g))|
+              = sqrt(sin^2(alpha_e - alpha_g) / sin^2(alpha_e + alpha_g))
+
+    The Fresnel form has no 0/0 at alpha_e = 0 and gives 1 for total internal reflection.
+    """
+    cos_e, cos_g = O11_cosines(alpha_e, n1, n2)
+    return np.abs((n1 * cos_e - n2 * cos_g) / (n1 * cos_e + n2 * cos_g))
+
+def O11_sqrt_Rp(alpha_e, n1: float, n2: float):
+    """
+    sqrt(R_p) = |(n2*cos(alpha_e) - n1*cos(alpha_g)) / (n2*cos(alpha_e) + n1*cos(alpha_g))|
+              = sqrt(tan^2(alpha_e - alpha_g) / tan^2(alpha_e + alpha_g))
+    """
+    cos_e, cos_g = O11_cosines(alpha_e, n1, n2)
+    return np.abs((n2 * cos_e - n1 * cos_g) / (n2 * cos_e + n1 * cos_g))
+
+def O11_cosines(alpha_e, n1: float, n2: float) -> tuple:
+    """cos(alpha_e) and cos(alpha_g) with alpha_g = arcsin(n1/n2 * sin(alpha_e)) (alpha_e in degrees)"""
+    alpha_e = np.asarray(alpha_e, dtype=float) * np.pi/180 # from degrees to radian
+    sin_g = np.sin(alpha_e) * n1/n2 # Brechungsgesetz
+    # cos(alpha_g) = 0 for total internal reflection
+    return np.cos(alpha_e), np.sqrt(np.maximum(1 - sin_g**2, 0))
+
+@gin.configurable
+def O11_Rs_Rp_model(alpha_e: float, n1: float, n2: float, component: str = "both"):
+    """
+    alpha_g = arcsin(n1/n2 * sin(alpha_e))
+    sqrt(R_s) = sqrt(sin^2(alpha_e - alpha_g) / sin^2(alpha_e + alpha_g))
+    sqrt(R_p) = sqrt(tan^2(alpha_e - alpha_g) / tan^2(alpha_e + alpha_g))
+
+    @params:
+        component: 'both' returns tuple (sqrt(R_s), sqrt(R_p)), 'Rs' or 'Rp' only calculates and returns this one
+    """
+    if component == "Rs":
+        return O11_sqrt_Rs(alpha_e, n1, n2)
+    elif component == "Rp":
+        return O11_sqrt_Rp(alpha_e, n1, n2)
+    elif component == "both":
+        return O11_sqrt_Rs(alpha_e, n1, n2), O11_sqrt_Rp(alpha_e, n1, n2)
+    raise ValueError(f"O11 component '{component}' is not supported -> choose 'both', 'Rs', or 'Rp'")
+
+def O11_Rs_model(alpha_e):
+    """sqrt(R_s) with n1 and n2 from O11_Rs_Rp_model"""
+    return O11_Rs_Rp_model(alpha_e, component="Rs")
+
+def O11_Rp_model(alpha_e):
+    """sqrt(R_p) with n1 and n2 from O11_Rs_Rp_model"""
+    return O11_Rs_Rp_model(alpha_e, component="Rp")
+
+def j1_over_u(u):
+    """
+    j1(u)/u for arrays (1/2 at u = 0)
+
+    Near zero the series 1/2 - u^2/16 + u^4/384 is used, because j1(u)/u is 0/0 there.
+    """
+    from scipy.special import j1
+
+    u = np.asarray(u, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = j1(u) / u
+    small = np.abs(u) < 1e-3
+    if small.any():
+        result = np.where(small, 0.5 - u**2/16 + u**4/384, result)
+    return result
+
+def O8_bessel_function(x, I0, G, IB = 0.008, x0=8):
+    """I = 4 * I0 * (j1(u)/u)^2 + IB with u = G * (x - x0) (vectorized, I0 + IB at x = x0)"""
+    u = G * (np.asarray(x, dtype=float) - x0)
+    return (4 * I0 * j1_over_u(u)**2 + IB)[()]
+
+
+### jacobians (derivatives after the parameters)
+def linear_zero_jacobian(x, a):
+    return [x]
+
+
+def linear_jacobian(x, a, b):
+    return [x, np.ones_like(x)]
+
+
+def constant_jacobian(x, a):
+    return [np.ones_like(x)]
+
+
+def O8_bessel_jacobian(x, I0, G, IB, x0):
+    """d/du (j1(u)/u) = -j2(u)/u with u = G * (x - x0)"""
+    from scipy.special import jv
+
+    u = G * (x - x0)
+    small = np.abs(u) < 1e-3
+    u_safe = np.where(small, 1.0, u)
+    s = j1_over_u(u)
+    # series j2(u)/u = u/8 - u^3/96 near zero
+    ds = np.where(small, -(u/8 - u**3/96), -jv(2, u_safe) / u_safe)
+    return [4 * s**2, 8 * I0 * s * ds * (x - x0), np.ones_like(x), -8 * I0 * s * ds * G]
+
+
+### initial values
+def O8_bessel_initial_values(x, y) -> dict:
+    """start values from the peak: maximum, background, and half width at half maximum (HWHM at G*HWHM = 1.6163)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    IB = max(float(np.nanmin(y)), 0.0)
+    I0 = float(np.nanmax(y)) - IB
+    x0 = float(x[np.nanargmax(y)])
+    above = x[y > IB + I0 / 2]
+    hwhm = (above.max() - above.min()) / 2 if len(above) > 1 else 0.0
+    # within the parameter limit of G
+    G = min(1.6163 / hwhm, 1.99) if hwhm > 0 else 1.0
+    return {"I0": I0, "G": G, "IB": IB, "x0": x0}
+
+
+### special fits
+def fit_weighted_average(x, y, dx, dy) -> FitResult:
+    """weighted average of y as fit result (x and dx are ignored)"""
+    w_avg, dw_avg, chi2_ndf = weighted_average(y, dy, return_chi2_ndf=True)
+    ndf = len(y) - 1
+    return FitResult(np.array([w_avg]), np.array([dw_avg]), np.array([[dw_avg**2]]), chi2_ndf * ndf, ndf)
+
+
+### model registry
+class Model(NamedTuple):
+    """
+    declaration of a model type for the fit and plot commands
+
+    @fields:
+        function: vectorized model function f(x, *parameters) with the parameters as keyword arguments (as for kafe2),
+        None for no model
+        parameter_names: names of the fit parameters in the order of function (no names for a model without fit)
+        parameter_limits: dict with parameter name as key and (lower, upper) tuple as value
+        jacobian: vectorized derivatives of function after the parameters (x, *parameters) -> list with one array per
+        parameter (used for the y-error area of curved models)
+        initial_values: (x, y) -> dict with the start values of the kafe2 fit
+        closed_form: model type of the analytic fit in fitting.closed_form_fit (None for a kafe2 fit)
+        fit: (x, y, dx, dy) -> FitResult to replace the fit engines (e.g. weighted average)
+        line: (slope, intercept) parameter names of straight lines (None for 0). Lines end at their zero point if
+        decreasing and show the intercept error as y-error area.
+        parameter_labels: dict with parameter name as key and (value label, error label) as value for the console
+        chi2_label: label for chi^2/ndf in the console (None for no log)
+    """
+    function: Optional[Callable] = None
+    parameter_names: tuple = ()
+    parameter_limits: Optional[dict] = None
+    jacobian: Optional[Callable] = None
+    initial_values: Optional[Callable] = None
+    closed_form: Optional[str] = None
+    fit: Optional[Callable] = None
+    line: Optional[tuple] = None
+    parameter_labels: Optional[dict] = None
+    chi2_label: Optional[str] = None
+
+    @property
+    def fittable(self) -> bool:
+        """True if the model has fit parameters"""
+        return self.function is not None and len(self.parameter_names) > 0
+
+    def evaluate(self, x, parameter_values=()) -> np.ndarray:
+        """model values at x"""
+        x = np.asarray(x, dtype=float)
+        return np.broadcast_to(self.function(x, *parameter_values), x.shape)
+
+    def error(self, x, fit_result: FitResult) -> Optional[np.ndarray]:
+        """y-error of the model at x from the parameter covariance (None without jacobian)"""
+        if self.jacobian is None:
+            return None
+        x = np.asarray(x, dtype=float)
+        jacobian = np.array([np.broadcast_to(d, x.shape) for d in self.jacobian(x, *fit_result.parameter_values)])
+        variance = np.einsum("ix,ij,jx->x", jacobian, np.asarray(fit_result.parameter_cov_mat), jacobian)
+        return np.sqrt(np.maximum(variance, 0))
+
+    def line_parameters(self, fit_result: FitResult) -> tuple[float, float, float, float]:
+        """slope, slope error, intercept, and intercept error of a line model"""
+        slope, intercept = self.line
+        values = dict(zip(self.parameter_names, fit_result.parameter_values))
+        errors = dict(zip(self.parameter_names, fit_result.parameter_errors))
+        return values.get(slope, 0), errors.get(slope, 0), values.get(intercept, 0), errors.get(intercept, 0)
+
+
+LINE_LABELS = {
+    "slope": ("Steigung der Gerade", "Unsicherheit der Steigung"),
+    "intercept": ("y-Achsenschnitt der Gerade", "Unsicherheit des y-Achsenschnitt"),
+}
+
+MODELS = {
+    "linear": Model(
+        function=linear_model,
+        parameter_names=("a", "b"),
+        jacobian=linear_jacobian,
+        closed_form="linear",
+        line=("a", "b"),
+        parameter_labels={"a": LINE_LABELS["slope"], "b": LINE_LABELS["intercept"]},
+    ),
+    "linear_zero": Model(
+        function=linear_zero_model,
+        parameter_names=("a",),
+        jacobian=linear_zero_jacobian,
+        closed_form="linear_zero",
+        line=("a", None),
+        parameter_labels={"a": LINE_LABELS["slope"]},
+    ),
+    "constant": Model(
+        function=constant_model,
+        parameter_names=("a",),
+        jacobian=constant_jacobian,
+        closed_form="constant",
+        line=(None, "a"),
+        parameter_labels={"a": LINE_LABELS["intercept"]},
+    ),
+    "weighted_average": Model(
+        function=constant_model,
+        parameter_names=("w_avg",),
+        jacobian=constant_jacobian,
+        # same result as the closed-form fit of a constant
+        closed_form="constant",
+        fit=fit_weighted_average,
+        line=(None, "w_avg"),
+        parameter_labels={"w_avg": LINE_LABELS["intercept"]},
+        chi2_label="chi^2/ndf des gewichteten Mittelwerts",
+    ),
+    "O8_bessel": Model(
+        function=O8_bessel_function,
+        parameter_names=("I0", "G", "IB", "x0"),
+        parameter_limits={
+            "I0": (0, np.inf),
+            "x0": (0, np.inf),
+            "IB": (0, np.inf),
+            "G": (0, 2), # just a value that worked good
+        },
+        jacobian=O8_bessel_jacobian,
+        initial_values=O8_bessel_initial_values,
+    ),
+    "O11_Rs": Model(function=O11_Rs_model),
+    "O11_Rp": Model(function=O11_Rp_model),
+    "none": Model(),
+}
+
+
+def register_model(model_type: str, model: Model):
+    """add model type to the registry (an existing model type is replaced)"""
+    if not isinstance(model, Model):
+        raise ValueError(f"Model '{model_type}' has type {type(model).__name__} -> use IMP_utils_py.physics.models.Model")
+    if model.fittable and model.closed_form is None is model.fit:
+        names = tuple(inspect.signature(model.function).parameters)[1:]
+        if names != tuple(model.parameter_names):
+            raise ValueError(f"parameter_names {model.parameter_names} of model '{model_type}' do not match the function parameters {names}")
+    MODELS[model_type] = model
+    logger.debug(f"registered model '{model_type}'")
+
+
+@gin.configurable
+def model_plugins(models: Optional[dict] = None) -> dict:
+    """
+    additional model types
+
+    @params:
+        models: dict with model type as key and 'module:attribute' path of a Model object as value
+    """
+    return models or {}
+
+
+def _load_object(path: str):
+    """import object from 'module:attribute' path"""
+    module_name, _, attribute = path.partition(":")
+    obj = importlib.import_module(module_name)
+    for name in filter(None, attribute.split(".")):
+        obj = getattr(obj, name)
+    return obj
+
+
+def _plugin_entry_points() -> list:
+    """installed entry points of ENTRY_POINT_GROUP"""
+    try:
+        return list(entry_points(group=ENTRY_POINT_GROUP))
+    except TypeError:
+        # python 3.9
+        return list(entry_points().get(ENTRY_POINT_GROUP, []))
+
+
+def get_model(model_type: str) -> Model:
+    """model of model_type from the registry (gin bindings of model_plugins and installed entry points included)"""
+    if model_type not in MODELS:
+        plugins = model_plugins()
+        if model_type in plugins:
+            register_model(model_type, _load_object(plugins[model_type]))
+        else:
+            for entry_point in _plugin_entry_points():
+                if entry_point.name == model_type:
+                    register_model(model_type, entry_point.load())
+                    break
+
+    if model_type not in MODELS:
+        raise ValueError(f"Model '{model_type}' ist not supported -> choose {', '.join(repr(name) for name in model_types())}")
+    return MODELS[model_type]
+
+
+def model_types(fittable: bool = False) -> list[str]:
+    """names of the registered model types (only model types with fit parameters if fittable is True)"""
+    return [name for name, model in MODELS.items() if model.fittable or not fittable]
@@ -0,0 +1,112 @@
+from functools import cache
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# up to this width the windows are summed directly (exact like the python sums), wider windows with a cumulative sum
+DIRECT_SUM_MAX_WIDTH = 16
+
+PERIODS_COLUMNS = ["periods", "half periods", "half periods v2"]
+
+
+### window functions
+def window_sums(data, width: int, step: int = 1, aligned: bool = False) -> np.ndarray:
+    """
+    sums of width consecutive values for every step-th window as float array with the same length as data
+
+    @params:
+        data: array-like with the times
+        width: number of values per sum
+        step: distance of the first values of two windows (step = width for not overlapping windows)
+        aligned: if False, the sums are at the beginning and the rest is NaN. If True, every sum is at the index of the
+        last value of its window (e.g. the lap that completes it) and the other values are NaN.
+    """
+    if width < 1 or step < 1:
+        raise ValueError(f"width ({width}) and step ({step}) have to be positive integers -> choose width >= 1 and step >= 1")
+    data = np.asarray(data, dtype=float).ravel()
+    result = np.full(len(data), np.nan)
+    if len(data) < width:
+        return result
+
+    n_windows = (len(data) - width) // step + 1
+    if width <= DIRECT_SUM_MAX_WIDTH:
+        # one strided slice per position in the window
+        sums = data[: (n_windows - 1) * step + 1 : step].copy()
+        for offset in range(1, width):
+            sums += data[offset : offset + (n_windows - 1) * step + 1 : step]
+    else:
+        cumsum = np.concatenate(([0.0], np.cumsum(data)))
+        starts = np.arange(n_windows) * step
+        sums = cumsum[starts + width] - cumsum[starts]
+
+    if aligned:
+        result[width - 1::step][: len(sums)] = sums
+    else:
+        result[: len(sums)] = sums
+    return result
+
+
+def calc_half_periods(data, aligned: bool = False) -> np.ndarray:
+    """periods of every second time: 1+2, 3+4, ... (NaN padded float array, see window_sums for aligned)"""
+    return window_sums(data, 2, step=2, aligned=aligned)
+
+
+def calc_half_periods_v2(data, aligned: bool = False) -> np.ndarray:
+    """periods of every time with the next time: 1+2, 2+3, 3+4, ... (NaN padded float array, see window_sums for aligned)"""
+    return window_sums(data, 2, step=1, aligned=aligned)
+
+
+def periods_frame(times, aligned: bool = False) -> pd.DataFrame:
+    """
+    raw data table with the three counting types (float64 columns)
+
+    @params:
+        aligned: if True, every row is one lap and the half periods are in the row of the lap that completes them
+        (layout of the raw data file of time_stop)
+    """
+    times = np.asarray(times, dtype=float)
+    return pd.DataFrame(dict(zip(PERIODS_COLUMNS, (times, calc_half_periods(times, aligned), calc_half_periods_v2(times, aligned)))))
+
+
+### amplitude functions
+@cache
+def T_sin_coefficients(order: int) -> np.ndarray:
+    """
+    coefficients c_n of T/T_0 = sum_n c_n * sin(phi/2)^(2n) for n = 0, ..., order
+
+    c_n = ((2n)! / (2^(2n) * (n!)^2))^2, e.g. 1, 1/4, 9/64, 25/256, ...
+    """
+    coefficients = np.ones(order + 1)
+    for n in range(1, order + 1):
+        coefficients[n] = coefficients[n - 1] * ((2 * n - 1) / (2 * n)) ** 2
+    coefficients.setflags(write=False)
+    return coefficients
+
+
+def T_sin(grad: Union[list[float], float], order: Optional[int] = 2):
+    """
+    function for period durations normed with period duration of 5 degree
+
+    @param:
+        grad: array-like object with degrees or one single degree
+        order: highest power of sin(phi/2)^2 of the series (2 for the series up to sin(phi/2)^4), None for the exact
+        period duration with the arithmetic-geometric mean (T/T_0 = 1/AGM(1, cos(phi/2)))
+    """
+    phi = np.pi/180 * np.asarray(grad, dtype=float)
+    if order is None:
+        return 1 / agm(np.ones_like(phi), np.cos(phi/2))
+    # Horner scheme in sin(phi/2)^2
+    return np.polynomial.polynomial.polyval(np.sin(phi/2)**2, T_sin_coefficients(order))
+
+
+def agm(a, b, rtol: float = 1e-15) -> np.ndarray:
+    """vectorized arithmetic-geometric mean (quadratic convergence, a few iterations for every amplitude)"""
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    a, b = a.copy(), b.copy()
+    # at most 64 iterations, also for values without convergence (e.g. NaN)
+    for _ in range(64):
+        a, b = (a + b) / 2, np.sqrt(a * b)
+        if np.all(np.abs(a - b) <= rtol * np.abs(a)):
+            break
+    return a
@@ -1,87 +1,52 @@
 import math
 import os
-import sys
-from contextlib import contextmanager
-from typing import Union
+from typing import Optional, Union
 
 import gin
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from kafe2 import Fit, XYContainer
-from scipy.special import j1
 
+from IMP_utils_py.config.configurables import gin_process_pool
 from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.data_cache import cached_read
+from IMP_utils_py.physics.decimation import adaptive_sample, reduce_points
+from IMP_utils_py.physics.fitting import FitResult, fit_model
+from IMP_utils_py.physics.measurement import (MEASUREMENT_SUFFIX,
+                                              is_measurement, read_measurement)
+# the model functions and weighted_average are still importable from plotting
+from IMP_utils_py.physics.models import (Model, O8_bessel_function,
+                                         O11_Rs_Rp_model, constant_model,
+                                         get_model, linear_model,
+                                         linear_zero_model, model_types)
+from IMP_utils_py.physics.rendering import render_figure
+from IMP_utils_py.physics.statistics import weighted_average
 
 ### logging setup
 logger = setup_logger()
 
-
-### model functions
-def constant_model(x, a=1.0):
-    """y = a"""
-    return a
-
-
-def linear_zero_model(x, a=1.0):
-    """y = a * x"""
-    return a * x
-
-
-def linear_model(x, a=1.0, b=0.0):
-    """y = a * x + b"""
-    return a * x + b
-
-
-def weighted_average(y: pd.Series, y_error: pd.Series) -> tuple:
-    """
-    function to calculate weighted average of y values
-    @params: if y_error = None, mean and std of y will be returned. Otherwise, the weighted average with its error
-    """
-    if y_error is None:
-        w_avg = np.mean(y)
-        dw_avg = np.std(y)
-    else:
-        if 0 in list(y_error):
-            raise ValueError("found 0 in y_error -> cannot calculate weighted average")
-        w_avg = sum([y[i] / y_error[i] ** 2 for i in range(len(y))]) / sum([1 / y_error[i] ** 2 for i in range(len(y))])
-        dw_avg = 1 / np.sqrt(sum([1 / y_error[i] ** 2 for i in range(len(y))]))
-
-    return w_avg, dw_avg
-
-
-### special function for Grundpraktikum
-@gin.configurable
-def O11_Rs_Rp_model(alpha_e: float, n1: float, n2: float) -> tuple:
-    """
-    alpha_g = arcsin(n1/n2 * sin(alpha_e))
-    sqrt(R_s) = sqrt(sin^2(alpha_e - alpha_g) / sin^2(alpha_e + alpha_g))
-    sqrt(R_p) = sqrt(tan^2(alpha_e - alpha_g) / tan^2(alpha_e + alpha_g))
-    """
-    alpha_e = alpha_e * np.pi/180 # from degrees to radian
-    alpha_g = np.arcsin(np.sin(alpha_e)*n1/n2) # Brechungsgesetz
-    sqrt_R_s = np.sqrt(np.sin(alpha_e - alpha_g)**2 / np.sin(alpha_e + alpha_g)**2)
-    sqrt_R_p = np.sqrt(np.tan(alpha_e - alpha_g)**2 / np.tan(alpha_e + alpha_g)**2)
-    return sqrt_R_s, sqrt_R_p
-
-def O8_bessel_function(x, I0, G, IB = 0.008, x0=8):
-    if x0 in x:
-        return I0 + IB
-    return 4 * I0 * (j1(G * (x - x0))/(G * (x - x0)))**2 +IB
-
 ### helper functions
-def read_data(data_path: str) -> pd.DataFrame:
-    """read data as pandas DataFrame from path"""
+def parse_data(data_path: str) -> pd.DataFrame:
+    """parse csv/excel/measurement file as pandas DataFrame"""
     if data_path.split(".")[-1] == "csv":
         data = pd.read_csv(data_path, index_col=0)
     elif data_path.split(".")[-1] == "xlsx":
         data = pd.read_excel(data_path)
+    elif is_measurement(data_path):
+        data = read_measurement(data_path)
     else:
-        raise ValueError(f"raw data path '{data_path}' file format is not supported -> use .csv or .xlsx")
+        raise ValueError(f"raw data path '{data_path}' file format is not supported -> use .csv, .xlsx or {MEASUREMENT_SUFFIX}")
 
     return data
 
 
+def read_data(data_path: str) -> pd.DataFrame:
+    """read data as pandas DataFrame from path (cached, see data_cache.cached_read; measurement files are memory-mapped instead)"""
+    if is_measurement(data_path):
+        # already binary, a cache would only copy the data
+        return read_measurement(data_path)
+    return cached_read(data_path, parse_data)
+
+
 def get_best_divider(number: float, possible_divider: list = list(range(5, 13))) -> int:
     """
     get best divider of a number out of a given list of possible divider
@@ -149,18 +114,6 @@ def signif_down(x, digits=2) -> float:
     return int(x * 10**digits) / 10**digits
 
 
-@contextmanager
-def suppress_stdout():
-    """function to suppress console output"""
-    with open(os.devnull, "w") as devnull:
-        old_stdout = sys.stdout
-        sys.stdout = devnull
-        try:
-            yield
-        finally:
-            sys.stdout = old_stdout
-
-
 ### specific helper functions
 def get_max_length(
     data: pd.DataFrame, max_x_ticks: Union[str, float, int], x_column: list
@@ -221,103 +174,115 @@ def get_x_ticks_number(
     return x_ticks_number
 
 
-def get_model_errorbar(model_type: str, y_column: str) -> callable:
-    """function to select the errorbar model based on the model_type parameter"""
-    if model_type == "linear_zero":
-        model = linear_zero_model
-        logger.debug(f"selected linear_zero model ({y_column})")
-    elif model_type == "linear":
-        model = linear_model
-        logger.debug(f"selected linear model ({y_column})")
-    elif model_type == "constant":
-        model = constant_model
-        logger.debug(f"selected constant model ({y_column})")
-    elif model_type == "weighted_average":
-        model = weighted_average
-        logger.debug(f"selected weighted_average model ({y_column})")
-    elif model_type == "O11_Rs":
-        model = O11_Rs_Rp_model
-        logger.debug(f"selected O11_Rs model ({y_column})")
-    elif model_type == "O11_Rp":
-        model = O11_Rs_Rp_model
-        logger.debug(f"selected O11_Rp model ({y_column})")
-    elif model_type == "O8_bessel":
-        model = O8_bessel_function
-        logger.debug(f"selected O8_bessel model ({y_column})")
-    elif model_type == "none":
-        model = None
-        logger.debug(f"no model ({y_column})")
-    else:
-        raise ValueError(f"Model '{model_type}' ist not supported -> choose 'linear_zero', 'linear', 'constant', 'weighted_average', or 'none'")
-
-    return model
-
-
-def get_model_residual(model_type: str) -> callable:
-    """function to select the residual model based on the model_type parameter"""
-    if model_type == "linear_zero":
-        model = linear_zero_model
-        logger.debug("selected linear_zero model")
-    elif model_type == "linear":
-        model = linear_model
-        logger.debug("selected linear model")
-    elif model_type == "constant":
-        model = constant_model
-        logger.debug("selected constant model")
-    elif model_type == "weighted_average":
-        model = weighted_average
-        logger.debug(f"selected weighted_average model")
-    else:
-        raise ValueError(f"Model '{model_type}' ist not supported -> choose 'linear_zero', 'linear', 'constant', or 'weighted_average'")
+def fit_series(x, y, dx, dy, model_type: str, y_column: str) -> Optional[FitResult]:
+    """
+    function to fit the model of one y-value set (top-level function to be usable in a process pool)
 
-    return model
+    @return: fit result or None if the model has no fit parameters
+    """
+    model = get_model(model_type)
+    logger.debug(f"selected {model_type} model ({y_column})")
+    if not model.fittable:
+        return None
+    if model.fit is not None:
+        return model.fit(x, y, dx, dy)
+    initial_values = model.initial_values(x, y) if model.initial_values is not None else None
+    # closed-form fit for linear/linear_zero/constant without x errors, otherwise kafe2
+    return fit_model(
+        x, y, dx, dy, model.closed_form or model_type, model.function, model.parameter_limits, initial_values
+    )
 
 
-### command functions
-@gin.configurable
-def errorbar_plot(
-    data_path: str,
-    graphic_path: str,
+def needs_kafe2(model: Model, dx) -> bool:
+    """True if the model is fitted with kafe2 (slow, worth a process pool)"""
+    return model.fittable and model.fit is None and (model.closed_form is None or dx is not None)
+
+
+def fit_all_series(series: list, model_type: list, y_column: list, max_workers: int) -> list[Optional[FitResult]]:
+    """
+    function to fit all y-value sets (series: list of (x, y, dx, dy) tuples)
+
+    The closed-form fits are fast and run in this process. With max_workers > 1, the kafe2 fits (nonlinear or with x errors) run in
+    a process pool, because kafe2/iminuit hold the GIL.
+    """
+    fit_results = [None] * len(series)
+    pool_idx = [idx for idx in range(len(series)) if needs_kafe2(get_model(model_type[idx]), series[idx][2])]
+    # more processes than CPU cores only add start-up time
+    max_workers = min(max_workers, len(pool_idx), os.cpu_count() or 1)
+    if max_workers <= 1:
+        pool_idx = []
+
+    for idx in range(len(series)):
+        if idx not in pool_idx:
+            fit_results[idx] = fit_series(*series[idx], model_type[idx], y_column[idx])
+
+    if pool_idx:
+        logger.info(f"fit {len(pool_idx)} y-value sets with {max_workers} processes")
+        with gin_process_pool(max_workers) as executor:
+            # numpy arrays instead of pandas Series to keep the data transfer small
+            futures = {
+                idx: executor.submit(
+                    fit_series,
+                    *[None if values is None else np.asarray(values, dtype=float) for values in series[idx]],
+                    model_type[idx],
+                    y_column[idx],
+                )
+                for idx in pool_idx
+            }
+            for idx, future in futures.items():
+                fit_results[idx] = future.result()
+
+    return fit_results
+
+
+### errorbar helper functions
+# colors for y-value fits
+ERRORAREAS_COLORS = [
+    "lightblue",
+    "lightgreen",
+    "mistyrose",
+    "thistle",
+    "lightcyan",
+    "peachpuff",
+    "khaki",
+    "lightgrey",
+]
+MODEL_COLORS = [
+    "steelblue",
+    "yellowgreen",
+    "lightcoral",
+    "plum",
+    "paleturquoise",
+    "orange",
+    "yellow",
+    "darkgrey",
+]
+ERRORBAR_COLORS = [
+    "blue",
+    "green",
+    "red",
+    "magenta",
+    "cyan",
+    "darkorange",
+    "gold",
+    "dimgrey",
+]
+
+
+def get_errorbar_columns(
     x_column: Union[str, list],
     x_error_column: Union[str, list],
     y_column: Union[str, list],
     y_plot_label: Union[str, list],
     y_error_column: Union[str, list],
-    title: str,
-    x_label: str,
-    y_label: str,
-    x_ticks_number: Union[str, int],
-    min_x_ticks: Union[str, float, int],
-    max_x_ticks: Union[str, float, int],
     model_type: Union[str, list],
     show_model_error: Union[bool, list],
-    extra_log: bool,
-    y_scale: str,
-):
+) -> tuple[list, list, list, list, list, list, list]:
     """
-    @params (str or list[str]):
-        data_path: location of the csv/excel file with the data
-        graphic_path: location for the png of the plot
-        x_column: column name for x values
-        x_error_column: column name for x value errors
-        y_column: column name for y values
-        y_plot_label: label for y-plot
-        y_error_column: column name for y value errors
-        model_type: 'linear' (y = m*x + n) / 'linear_zero' (y = m*x) / 'constant' (y = n) / 'weighted_average' (y = w_avg) / 'none' (no model will be shown) / 'O11_Rs' or 'O11_Rp' for specific graphs from Experiment O11 / 'O8_bessel' specific graphs from Experiment O8
-        min_x_ticks: 'auto' or float/int
-        max_x_ticks: 'auto' or float/int
-        x_ticks_number: 'auto' or int
-        show_model_error: if True, the y error of the model will be shown as light colored area
-        y_scale: can be 'linear' or 'log' for logarithmic scale
+    function to convert the column parameters of the errorbar plots to lists with one entry per y-value set
 
-    @output:
-        plot saved in graphic_path and errors in console
-
-    @Note: max 8 y-value sets
+    @return: x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error
     """
-    # load data
-    data = read_data(data_path)
-
     # convert string input to list of string
     if type(y_column) == str:
         y_column = [y_column]
@@ -337,15 +302,6 @@ def errorbar_plot(
     if type(x_error_column) == str:
         x_error_column = [x_error_column]
 
-    # max value on x-axes
-    max_length = get_max_length(data, max_x_ticks, x_column)
-
-    # min value on x-axes
-    min_length = get_min_length(data, min_x_ticks, x_column)
-
-    # number of ticks on x-axes
-    x_ticks_number = get_x_ticks_number(x_ticks_number, max_length, min_length)
-
     # if 1 x-value and multiple y-values
     if len(x_column) == len(x_error_column) == 1 and len(y_column) > 1:
         x_column = x_column * len(y_column)
@@ -374,145 +330,110 @@ def errorbar_plot(
     # replace empty strings with None in y_plot_label
     y_plot_label = [None if elem == "" else elem for elem in y_plot_label]
 
-    fig = plt.figure()
-    ax = fig.add_subplot()
-
-    # colors for y-value fits
-    ERRORAREAS_COLORS = [
-        "lightblue",
-        "lightgreen",
-        "mistyrose",
-        "thistle",
-        "lightcyan",
-        "peachpuff",
-        "khaki",
-        "lightgrey",
-    ]
-    MODEL_COLORS = [
-        "steelblue",
-        "yellowgreen",
-        "lightcoral",
-        "plum",
-        "paleturquoise",
-        "orange",
-        "yellow",
-        "darkgrey",
-    ]
-    ERRORBAR_COLORS = [
-        "blue",
-        "green",
-        "red",
-        "magenta",
-        "cyan",
-        "darkorange",
-        "gold",
-        "dimgrey",
-    ]
+    return x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error
 
-    for y_idx in range(len(y_column)):
-        data.sort_values(by=[x_column[y_idx]])
 
+def get_errorbar_series(data: pd.DataFrame, x_column: list, x_error_column: list, y_column: list, y_error_column: list) -> list[tuple]:
+    """function to get the x/y values and errors of every y-value set as (x, y, dx, dy) tuples (None for no error column)"""
+    series = []
+    for y_idx in range(len(y_column)):
         x = data[x_column[y_idx]]
-        if x_error_column[y_idx] != "":
-            dx = data[x_error_column[y_idx]]
-        else:
-            dx = None
-
+        dx = data[x_error_column[y_idx]] if x_error_column[y_idx] != "" else None
         y = data[y_column[y_idx]]
-        if y_error_column[y_idx] != "":
-            dy = data[y_error_column[y_idx]]
-        else:
-            dy = None
+        dy = data[y_error_column[y_idx]] if y_error_column[y_idx] != "" else None
+        series.append((x, y, dx, dy))
+
+    return series
+
+
+def get_model_curve(f: callable, x_min: float, x_max: float, adaptive: bool) -> tuple[np.ndarray, np.ndarray]:
+    """function to get the x/y values to draw the model f (1000 equidistant points or adaptive sampling based on the curvature)"""
+    if adaptive:
+        return adaptive_sample(f, x_min, x_max)
+    x_intervall = np.linspace(x_min, x_max, 1000)
+    return x_intervall, np.broadcast_to(f(x_intervall), x_intervall.shape)
+
+
+def log_fit_result(model: Model, fit_result: FitResult, y_column: str, extra_log: bool):
+    """function to log the fit parameters with their errors (and the zero point of lines if extra_log is True)"""
+    if model.chi2_label is not None and fit_result.ndf > 0 and np.isfinite(fit_result.chi2):
+        logger.info(f"{model.chi2_label} ({y_column}): {fit_result.chi2 / fit_result.ndf}")
+    labels = model.parameter_labels or {}
+    for name, value, error in zip(model.parameter_names, fit_result.parameter_values, fit_result.parameter_errors):
+        value_label, error_label = labels.get(name, (name, f"Unsicherheit {name}"))
+        logger.info(f"{value_label} ({y_column}): {value}")
+        logger.info(f"{error_label} ({y_column}): {error}")
+
+    if extra_log and model.line is not None and None not in model.line:
+        m, dm, n, dn = model.line_parameters(fit_result)
+        zero_point = -n / m
+        dzero_point = np.sqrt(
+            (1 / m * dn) ** 2 + (n / m**2 * dm) ** 2
+        )
+        logger.info(f"Nullstelle der Gerade  ({y_column}): {zero_point}")
+        logger.info(f"Unsicherheit der Nullstelle der Gerade  ({y_column}): {dzero_point}")
+
+
+def draw_errorbar_series(
+    ax,
+    series: list,
+    fit_results: list,
+    model_type: list,
+    y_column: list,
+    y_plot_label: list,
+    show_model_error: list,
+    extra_log: bool,
+    min_length: float,
+    max_length: float,
+    decimation: str = "none",
+    max_points: int = 2000,
+):
+    """
+    function to draw the data and the fitted models of all y-value sets on ax and log the fit parameters
 
-        # select model based on model_type
-        model = get_model_errorbar(model_type[y_idx], y_column[y_idx])
+    @params:
+        decimation: 'none' draws every point and samples the models at 1000 points, otherwise every y-value set with
+        more than max_points points is reduced with this method (see reduce_points) and the models are sampled
+        adaptively
+    """
+    adaptive = decimation != "none"
+    for y_idx in range(len(y_column)):
+        x, y, dx, dy = series[y_idx]
+        model = get_model(model_type[y_idx])
+        fit_result = fit_results[y_idx]
 
         # if a model was selected
-        if model is not None:
-            if model_type[y_idx] == "weighted_average":
-                n, dn = weighted_average(y, dy)
-            elif model_type[y_idx] in ("O11_Rs", "O11_Rp"):
-                pass
-            else:
-                ### kafe2 calculation
-                xy_data = XYContainer(x, y)
-                if dx is not None:
-                    xy_data.add_error("x", dx)
-                if dy is not None:
-                    xy_data.add_error("y", dy)
-
-                # to suppress warning when model_type = 'constant'
-                with suppress_stdout():
-                    my_fit = Fit(xy_data, model)
-                    if model_type[y_idx] == "O8_bessel":
-                        my_fit.limit_parameter("I0", 0, np.inf)
-                        my_fit.limit_parameter("x0", 0, np.inf)
-                        my_fit.limit_parameter("IB", 0, np.inf)
-                        my_fit.limit_parameter("G", 0, 2) # just a value that worked good
-                    my_fit.do_fit()
-                model_params = my_fit.parameter_values
-                model_params_error = my_fit.parameter_errors
-
-            # fit values
-            if model_type[y_idx] in ("linear", "linear_zero"):
-                m = model_params[0]
-                dm = model_params_error[0]
-                n = 0
-                dn = 0
-                logger.info(f"Steigung der Gerade ({y_column[y_idx]}): {m}")
-                logger.info(f"Unsicherheit der Steigung ({y_column[y_idx]}): {dm}")
-                if model_type[y_idx] == "linear":
-                    n = model_params[1]
-                    dn = model_params_error[1]
-                    logger.info(f"y-Achsenschnitt der Gerade ({y_column[y_idx]}): {n}")
-                    logger.info(f"Unsicherheit des y-Achsenschnitt ({y_column[y_idx]}): {dn}")
-                    if extra_log:
-                        zero_point = -n / m
-                        dzero_point = np.sqrt(
-                            (1 / m * dn) ** 2 + (n / m**2 * dm) ** 2
-                        )
-                        logger.info(f"Nullstelle der Gerade  ({y_column[y_idx]}): {zero_point}")
-                        logger.info(f"Unsicherheit der Nullstelle der Gerade  ({y_column[y_idx]}): {dzero_point}")
-            elif model_type[y_idx] in ("constant", "weighted_average"):
-                m = 0
-                dm = 0
-                if model_type[y_idx] == "constant":
-                    n = model_params[0]
-                    dn = model_params_error[0]
-                logger.info(f"y-Achsenschnitt der Gerade ({y_column[y_idx]}): {n}")
-                logger.info(f"Unsicherheit des y-Achsenschnitt ({y_column[y_idx]}): {dn}")
-            elif model_type[y_idx] == "O8_bessel":
-                a = model_params[0]
-                da = model_params_error[0]
-                b = model_params[1]
-                db = model_params_error[1]
-                c = model_params[2]
-                dc = model_params_error[2]
-                d = model_params[3]
-                dd = model_params_error[3]
-                logger.info(f"I0  ({y_column[y_idx]}): {a}")
-                logger.info(f"Unsicherheit I0 ({y_column[y_idx]}): {da}")
-                logger.info(f"G ({y_column[y_idx]}): {b}")
-                logger.info(f"Unsicherheit G ({y_column[y_idx]}): {db}")
-                logger.info(f"IB ({y_column[y_idx]}): {c}")
-                logger.info(f"Unsicherheit IB ({y_column[y_idx]}): {dc}")
-                logger.info(f"x0 ({y_column[y_idx]}): {d}")
-                logger.info(f"Unsicherheit x0 ({y_column[y_idx]}): {dd}")
+        if model.function is not None:
+            if fit_result is not None:
+                log_fit_result(model, fit_result, y_column[y_idx], extra_log)
 
             # add graphs to plot
-            x_intervall = np.linspace(min_length, max_length, 1000)
-
-            if model_type[y_idx] == "O11_Rs":
-                ax.plot(x_intervall, model(x_intervall)[0], "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
-            elif model_type[y_idx] == "O11_Rp":
-                ax.plot(x_intervall, model(x_intervall)[1], "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
-            elif model_type[y_idx] == "O8_bessel":
-                ax.plot(x_intervall, model(x_intervall, a, b, c, d), "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
+            if model.line is None:
+                parameter_values = () if fit_result is None else fit_result.parameter_values
+                x_intervall, y_intervall = get_model_curve(
+                    lambda x: model.evaluate(x, parameter_values), min_length, max_length, adaptive
+                )
+                ax.plot(x_intervall, y_intervall, "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
+
+                # colored areas for y-errors (from the parameter covariance)
+                if show_model_error[y_idx] and fit_result is not None:
+                    y_error = model.error(x_intervall, fit_result)
+                    if y_error is None:
+                        logger.warning(f"the model ({y_plot_label[y_idx]}) has no jacobian -> no y-error areas will be shown")
+                    else:
+                        ax.fill_between(
+                            x_intervall,
+                            y_intervall - y_error,
+                            y_intervall + y_error,
+                            alpha=0.2,
+                            color=ERRORAREAS_COLORS[y_idx % len(ERRORAREAS_COLORS)],
+                        )
             else:
+                m, dm, n, dn = model.line_parameters(fit_result)
                 # not below zero fit line if decreasing
-                if m < 0:
-                    x_intervall = np.linspace(min_length, min(max_length, -n / m), 1000)
-                ax.plot(x_intervall, m * x_intervall + n, "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
+                x_end = min(max_length, -n / m) if m < 0 else max_length
+                x_intervall, y_intervall = get_model_curve(lambda x: m * x + n, min_length, x_end, adaptive)
+                ax.plot(x_intervall, y_intervall, "--", color=MODEL_COLORS[y_idx % len(MODEL_COLORS)],)
                 logger.debug(f"added {model_type[y_idx]} fit ({y_plot_label[y_idx]})")
 
                 # colored areas for y-errors
@@ -546,7 +467,8 @@ def errorbar_plot(
         else:
             logger.info(f"Fits are deactivated ({y_column[y_idx]})")
 
-        plt.errorbar(
+        x, y, dx, dy = reduce_points(x, y, dx, dy, decimation, max_points)
+        ax.errorbar(
             x,
             y,
             yerr=dy,
@@ -559,19 +481,252 @@ def errorbar_plot(
             color=ERRORBAR_COLORS[y_idx % len(ERRORBAR_COLORS)],
         )
 
-    # legend settings
-    ax.set_xticks(np.linspace(min_length, max_length, x_ticks_number))
-    ax.set_title(title)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel(y_label)
-    ax.set_yscale(y_scale)
-    if not all(v is None for v in y_plot_label):
-        ax.legend()
 
-    # if y-axes values are long numbers, the y-label is cut off. Has to be tested if always best solution for this.
-    fig.subplots_adjust(left=0.15)
+def evaluate_fit(model_type: str, fit_result: Optional[FitResult], x) -> Optional[np.ndarray]:
+    """function to calculate the values of the fitted model at x (None if no model is selected)"""
+    model = get_model(model_type)
+    if model.function is None:
+        return None
+    return model.evaluate(x, () if fit_result is None else fit_result.parameter_values)
+
+
+def get_residuals(x, y, dx, dy, model_type: str, fit_result: Optional[FitResult]) -> tuple:
+    """
+    function to calculate the residuals (y - model) and pulls (residual / total uncertainty) of one y-value set
+
+    The x-errors are added to the uncertainty of the pulls with the slope of the model (effective variance).
+
+    @return: tuple (residuals, pulls) with None for residuals if no model is selected and None for pulls without errors
+    """
+    x = np.asarray(x, dtype=float)
+    model_values = evaluate_fit(model_type, fit_result, x)
+    if model_values is None:
+        return None, None
+    residuals = np.asarray(y, dtype=float) - model_values
+    if dx is None is dy:
+        return residuals, None
+
+    variance = np.zeros_like(x) if dy is None else np.asarray(dy, dtype=float) ** 2
+    if dx is not None:
+        # central difference quotient as slope of the model
+        h = 1e-6 * np.maximum(np.abs(x), 1)
+        slope = (evaluate_fit(model_type, fit_result, x + h) - evaluate_fit(model_type, fit_result, x - h)) / (2 * h)
+        variance = variance + (slope * np.asarray(dx, dtype=float)) ** 2
+    pulls = np.full_like(residuals, np.nan)
+    np.divide(residuals, np.sqrt(variance), out=pulls, where=variance > 0)
+    return residuals, pulls
+
+
+### command functions
+@gin.configurable
+def errorbar_plot(
+    data_path: str,
+    graphic_path: str,
+    x_column: Union[str, list],
+    x_error_column: Union[str, list],
+    y_column: Union[str, list],
+    y_plot_label: Union[str, list],
+    y_error_column: Union[str, list],
+    title: str,
+    x_label: str,
+    y_label: str,
+    x_ticks_number: Union[str, int],
+    min_x_ticks: Union[str, float, int],
+    max_x_ticks: Union[str, float, int],
+    model_type: Union[str, list],
+    show_model_error: Union[bool, list],
+    extra_log: bool,
+    y_scale: str,
+    max_workers: int = 1,
+    decimation: str = "none",
+    max_points: int = 2000,
+):
+    """
+    @params (str or list[str]):
+        data_path: location of the csv/excel file with the data
+        graphic_path: location for the png of the plot
+        x_column: column name for x values
+        x_error_column: column name for x value errors
+        y_column: column name for y values
+        y_plot_label: label for y-plot
+        y_error_column: column name for y value errors
+        model_type: 'linear' (y = m*x + n) / 'linear_zero' (y = m*x) / 'constant' (y = n) / 'weighted_average' (y = w_avg) / 'none' (no model will be shown) / 'O11_Rs' or 'O11_Rp' for specific graphs from Experiment O11 / 'O8_bessel' specific graphs from Experiment O8 / other registered model types (see models.get_model)
+        min_x_ticks: 'auto' or float/int
+        max_x_ticks: 'auto' or float/int
+        x_ticks_number: 'auto' or int
+        show_model_error: if True, the y error of the model will be shown as light colored area
+        y_scale: can be 'linear' or 'log' for logarithmic scale
+        max_workers: number of processes for the nonlinear fits (e.g. 'O8_bessel') of multiple y-value sets (1 for no parallel fits)
+        decimation: 'none' (draw every point) / 'lttb' / 'min_max' / 'bin' to draw at most max_points points per y-value set (the fits always use all points)
+        max_points: max number of drawn points per y-value set if decimation is not 'none'
+
+    @output:
+        plot saved in graphic_path and errors in console
+
+    @Note: max 8 y-value sets
+    """
+    # load data
+    data = read_data(data_path)
+
+    x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error = get_errorbar_columns(
+        x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error
+    )
+
+    # max value on x-axes
+    max_length = get_max_length(data, max_x_ticks, x_column)
+
+    # min value on x-axes
+    min_length = get_min_length(data, min_x_ticks, x_column)
+
+    # number of ticks on x-axes
+    x_ticks_number = get_x_ticks_number(x_ticks_number, max_length, min_length)
+
+    series = get_errorbar_series(data, x_column, x_error_column, y_column, y_error_column)
+
+    # fit all y-value sets before drawing (nonlinear fits run in parallel if max_workers > 1)
+    fit_results = fit_all_series(series, model_type, y_column, max_workers)
+
+    with render_figure(graphic_path) as fig:
+        ax = fig.add_subplot()
+        draw_errorbar_series(
+            ax,
+            series,
+            fit_results,
+            model_type,
+            y_column,
+            y_plot_label,
+            show_model_error,
+            extra_log,
+            min_length,
+            max_length,
+            decimation,
+            max_points,
+        )
+
+        # legend settings
+        ax.set_xticks(np.linspace(min_length, max_length, x_ticks_number))
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        ax.set_yscale(y_scale)
+        if not all(v is None for v in y_plot_label):
+            ax.legend()
+
+        # if y-axes values are long numbers, the y-label is cut off. Has to be tested if always best solution for this.
+        fig.subplots_adjust(left=0.15)
+
+    logger.info("plot saved")
+
+
+@gin.configurable
+def errorbar_residual_plot(
+    data_path: str,
+    graphic_path: str,
+    x_column: Union[str, list],
+    x_error_column: Union[str, list],
+    y_column: Union[str, list],
+    y_plot_label: Union[str, list],
+    y_error_column: Union[str, list],
+    title: str,
+    x_label: str,
+    y_label: str,
+    x_ticks_number: Union[str, int],
+    min_x_ticks: Union[str, float, int],
+    max_x_ticks: Union[str, float, int],
+    model_type: Union[str, list],
+    show_model_error: Union[bool, list],
+    extra_log: bool,
+    y_scale: str,
+    residual_label: str = "Residuen",
+    show_pulls: bool = True,
+    pull_label: str = "Pulls",
+    max_workers: int = 1,
+    decimation: str = "none",
+    max_points: int = 2000,
+):
+    """
+    errorbar plot with residual panel (and pull panel) below, both from the same fit of every y-value set
+
+    @params:
+        same as errorbar_plot (all model types are supported, decimation is also used for the residuals and pulls)
+        residual_label: y label of the residual panel
+        show_pulls: if True, a third panel with the pulls (residual / total uncertainty) is shown
+        pull_label: y label of the pull panel
+
+    @output:
+        plot saved in graphic_path and errors in console
+    """
+    # load data
+    data = read_data(data_path)
+
+    x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error = get_errorbar_columns(
+        x_column, x_error_column, y_column, y_plot_label, y_error_column, model_type, show_model_error
+    )
+
+    # max value on x-axes
+    max_length = get_max_length(data, max_x_ticks, x_column)
+
+    # min value on x-axes
+    min_length = get_min_length(data, min_x_ticks, x_column)
+
+    # number of ticks on x-axes
+    x_ticks_number = get_x_ticks_number(x_ticks_number, max_length, min_length)
+
+    series = get_errorbar_series(data, x_column, x_error_column, y_column, y_error_column)
+
+    # fit all y-value sets before drawing (nonlinear fits run in parallel if max_workers > 1)
+    fit_results = fit_all_series(series, model_type, y_column, max_workers)
+
+    n_panels = 3 if show_pulls else 2
+    with render_figure(graphic_path, figsize=(6.4, 4.8 + 1.6 * (n_panels - 1))) as fig:
+        axes = fig.subplots(n_panels, 1, sharex=True, gridspec_kw={"height_ratios": [3, 1, 1][:n_panels]})
+        draw_errorbar_series(
+            axes[0],
+            series,
+            fit_results,
+            model_type,
+            y_column,
+            y_plot_label,
+            show_model_error,
+            extra_log,
+            min_length,
+            max_length,
+            decimation,
+            max_points,
+        )
+
+        for y_idx, (x, y, dx, dy) in enumerate(series):
+            residuals, pulls = get_residuals(x, y, dx, dy, model_type[y_idx], fit_results[y_idx])
+            if residuals is None:
+                continue
+
+            color = ERRORBAR_COLORS[y_idx % len(ERRORBAR_COLORS)]
+            x_drawn, residuals, dx_drawn, dy_drawn = reduce_points(x, residuals, dx, dy, decimation, max_points)
+            axes[1].errorbar(x_drawn, residuals, yerr=dy_drawn, xerr=dx_drawn, linestyle="None", marker=".", elinewidth=0.5, capsize=3, color=color)
+            if show_pulls:
+                if pulls is None:
+                    logger.warning(f"no errors for y-value set ({y_column[y_idx]}) -> no pulls will be shown")
+                else:
+                    x_drawn, pulls, _, _ = reduce_points(x, pulls, None, None, decimation, max_points)
+                    axes[2].scatter(x_drawn, pulls, s=10, color=color)
+
+        for ax in axes[1:]:
+            ax.axhline(0, linestyle="--", color="k", linewidth=1)
+
+        # legend settings
+        axes[-1].set_xticks(np.linspace(min_length, max_length, x_ticks_number))
+        axes[0].set_title(title)
+        axes[0].set_ylabel(y_label)
+        axes[0].set_yscale(y_scale)
+        axes[1].set_ylabel(residual_label)
+        if show_pulls:
+            axes[2].set_ylabel(pull_label)
+        axes[-1].set_xlabel(x_label)
+        if not all(v is None for v in y_plot_label):
+            axes[0].legend()
+
+        fig.subplots_adjust(left=0.15, hspace=0.08)
 
-    fig.savefig(graphic_path)
     logger.info("plot saved")
 
 
@@ -599,7 +754,7 @@ def residual_plot(
         x_error_column: column name for x value errors
         y_column: column name for y values
         y_error_column: column name for y value errors
-        model_type: 'linear' (y = m*x + n) / 'linear_zero' (y = m*x) / 'constant' (y = n) / 'weighted_average' (y = w_avg)
+        model_type: 'linear' (y = m*x + n) / 'linear_zero' (y = m*x) / 'constant' (y = n) / 'weighted_average' (y = w_avg) / 'O8_bessel' or any other model type with fit parameters (see models.MODELS)
         min_x_ticks: 'auto' or float/int
         max_x_ticks: 'auto' or float/int
         x_ticks_number: 'auto' or int
@@ -608,7 +763,9 @@ def residual_plot(
     """
 
     # select model based on model_type
-    model = get_model_residual(model_type)
+    model = get_model(model_type)
+    if not model.fittable:
+        raise ValueError(f"Model '{model_type}' has no fit parameters -> choose {', '.join(repr(name) for name in model_types(fittable=True))}")
 
     # load data
     data = read_data(data_path)
@@ -635,54 +792,23 @@ def residual_plot(
     # number of ticks on x-axes
     x_ticks_number = get_x_ticks_number(x_ticks_number, max_length, min_length)
 
-    fig = plt.figure()
-    ax = fig.add_subplot()
+    # calculate residuals
+    fit_result = fit_series(x, y, dx, dy, model_type, y_column)
+    residuals = y - model.evaluate(x, fit_result.parameter_values)
 
-    if model_type == "weighted_average":
-        m, _ = weighted_average(y, dy)
-    else:
-        ### kafe2 calculation
-        xy_data = XYContainer(x, y)
-        if dx is not None:
-            xy_data.add_error("x", dx)
-        if dy is not None:
-            xy_data.add_error("y", dy)
-
-        # to suppress warning when model_type = 'constant'
-        with suppress_stdout():
-            my_fit = Fit(xy_data, model)
-            my_fit.do_fit()
-        model_params = my_fit.parameter_values
-
-        m = model_params[0]
-        if model_type == "linear":
-            n = model_params[1]
+    with render_figure(graphic_path) as fig:
+        ax = fig.add_subplot()
+
+        # add graphs to plot
+        ax.scatter(x, residuals, s=10)
+        x_intervall = np.linspace(min_length, max_length, 1000)
+        ax.plot(x_intervall, 0 * x_intervall, "--k", linewidth=1)
+
+        # legend settings
+        ax.set_xticks(np.linspace(min_length, max_length, x_ticks_number))
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
+        fig.subplots_adjust(left=0.15)
 
-    # calculate residuals
-    if model_type == "linear_zero":
-        residuals = [
-            y.iloc[idx] - linear_zero_model(x.iloc[idx], m) for idx in range(len(x))
-        ]
-    elif model_type == "linear":
-        residuals = [
-            y.iloc[idx] - linear_model(x.iloc[idx], m, n) for idx in range(len(x))
-        ]
-    elif model_type in ("constant", "weighted_average"):
-        residuals = [
-            y.iloc[idx] - constant_model(x.iloc[idx], m) for idx in range(len(x))
-        ]
-
-    # add graphs to plot
-    plt.scatter(x, residuals, s=10)
-    x_intervall = np.linspace(min_length, max_length, 1000)
-    ax.plot(x_intervall, 0 * x_intervall, "--k", linewidth=1)
-
-    # legend settings
-    ax.set_xticks(np.linspace(min_length, max_length, x_ticks_number))
-    ax.set_title(title)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel(y_label)
-    fig.subplots_adjust(left=0.15)
-
-    fig.savefig(graphic_path)
     logger.info("plot saved")
@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from typing import Optional
+
+import gin
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+# cleared figures that can be reused for the next plot
+_figure_pool: list = []
+
+SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+### settings
+@gin.configurable
+def figure_pool_size(size: int = 2) -> int:
+    """number of cleared figures kept for the next plots (0 to close every figure after saving)"""
+    return size
+
+
+### figure functions
+def acquire_figure(figsize: Optional[tuple] = None):
+    """
+    empty figure with Agg canvas (recycled from the pool if possible)
+
+    The figures are not registered in pyplot, so they are not kept alive by the pyplot figure manager and no GUI
+    backend is loaded.
+    """
+    import matplotlib as mpl
+
+    if figsize is None:
+        figsize = mpl.rcParams["figure.figsize"]
+
+    if _figure_pool:
+        fig = _figure_pool.pop()
+        fig.set_size_inches(figsize)
+        fig.set_dpi(mpl.rcParams["figure.dpi"])
+        # clear() keeps subplots_adjust settings of the last plot
+        fig.subplots_adjust(**{name: mpl.rcParams[f"figure.subplot.{name}"] for name in SUBPLOT_PARAMS})
+        return fig
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def release_figure(fig):
+    """clear figure and put it back into the pool (or drop it if the pool is full)"""
+    fig.clear()
+    if len(_figure_pool) < figure_pool_size():
+        _figure_pool.append(fig)
+
+
+def clear_figure_pool():
+    """drop all recycled figures"""
+    _figure_pool.clear()
+
+
+@contextmanager
+def render_figure(graphic_path: str, figsize: Optional[tuple] = None):
+    """
+    context manager for one plot: yields an empty figure, saves it in graphic_path at the end of the with-block, and
+    releases the figure afterwards (also if the plot fails)
+
+    @params:
+        graphic_path: location for the png of the plot
+        figsize: (width, height) in inches (default matplotlib figure size)
+    """
+    fig = acquire_figure(figsize)
+    try:
+        yield fig
+        fig.savefig(graphic_path)
+    finally:
+        release_figure(fig)
@@ -0,0 +1,320 @@
+import os
+from typing import NamedTuple, Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.configurables import gin_process_pool
+from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.error_propagation import compile_formula
+from IMP_utils_py.physics.fitting import closed_form_fit, fit_model
+from IMP_utils_py.physics.models import get_model, model_types
+from IMP_utils_py.physics.plotting import fit_series, read_data
+
+### logging setup
+logger = setup_logger()
+
+RESAMPLING_METHODS = ("bootstrap", "monte_carlo")
+
+# number of resamples fitted at once with the closed-form fit (limits the memory for large datasets)
+CHUNK_SIZE = 1000
+
+
+class ResamplingResult(NamedTuple):
+    """parameters and derived quantities of all resamples with percentile intervals"""
+    names: list
+    samples: np.ndarray  # shape (n_samples, n_quantities), NaN for failed fits
+    median: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    n_failed: int
+
+
+### resampling functions
+def resample_data(x, y, dx, dy, n_samples: int, method: str, rng: np.random.Generator) -> tuple:
+    """
+    draw n_samples resampled datasets
+
+    @params:
+        method: 'bootstrap' (draw the data points with replacement) / 'monte_carlo' (add gaussian noise with the errors
+        to the values)
+
+    @return: tuple (x, y, dx, dy) with shape (n_samples, n_points) (dx/dy are None if they were None)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    dx = None if dx is None else np.broadcast_to(np.asarray(dx, dtype=float), x.shape)
+    dy = None if dy is None else np.broadcast_to(np.asarray(dy, dtype=float), y.shape)
+
+    if method == "bootstrap":
+        idx = rng.integers(0, len(x), size=(n_samples, len(x)))
+        return x[idx], y[idx], None if dx is None else dx[idx], None if dy is None else dy[idx]
+    elif method == "monte_carlo":
+        if dx is None is dy:
+            raise ValueError("Monte-Carlo resampling needs x or y errors -> use 'bootstrap' for data without errors")
+        x_samples = np.broadcast_to(x, (n_samples, len(x)))
+        y_samples = np.broadcast_to(y, (n_samples, len(y)))
+        if dx is not None:
+            x_samples = x_samples + rng.normal(size=(n_samples, len(x))) * dx
+        if dy is not None:
+            y_samples = y_samples + rng.normal(size=(n_samples, len(y))) * dy
+        return (
+            x_samples,
+            y_samples,
+            None if dx is None else np.broadcast_to(dx, x_samples.shape),
+            None if dy is None else np.broadcast_to(dy, y_samples.shape),
+        )
+    raise ValueError(f"Resampling method '{method}' is not supported -> choose from {list(RESAMPLING_METHODS)}")
+
+
+def fit_samples(x: np.ndarray, y: np.ndarray, dx: Optional[np.ndarray], dy: Optional[np.ndarray], model_type: str) -> np.ndarray:
+    """
+    fit every row of the resampled data with kafe2 (top-level function to be usable in a process pool)
+
+    @return: parameter values with shape (n_samples, n_params), NaN for failed fits
+    """
+    model = get_model(model_type)
+    values = np.full((len(x), len(model.parameter_names)), np.nan)
+    for idx in range(len(x)):
+        try:
+            if model.fit is not None:
+                values[idx] = model.fit(x[idx], y[idx], None if dx is None else dx[idx], None if dy is None else dy[idx]).parameter_values
+                continue
+            initial_values = model.initial_values(x[idx], y[idx]) if model.initial_values is not None else None
+            # the resamples are all different -> the fit cache would only fill up
+            values[idx] = fit_model(
+                x[idx],
+                y[idx],
+                None if dx is None else dx[idx],
+                None if dy is None else dy[idx],
+                model_type,
+                model.function,
+                model.parameter_limits,
+                initial_values,
+                use_cache=False,
+            ).parameter_values
+        except Exception as e:
+            logger.debug(f"fit of resample failed ({type(e).__name__}: {e})")
+    return values
+
+
+def fit_resamples(x, y, dx, dy, model_type: str, max_workers: int = 1) -> np.ndarray:
+    """
+    fit all resampled datasets (rows of x, y, dx, dy)
+
+    The closed-form models without x errors are fitted vectorized in chunks of CHUNK_SIZE resamples. All other (kafe2)
+    fits run in a process pool with max_workers > 1.
+
+    @return: parameter values with shape (n_samples, n_params), NaN for failed fits
+    """
+    closed_form_type = get_model(model_type).closed_form
+    # with x errors the closed-form fit differs from the kafe2 fit (see fitting.closed_form_fit)
+    if closed_form_type is not None and dx is None:
+        chunks = []
+        for start in range(0, len(y), CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                chunks.append(
+                    closed_form_fit(
+                        x[chunk],
+                        y[chunk],
+                        None if dx is None else dx[chunk],
+                        None if dy is None else dy[chunk],
+                        closed_form_type,
+                    ).parameter_values
+                )
+        return np.concatenate(chunks)
+
+    # more processes than CPU cores only add start-up time
+    max_workers = min(max_workers, os.cpu_count() or 1)
+    if max_workers <= 1:
+        return fit_samples(x, y, dx, dy, model_type)
+
+    logger.info(f"fit {len(y)} resamples with {max_workers} processes")
+    chunks = np.array_split(np.arange(len(y)), max_workers * 4)
+    with gin_process_pool(max_workers) as executor:
+        futures = [
+            executor.submit(
+                fit_samples,
+                x[chunk],
+                y[chunk],
+                None if dx is None else dx[chunk],
+                None if dy is None else dy[chunk],
+                model_type,
+            )
+            for chunk in chunks
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+
+def compile_derived(derived: dict, names: list) -> list[tuple]:
+    """
+    compile the formulas of the derived quantities with the parameter names as variables (same sympy syntax as in
+    propagate-errors)
+
+    @return: list with (variables, function, derivative functions) per derived quantity, see compile_formula
+    """
+    compiled = []
+    for name, expression in derived.items():
+        try:
+            compiled.append(compile_formula(expression, tuple(names)))
+        except ValueError as e:
+            raise ValueError(f"Derived quantity '{name}' = '{expression}' cannot be compiled ({e}) -> use the parameter names {names}")
+    return compiled
+
+
+def evaluate_derived(derived: Optional[dict], names: list, values: np.ndarray) -> np.ndarray:
+    """
+    evaluate derived quantities for every row of parameter values
+
+    @params:
+        derived: dict with name as key and formula of the parameter names as value, e.g. {"g": "4*pi**2/a"}
+        names: parameter names (columns of values)
+        values: parameter values with shape (n_samples, n_params)
+
+    @return: derived values with shape (n_samples, len(derived))
+    """
+    if not derived:
+        return np.empty((len(values), 0))
+    columns = []
+    for variables, function, _ in compile_derived(derived, names):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            column = function(*[values[:, names.index(variable)] for variable in variables])
+        columns.append(np.broadcast_to(np.asarray(column, dtype=float), (len(values),)))
+    return np.stack(columns, axis=1)
+
+
+def propagate_derived(derived: Optional[dict], names: list, values: np.ndarray, cov_mat: np.ndarray) -> np.ndarray:
+    """gaussian errors of the derived quantities from the parameter covariance (symbolic gradient) for comparison"""
+    if not derived:
+        return np.empty(0)
+    jacobian = np.zeros((len(derived), len(names)))
+    for row, (variables, _, derivatives) in enumerate(compile_derived(derived, names)):
+        args = [values[names.index(variable)] for variable in variables]
+        for variable, derivative in zip(variables, derivatives):
+            jacobian[row, names.index(variable)] = derivative(*args)
+    return np.sqrt(np.diagonal(jacobian @ cov_mat @ jacobian.T))
+
+
+def resample(
+    x,
+    y,
+    dx,
+    dy,
+    model_type: str,
+    method: str = "bootstrap",
+    n_samples: int = 1000,
+    confidence: float = 0.683,
+    derived: Optional[dict] = None,
+    seed: Optional[int] = None,
+    max_workers: int = 1,
+) -> ResamplingResult:
+    """
+    bootstrap/Monte-Carlo uncertainties of the fit parameters and derived quantities
+
+    @params:
+        method: see resample_data
+        confidence: probability content of the percentile intervals (0.683 for 1 sigma)
+        derived: see evaluate_derived
+        seed: seed of the random generator (None for a different result every run)
+        max_workers: number of processes for nonlinear fits
+
+    @return: ResamplingResult with the median and the central percentile interval of every quantity
+    """
+    if not get_model(model_type).fittable:
+        raise ValueError(f"Model '{model_type}' has no fit parameters -> choose {', '.join(repr(name) for name in model_types(fittable=True))}")
+    if not 0 < confidence < 1:
+        raise ValueError(f"confidence ({confidence}) has to be between 0 and 1")
+
+    rng = np.random.default_rng(seed)
+    x_samples, y_samples, dx_samples, dy_samples = resample_data(x, y, dx, dy, n_samples, method, rng)
+    values = fit_resamples(x_samples, y_samples, dx_samples, dy_samples, model_type, max_workers)
+
+    parameter_names = list(get_model(model_type).parameter_names)
+    samples = np.concatenate([values, evaluate_derived(derived, parameter_names, values)], axis=1)
+    # e.g. degenerate bootstrap samples with only one distinct x value
+    samples[~np.isfinite(samples)] = np.nan
+    n_failed = int(np.isnan(values).any(axis=1).sum())
+    if n_failed:
+        logger.warning(f"{n_failed} of {n_samples} resamples could not be fitted and are ignored")
+
+    lower, median, upper = np.nanpercentile(samples, [50 * (1 - confidence), 50, 50 * (1 + confidence)], axis=0)
+    return ResamplingResult(parameter_names + list(derived or {}), samples, median, lower, upper, n_failed)
+
+
+### command function
+@gin.configurable
+def resample_fit(
+    data_path: str,
+    x_column: str,
+    x_error_column: str,
+    y_column: str,
+    y_error_column: str,
+    model_type: str,
+    method: str = "bootstrap",
+    n_samples: int = 1000,
+    confidence: float = 0.683,
+    derived: Optional[dict] = None,
+    seed: Optional[int] = None,
+    max_workers: int = 1,
+    results_path: str = "",
+) -> pd.DataFrame:
+    """
+    fit the model and estimate the uncertainties of the parameters and derived quantities with resampling
+
+    @params:
+        data_path: location of the csv/excel file with the data
+        x_column, x_error_column, y_column, y_error_column: column names (use "" for no error column)
+        model_type: 'linear' / 'linear_zero' / 'constant' / 'weighted_average' / 'O8_bessel'
+        method: 'bootstrap' (draw the data points with replacement) / 'monte_carlo' (add gaussian noise with the
+        errors to the values)
+        n_samples: number of resamples
+        confidence: probability content of the percentile intervals (0.683 for 1 sigma)
+        derived: dict with name and formula of the parameter names (sympy syntax like in propagate-errors), e.g.
+        {"g": "4*pi**2/a"}
+        seed: seed of the random generator (None for a different result every run)
+        max_workers: number of processes for nonlinear fits (1 for no process pool)
+        results_path: location for the csv file with the results ("" for no file)
+
+    @output:
+        table with the fit value, fit error (gaussian propagation for derived quantities), median, and percentile
+        interval of every quantity (logged, returned, and saved in results_path)
+    """
+    data = read_data(data_path)
+    x = data[x_column].to_numpy(dtype=float)
+    y = data[y_column].to_numpy(dtype=float)
+    dx = data[x_error_column].to_numpy(dtype=float) if x_error_column != "" else None
+    dy = data[y_error_column].to_numpy(dtype=float) if y_error_column != "" else None
+
+    fit_result = fit_series(x, y, dx, dy, model_type, y_column)
+    logger.info(f"{n_samples} {method} resamples of {len(x)} points ({model_type} model)")
+    result = resample(x, y, dx, dy, model_type, method, n_samples, confidence, derived, seed, max_workers)
+
+    names = result.names
+    n_params = len(fit_result.parameter_values)
+    fit_values = np.concatenate([fit_result.parameter_values, evaluate_derived(derived, names[:n_params], fit_result.parameter_values[np.newaxis])[0]])
+    fit_errors = np.concatenate(
+        [fit_result.parameter_errors, propagate_derived(derived, names[:n_params], fit_result.parameter_values, fit_result.parameter_cov_mat)]
+    )
+    results = pd.DataFrame(
+        {
+            "quantity": names,
+            "fit_value": fit_values,
+            "fit_error": fit_errors,
+            "median": result.median,
+            "lower": result.lower,
+            "upper": result.upper,
+            "std": np.nanstd(result.samples, axis=0, ddof=1),
+        }
+    )
+    for row in results.itertuples():
+        logger.info(
+            f"{row.quantity}: {row.fit_value} (fit error {row.fit_error}) -> {method} median {row.median}, "
+            f"{confidence:.1%} interval [{row.lower}, {row.upper}] (-{row.median - row.lower} / +{row.upper - row.median})"
+        )
+
+    if results_path != "":
+        results.to_csv(results_path, index=False)
+        logger.info("results table saved")
+    return results
@@ -0,0 +1,250 @@
+from typing import Callable, Iterable, Optional, Union
+
+import numpy as np
+
+
+class RunningMoments:
+    """
+    column-wise count, mean and sum of squared deviations (M2) that can be updated chunk by chunk
+
+    The chunks are merged with the parallel algorithm of Chan et al. (generalization of Welford's algorithm), so the
+    result is numerically stable and the memory does not depend on the number of rows. NaN values are ignored.
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = np.zeros(n_columns, dtype=np.int64)
+        self.mean = np.zeros(n_columns)
+        self.m2 = np.zeros(n_columns)
+
+    def update(self, values: np.ndarray):
+        """add chunk with shape (rows, columns)"""
+        values = np.asarray(values, dtype=float).reshape(-1, len(self.count))
+        mask = ~np.isnan(values)
+        count = mask.sum(axis=0)
+        total = np.where(mask, values, 0).sum(axis=0)
+        mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+        m2 = (np.where(mask, values - mean, 0) ** 2).sum(axis=0)
+        self.merge(count, mean, m2)
+
+    def merge(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray):
+        """merge moments of another chunk (Chan et al.)"""
+        new_count = self.count + count
+        delta = mean - self.mean
+        # ratio = 0 for columns without values in both parts
+        ratio = np.divide(count, new_count, out=np.zeros(len(new_count)), where=new_count > 0)
+        self.mean = self.mean + delta * ratio
+        self.m2 = self.m2 + m2 + delta**2 * self.count * ratio
+        self.count = new_count
+
+    def std(self, ddof: int = 1) -> np.ndarray:
+        """standard deviation (sample standard deviation for ddof=1, 0 for not more than ddof values, NaN for no values)"""
+        var = np.divide(self.m2, self.count - ddof, out=np.zeros_like(self.m2), where=self.count > ddof)
+        return np.where(self.count > 0, np.sqrt(var), np.nan)
+
+    def metrics(self, ddof: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        returns tuple (number of values, average, std, std of average) with one entry per column
+        """
+        std = self.std(ddof)
+        mean = np.where(self.count > 0, self.mean, np.nan)
+        std_mean = np.where(self.count > 0, std / np.sqrt(np.maximum(self.count, 1)), np.nan)
+        return self.count.copy(), mean, std, std_mean
+
+
+def column_metrics(values, ddof: int = 1) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    NaN-aware column-wise statistics of a whole table in one vectorized call
+
+    @params:
+        values: array-like with shape (rows, columns) or (rows,) for one column (e.g. DataFrame or Series)
+        ddof: 1 for sample standard deviation, 0 for population standard deviation
+
+    @return: tuple (number of values, average, std, std of average) with one entry per column
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    moments = RunningMoments(values.shape[1])
+    moments.update(values)
+    return moments.metrics(ddof)
+
+
+def weighted_average(y, y_error, skip_nan: bool = False, axis: int = 0, return_chi2_ndf: bool = False) -> tuple:
+    """
+    function to calculate weighted average of y values
+    @params:
+        y, y_error: array-like (e.g. Series or DataFrame). With 2-D input, the weighted averages of all series along axis are calculated at once.
+        if y_error = None, mean and std of y will be returned. Otherwise, the weighted average with its error
+        skip_nan: if True, values with NaN in y or y_error are ignored. Otherwise, NaN values propagate to the result.
+        return_chi2_ndf: if True, chi^2/ndf of the weighted average is returned as third value (NaN if y_error = None)
+    """
+    y = np.moveaxis(np.asarray(y, dtype=float), axis, 0)
+    if y_error is None:
+        if skip_nan:
+            # mean and population std (NaN values are ignored)
+            _, w_avg, dw_avg, _ = column_metrics(y.reshape(len(y), -1), ddof=0)
+            w_avg = w_avg.reshape(y.shape[1:])
+            dw_avg = dw_avg.reshape(y.shape[1:])
+        else:
+            w_avg = np.mean(y, axis=0)
+            dw_avg = np.std(y, axis=0)
+        chi2_ndf = np.full(y.shape[1:], np.nan)
+    else:
+        y_error = np.broadcast_to(np.moveaxis(np.asarray(y_error, dtype=float), axis, 0), y.shape)
+        mask = ~(np.isnan(y) | np.isnan(y_error)) if skip_nan else np.ones(y.shape, dtype=bool)
+        if np.any((y_error == 0) & mask):
+            raise ValueError("found 0 in y_error -> cannot calculate weighted average")
+
+        # single pass over the weights
+        weights = np.where(mask, 1 / np.where(mask, y_error, 1) ** 2, 0)
+        y = np.where(mask, y, 0)
+        sum_weights = weights.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w_avg = (weights * y).sum(axis=0) / sum_weights
+            dw_avg = np.where(sum_weights > 0, 1 / np.sqrt(sum_weights), np.nan)
+            ndf = mask.sum(axis=0) - 1
+            chi2 = (weights * (y - w_avg) ** 2).sum(axis=0)
+            chi2_ndf = np.where(ndf > 0, chi2 / np.maximum(ndf, 1), np.nan)
+
+    # numpy scalars for 1-D input
+    w_avg, dw_avg, chi2_ndf = w_avg[()], dw_avg[()], chi2_ndf[()]
+    if return_chi2_ndf:
+        return w_avg, dw_avg, chi2_ndf
+    return w_avg, dw_avg
+
+
+### histogram functions
+# bin width rules of np.histogram_bin_edges that only need count, range, std, and interquartile range
+BIN_RULES = ("auto", "fd", "scott", "sturges", "rice", "sqrt")
+# (major, minor) of the installed numpy (the 'auto' rule changed in numpy 2.3.0)
+NUMPY_VERSION = tuple(int(part) for part in np.__version__.split(".")[:2])
+
+
+def bin_width(rule: str, count: int, data_range: float, std: float, iqr: Optional[float] = None) -> float:
+    """
+    bin width of a numpy bin rule (same formulas as np.histogram_bin_edges, so the edges can be calculated from
+    streamed statistics)
+
+    @params:
+        rule: 'fd' (Freedman-Diaconis, needs iqr) / 'scott' / 'auto' (minimum of 'fd' and 'sturges' like the installed
+        numpy version) / 'sturges' / 'rice' / 'sqrt'
+        std: population standard deviation (ddof=0)
+        iqr: interquartile range (only for 'fd' and 'auto')
+    """
+    if rule not in BIN_RULES:
+        raise ValueError(f"bin rule '{rule}' is not supported -> choose from {list(BIN_RULES)} or a number of bins")
+    if rule in ("fd", "auto") and iqr is None:
+        raise ValueError(f"bin rule '{rule}' needs the interquartile range -> pass iqr")
+
+    if rule == "sqrt":
+        return data_range / np.sqrt(count)
+    elif rule == "sturges":
+        return data_range / (np.log2(count) + 1)
+    elif rule == "rice":
+        return data_range / (2 * count ** (1 / 3))
+    elif rule == "scott":
+        return (24 * np.pi**0.5 / count) ** (1 / 3) * std
+    fd_width = 2 * iqr * count ** (-1 / 3)
+    if rule == "fd":
+        return fd_width
+    sturges_width = bin_width("sturges", count, data_range, std)
+    if NUMPY_VERSION >= (2, 3):
+        # numpy 2.3.0 limits the 'fd' width of 'auto' to at least half of the 'sqrt' width (max. about twice the
+        # 'sqrt' bins, see the numpy 2.3.0 release notes)
+        return min(max(fd_width, bin_width("sqrt", count, data_range, std) / 2), sturges_width)
+    return min(fd_width, sturges_width) if fd_width else sturges_width
+
+
+def bin_edges(bins: Union[int, str], count: int, minimum: float, maximum: float, std: float = 0, iqr: Optional[float] = None) -> np.ndarray:
+    """equally spaced bin edges like np.histogram_bin_edges (bins: number of bins or bin rule, see bin_width)"""
+    if isinstance(bins, str):
+        width = bin_width(bins, count, maximum - minimum, std, iqr)
+        bins = int(np.ceil((maximum - minimum) / width)) if width else 1
+    if minimum == maximum:
+        minimum, maximum = minimum - 0.5, maximum + 0.5
+    return np.linspace(minimum, maximum, int(bins) + 1)
+
+
+### streamed quantiles
+# bins of every refinement pass and max number of values that are counted exactly
+QUANTILE_BINS = 1 << 16
+
+
+def _bin_index(values: np.ndarray, low: float, high: float) -> np.ndarray:
+    """
+    index of QUANTILE_BINS equal-width bins between low and high (monotonic in the values, so every bin holds a
+    contiguous part of the sorted values; the halves avoid an overflow of high - low)
+    """
+    scale = QUANTILE_BINS / (high / 2 - low / 2)
+    return np.clip(((values / 2 - low / 2) * scale).astype(np.int64), 0, QUANTILE_BINS - 1)
+
+
+def streamed_quantiles(chunks: Callable[[], Iterable[np.ndarray]], quantiles, count: int, minimum: float, maximum: float) -> np.ndarray:
+    """
+    exact quantiles like np.quantile (linear interpolation) of values that are read in chunks
+
+    Every pass histograms the values in the search interval of each needed order statistic with QUANTILE_BINS bins
+    and shrinks the interval to the min and max of the bin that holds it, until the interval has at most QUANTILE_BINS
+    values (counted exactly in the next pass) or only one distinct value. So the memory does not depend on the number
+    of values and most data needs one or two passes.
+
+    @params:
+        chunks: function that returns a new iterator over the chunks (1-D arrays without NaN) for every pass
+        quantiles: quantiles in [0, 1]
+        count, minimum, maximum: number of values, min and max of all chunks
+    """
+    positions = (count - 1) * np.asarray(quantiles, dtype=float)
+    if minimum == maximum:
+        return np.full(positions.shape, minimum)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, count - 1)
+    # search interval of every order statistic: (low, high, exact) and the number of values below low. exact is True
+    # if the values of the interval are counted exactly in the next pass.
+    searches = {int(rank): ((minimum, maximum, count <= QUANTILE_BINS), 0) for rank in np.union1d(lower, upper)}
+    order_statistics = {}
+
+    while len(order_statistics) < len(searches):
+        # order statistics in the same interval share the pass results
+        intervals = {interval for rank, (interval, _) in searches.items() if rank not in order_statistics}
+        distinct = {interval: (np.empty(0), np.empty(0, dtype=np.int64)) for interval in intervals if interval[2]}
+        counts = {interval: np.zeros(QUANTILE_BINS, dtype=np.int64) for interval in intervals if not interval[2]}
+        bin_min = {interval: np.full(QUANTILE_BINS, np.inf) for interval in counts}
+        bin_max = {interval: np.full(QUANTILE_BINS, -np.inf) for interval in counts}
+        for values in chunks():
+            for interval in intervals:
+                low, high, exact = interval
+                selected = values[(values >= low) & (values <= high)]
+                if exact:
+                    # merge the distinct values and their counts
+                    unique, inverse = np.unique(np.concatenate([distinct[interval][0], selected]), return_inverse=True)
+                    weights = np.concatenate([distinct[interval][1], np.ones(len(selected), dtype=np.int64)])
+                    distinct[interval] = (unique, np.bincount(inverse.ravel(), weights, len(unique)).astype(np.int64))
+                elif len(selected):
+                    idx = _bin_index(selected, low, high)
+                    counts[interval] += np.bincount(idx, minlength=QUANTILE_BINS)
+                    np.minimum.at(bin_min[interval], idx, selected)
+                    np.maximum.at(bin_max[interval], idx, selected)
+
+        for rank, (interval, below) in searches.items():
+            if rank in order_statistics:
+                continue
+            if interval[2]:
+                unique, unique_counts = distinct[interval]
+                order_statistics[rank] = unique[np.searchsorted(np.cumsum(unique_counts), rank - below, side="right")]
+                continue
+            cumulative = np.cumsum(counts[interval])
+            b = int(np.searchsorted(cumulative, rank - below, side="right"))
+            low, high = bin_min[interval][b], bin_max[interval][b]
+            if low == high:
+                # one distinct value left
+                order_statistics[rank] = low
+                continue
+            # count the values exactly if they are few or the bin cannot be split further (interval of a few floats)
+            exact = counts[interval][b] <= QUANTILE_BINS or (low, high) == interval[:2] or low / 2 == high / 2
+            searches[rank] = ((low, high, exact), below + (int(cumulative[b - 1]) if b > 0 else 0))
+
+    # linear interpolation between the order statistics (same rounding as np.quantile)
+    below = np.array([order_statistics[rank] for rank in lower])
+    above = np.array([order_statistics[rank] for rank in upper])
+    gamma = positions - lower
+    return np.where(gamma >= 0.5, above - (above - below) * (1 - gamma), below + (above - below) * gamma)
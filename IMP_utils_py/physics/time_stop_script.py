@@ -1,6 +1,3 @@
-import sys
-import time
-
 SYSTEM: str = ""
 try:
     import tty  # MacOS
@@ -9,246 +6,332 @@ except:
     import keyboard  # Windows
     SYSTEM = "Windows"
 
-from typing import Union
+from pathlib import Path
+from typing import Callable, Iterator, Optional, Union
 
 import gin
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from kafe2 import Fit, XYContainer
-from scipy.stats import norm
 
 from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.fitting import (FitResult, fit_binned_gaussian,
+                                          fit_model)
+from IMP_utils_py.physics.measurement import (is_measurement,
+                                              measurement_chunks, read_header,
+                                              read_measurement)
+from IMP_utils_py.physics.models import get_model
+# calc_half_periods and calc_half_periods_v2 are still importable from time_stop_script
+from IMP_utils_py.physics.periods import (PERIODS_COLUMNS, T_sin,
+                                          calc_half_periods,
+                                          calc_half_periods_v2, periods_frame)
+from IMP_utils_py.physics.rendering import render_figure
+from IMP_utils_py.physics.statistics import (RunningMoments, bin_edges,
+                                             column_metrics,
+                                             streamed_quantiles)
+from IMP_utils_py.physics.timing import (laps_from_events, load_event_log,
+                                         record_laps, save_event_log)
 
 ### logging setup
 logger = setup_logger()
 
-### helper funtions
-def linear_zero_model(x, a=1.0):
-    """ y = a * x """
-    return a * x
-
-def linear_model(x, a=1.0, b=0.0):
-    """ y = a * x + b """
-    return a*x+b
-
-### periods calculation functions
-def calc_half_periods(data: list):
-    periods = [data[i]+data[i-1] for i in range(1, len(data), 2)]
-    periods += [None]*(len(data)-len(periods))
-    return periods
-
-def calc_half_periods_v2(data: list):
-    periods = [data[i]+data[i-1] for i in range(1, len(data))]
-    periods += [None]*(len(data)-len(periods))
-    return periods
+### read functions
+def read_raw_data(raw_data_path: str) -> pd.DataFrame:
+    """csv file (first column is the index) or memory-mapped measurement file (see measurement.py)"""
+    if is_measurement(raw_data_path):
+        return read_measurement(raw_data_path)
+    return pd.read_csv(raw_data_path, index_col=0)
 
-def T_sin(grad: Union[list[float],float]):
+def read_raw_data_chunks(raw_data_path: str, chunk_size: int, columns: Optional[list] = None) -> Iterator[pd.DataFrame]:
     """
-    function for period durations normed with period duration of 5 degree
+    chunks of chunk_size rows of a csv or measurement file
 
-    @param:
-        grad: array-like object with degrees or one single degree
+    @params:
+        columns: only these columns are read (default: all columns, index not included)
     """
-    phi = np.pi/180 * grad
-    y = 1+0.25 * np.sin(phi/2)**2 + 0.140625 * np.sin(phi/2)**4
-    return y
+    if is_measurement(raw_data_path):
+        columns = columns or read_header(raw_data_path)[0]["columns"]
+        for values in measurement_chunks(raw_data_path, chunk_size, columns):
+            yield pd.DataFrame(values, columns=columns, copy=False)
+    elif columns is None:
+        yield from pd.read_csv(raw_data_path, index_col=0, chunksize=chunk_size)
+    else:
+        yield from pd.read_csv(raw_data_path, usecols=columns, chunksize=chunk_size)
 
 ### evaluation functions
 def std(data: list, mean: float) -> float:
     """
     sigma = sqrt(sum(x_i - mean)^2/(N-1))
     """
-    sum = 0
-    for i in range(len(data)):
-        sum += np.power((data[i]-mean),2)
-    sigma = np.sqrt(sum/(len(data)-1))
-    return sigma
+    data = np.asarray(data, dtype=float)
+    return np.sqrt(np.sum((data - mean) ** 2) / (len(data) - 1))
 
 def calc_metrics(data: pd.Series) -> tuple[int, float, float, float]:
     """
     returns tuple (number of values, average, std, std of average)
     """
-    data = list(data.dropna()) # clear list from None values
+    count, avg_data, std_data, std_avg_data = column_metrics(data)
 
-    # special cases
-    if not data:
+    # special case (no values, None values are ignored)
+    if count[0] == 0:
         return 0, None, None, None
-    elif len(data)==1:
-        return 1, data[0], 0, 0
 
-    avg_data = np.mean(data)
-    std_data = std(data, avg_data)
-    std_avg_data = std_data/np.sqrt(len(data))
+    return int(count[0]), avg_data[0], std_data[0], std_avg_data[0]
 
-    return len(data), avg_data, std_data, std_avg_data
+def evaluation_frame(columns: list, counts: list, means: list, stds: list, std_means: list) -> pd.DataFrame:
+    """ evaluation table with one row per column of the raw data """
+    df_evaluation = pd.DataFrame({"counting": columns})
+    df_evaluation["Messwerte Anzahl"] = counts
+    df_evaluation["Mittelwert"] = means
+    df_evaluation["Standardabweichung"] = stds
+    df_evaluation["Vertrauensbereich"] = std_means
 
-def eval_df(df: pd.DataFrame) -> pd.DataFrame:
-    columns_metrics = [calc_metrics(df[col]) for col in df.columns]
+    return df_evaluation
 
-    df_evaluation = pd.DataFrame({"counting": df.columns})
-    df_evaluation["Messwerte Anzahl"] = [ev[0] for ev in columns_metrics]
-    df_evaluation["Mittelwert"] = [ev[1] for ev in columns_metrics]
-    df_evaluation["Standardabweichung"] = [ev[2] for ev in columns_metrics]
-    df_evaluation["Vertrauensbereich"] = [ev[3] for ev in columns_metrics]
+def eval_df(df: pd.DataFrame) -> pd.DataFrame:
+    # all columns at once (NaN values are ignored)
+    return evaluation_frame(df.columns, *column_metrics(df))
 
-    return df_evaluation
+def eval_csv_chunked(raw_data_path: str, chunk_size: int) -> pd.DataFrame:
+    """
+    same evaluation as eval_df(read_raw_data(raw_data_path)), but the file is read in chunks of chunk_size rows, so
+    the memory does not grow with the number of rows
+    """
+    moments = None
+    columns = []
+    for chunk in read_raw_data_chunks(raw_data_path, chunk_size):
+        if moments is None:
+            columns = chunk.columns
+            moments = RunningMoments(len(columns))
+        moments.update(chunk.to_numpy(dtype=float))
+
+    if moments is None:
+        return evaluation_frame(columns, [], [], [], [])
+    return evaluation_frame(columns, *moments.metrics())
+
+### live statistics
+class LapStatistics:
+    """
+    count, mean, std and std of mean of the three counting types, updated with every lap (O(1) per lap with
+    RunningMoments) and appended to the raw data csv file, so no lap is lost if the measurement is interrupted
 
-### keyboard input functions
-def keyboard_input_MacOS() -> list[float]:
-    tty.setcbreak(sys.stdin)  # needed for keyboard input
-
-    times: list[float] = []
-    start_time: float = 0
-    start_press: bool = False # first "space" press happend
-
-    logger.info("now ready for key board input \n")
-
-    while True:
-        key = ord(sys.stdin.read(1))
-        if key==32: # press "space" to time
-            if not start_press:
-                logger.info("Time started...")
-                start_time = time.time()
-                start_press = True
-            else:
-                times.append(time.time()-start_time)
-                logger.info(f"Round: {len(times)}")
-                start_time = time.time()
-        elif key==97: #  press "a" to stop
-            logger.info("... finished \n")
-            break
-
-        elif key==112: #  press "p" to pause
-            logger.info("paused")
-            start_press = False
-
-    return times
-
-def keyboard_input_Windows() -> list[float]:
-    times: list[float] = []
-    start_time: float = 0
-    start_press: bool = False # first "space" press happend
-
-    logger.info("now ready for key board input \n")
-
-    space_clicked = False
-    a_clicked = False
-    p_clicked = False
-
-    while True:
-        if keyboard.is_pressed("space") and not space_clicked: # press "space" to time
-            if not start_press:
-                logger.info("Time started...")
-                start_time = time.time()
-                start_press = True
-            else:
-                times.append(time.time()-start_time)
-                logger.info(f"Round: {len(times)}")
-                start_time = time.time()
-            space_clicked = True
+    In the raw data file every lap is one row and a half period is in the row of the lap that completes it (the
+    other rows are empty). NaN values are ignored by the evaluation, so the evaluation is the same as for the
+    half period lists of calc_half_periods and calc_half_periods_v2.
+    """
 
-        elif keyboard.is_pressed("a") and not a_clicked: #  press "a" to stop
-            logger.info("... finished \n")
-            a_clicked = True
-            break
+    def __init__(self, raw_data_path: Optional[str] = None, flush_every: int = 1):
+        """
+        @params:
+            raw_data_path: csv file for the laps (overwritten), None for no file
+            flush_every: number of laps that are appended to the file at once
+        """
+        self.raw_data_path = raw_data_path
+        self.flush_every = flush_every
+        self.moments = RunningMoments(len(PERIODS_COLUMNS))
+        self.n_laps = 0
+        self.last_lap = np.nan
+        self._rows: list = []
+        if raw_data_path is not None:
+            Path(raw_data_path).write_text("," + ",".join(PERIODS_COLUMNS) + "\n")
+
+    def add(self, lap: float):
+        """add lap time in s"""
+        # half periods: laps 1+2, 3+4, ... / half periods v2: laps 1+2, 2+3, 3+4, ...
+        half_period = lap + self.last_lap if self.n_laps % 2 == 1 else np.nan
+        row = np.array([lap, half_period, lap + self.last_lap])
+        self.moments.update(row)
+        self._rows.append((self.n_laps, row))
+        self.n_laps += 1
+        self.last_lap = lap
+
+        count, mean, _, std_mean = self.moments.metrics()
+        logger.info(" | ".join(f"{column}: {mean[idx]:.4f} s ± {std_mean[idx]:.4f} s (N={count[idx]})" for idx, column in enumerate(PERIODS_COLUMNS) if count[idx] > 0))
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """append the new laps to the raw data file"""
+        if self.raw_data_path is not None and self._rows:
+            with open(self.raw_data_path, "a") as f:
+                f.writelines(f"{idx}," + ",".join("" if np.isnan(value) else repr(float(value)) for value in row) + "\n" for idx, row in self._rows)
+        self._rows = []
+
+    def evaluation(self) -> pd.DataFrame:
+        return evaluation_frame(PERIODS_COLUMNS, *self.moments.metrics())
 
-        elif keyboard.is_pressed("p") and not p_clicked: # press "p" to pause
-            logger.info("paused")
-            start_press = False
-            p_clicked = True
 
-        elif not keyboard.is_pressed("space") and space_clicked:
-            space_clicked=False
-        elif not keyboard.is_pressed("a") and a_clicked:
-            a_clicked=False
-        elif not keyboard.is_pressed("p") and p_clicked:
-            p_clicked=False
+### keyboard input functions
+def keyboard_input_MacOS(log: Optional[list] = None, on_lap: Optional[Callable[[float], None]] = None) -> list[float]:
+    return record_laps("MacOS", log, on_lap)
 
-    return times
+def keyboard_input_Windows(log: Optional[list] = None, on_lap: Optional[Callable[[float], None]] = None) -> list[float]:
+    return record_laps("Windows", log, on_lap)
 
 
 ### main program
 @gin.configurable
-def time_stop(raw_data_path: str, evaluation_data_path: str):
+def time_stop(raw_data_path: str, evaluation_data_path: str, event_log_path: Optional[str] = None, replay: bool = False, flush_every: int = 1):
     """
     returns raw_data and evaluation_data dataframes (also saves them as csv)
+
+    @params:
+        event_log_path: if not None, csv file with every key press (timestamp in ns and key)
+        replay: if True, the times are calculated from the event log in event_log_path instead of the keyboard input
+        flush_every: number of laps that are appended to the raw data file at once (1 writes every lap immediately)
     """
-    if SYSTEM == "Windows":
-        times = keyboard_input_Windows()
-    elif SYSTEM == "MacOS":
-        times = keyboard_input_MacOS()
-    else:
+    if replay and event_log_path is None:
+        raise ValueError("replay needs an event log -> set event_log_path")
+    if not replay and SYSTEM not in ("Windows", "MacOS"):
         raise ValueError(f"wrong input ('{SYSTEM}') for variable system -> needs to be 'Windows' or 'MacOS'")
 
+    if replay:
+        # all laps are known at once -> the raw data (same layout as in the measurement) is calculated vectorized
+        df_raw_data = periods_frame(laps_from_events(load_event_log(event_log_path)), aligned=True)
+        df_raw_data.to_csv(raw_data_path)
+        df_evaluation = eval_df(df_raw_data)
+    else:
+        # the statistics are updated and the raw data is written during the measurement
+        statistics = LapStatistics(raw_data_path, flush_every)
+        log: list = []
+        try:
+            if SYSTEM == "Windows":
+                keyboard_input_Windows(log, statistics.add)
+            else:
+                keyboard_input_MacOS(log, statistics.add)
+        except KeyboardInterrupt:
+            logger.warning(f"measurement interrupted -> {statistics.n_laps} laps are saved")
+        finally:
+            statistics.flush()
+            if event_log_path is not None:
+                save_event_log(event_log_path, log)
+        df_evaluation = statistics.evaluation()
 
-    df_raw_data = pd.DataFrame({"periods": times, "half periods": calc_half_periods(times), "half periods v2": calc_half_periods_v2(times)})
-    df_evaluation = eval_df(df_raw_data)
-
-    df_raw_data.to_csv(raw_data_path)
     df_evaluation.to_csv(evaluation_data_path)
 
     logger.info("data files are created and saved")
 
 ### eval program
 @gin.configurable
-def eval_raw_data(raw_data_path: str, evaluation_data_path: str):
+def eval_raw_data(raw_data_path: str, evaluation_data_path: str, chunk_size: Optional[int] = None):
+    """
+    @params:
+        chunk_size: if not None, the raw data is read and evaluated in chunks of chunk_size rows (for very large files)
+    """
     logger.info("start reading raw data")
-    df_raw_data = pd.read_csv(raw_data_path, index_col=0)
-    df_evaluation = eval_df(df_raw_data)
+    if chunk_size is None:
+        df_raw_data = read_raw_data(raw_data_path)
+        df_evaluation = eval_df(df_raw_data)
+    else:
+        df_evaluation = eval_csv_chunked(raw_data_path, chunk_size)
     df_evaluation.to_csv(evaluation_data_path)
     logger.info("evaluation file created and saved")
 
+### histogram functions
+def histogram_data(data, bins: Union[int, str]) -> tuple[np.ndarray, np.ndarray]:
+    """counts and edges of the values in one np.histogram pass (bins: number of classes or numpy bin rule)"""
+    edges = np.histogram_bin_edges(data, bins)
+    counts, _ = np.histogram(data, edges)
+    return counts, edges
+
+def histogram_csv_chunked(raw_data_path: str, column_name: str, bins: Union[int, str], chunk_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    same histogram as histogram_data for a column of a csv or measurement file that is read in chunks of chunk_size rows
+
+    The first pass gets count, min, max and std, the last pass accumulates the counts. For the bin rules 'fd' and
+    'auto' the exact interquartile range is calculated in additional passes (see statistics.streamed_quantiles).
+    """
+    def chunks():
+        for chunk in read_raw_data_chunks(raw_data_path, chunk_size, [column_name]):
+            values = chunk[column_name].to_numpy(dtype=float)
+            yield values[~np.isnan(values)]
+
+    moments = RunningMoments(1)
+    minimum, maximum = np.inf, -np.inf
+    for values in chunks():
+        if len(values):
+            moments.update(values)
+            minimum, maximum = min(minimum, values.min()), max(maximum, values.max())
+    count = int(moments.count[0])
+    if count == 0:
+        raise ValueError(f"column '{column_name}' has no values")
+
+    iqr = None
+    if bins in ("fd", "auto"):
+        # same subtraction as np.histogram_bin_edges
+        iqr = np.subtract(*streamed_quantiles(chunks, [0.75, 0.25], count, minimum, maximum))
+
+    edges = bin_edges(bins, count, minimum, maximum, moments.std(ddof=0)[0], iqr)
+    counts = np.zeros(len(edges) - 1, dtype=np.int64)
+    for values in chunks():
+        counts += np.histogram(values, edges)[0]
+    return counts, edges
+
+
 ### plot function for histogram with gaussian fit
 @gin.configurable
-def hist_gauss(raw_data_path: str, graphic_path: str, column_name: str, class_number: int, title: str, x_label: str, y_label: str, normed_y: bool):
-    data = pd.read_csv(raw_data_path, index_col=0)
-    data = data[column_name]
-    mu = np.mean(data)
-    sigma = std(data, mu)
+def hist_gauss(raw_data_path: str, graphic_path: str, column_name: str, class_number: Union[int, str], title: str, x_label: str, y_label: str, normed_y: bool, chunk_size: Optional[int] = None) -> FitResult:
+    """
+    histogram with binned maximum-likelihood gaussian fit (the histogram is counted once and used for both plots)
+
+    @params:
+        class_number: number of classes or bin rule 'fd' (Freedman-Diaconis) / 'scott' / 'auto' / 'sturges' / 'rice' / 'sqrt'
+        chunk_size: if not None, the csv file is read in chunks of chunk_size rows (for very large files)
 
-    minx = data.min()
-    maxx = data.max()
+    @return: FitResult of the gaussian fit with parameters (mu, sigma)
+    """
+    from scipy.stats import norm
+
+    if chunk_size is None:
+        data = read_raw_data(raw_data_path)
+        counts, edges = histogram_data(data[column_name].dropna().to_numpy(dtype=float), class_number)
+    else:
+        counts, edges = histogram_csv_chunked(raw_data_path, column_name, class_number, chunk_size)
+    n_values = counts.sum()
+    widths = np.diff(edges)
 
-    logger.info(f"class width: {maxx-minx}")
-    logger.info(f"min: {minx}")
-    logger.info(f"max: {maxx}")
+    logger.info(f"class width: {widths[0]} ({len(counts)} classes)")
+    logger.info(f"min: {edges[0]}")
+    logger.info(f"max: {edges[-1]}")
 
-    x = np.linspace(minx, maxx, 1000)
+    fit_result = fit_binned_gaussian(counts, edges)
+    (mu, sigma), (mu_error, sigma_error) = fit_result.parameter_values, fit_result.parameter_errors
+    logger.info(f"mu: {mu} ± {mu_error}")
+    logger.info(f"sigma: {sigma} ± {sigma_error}")
+    logger.info(f"chi2/ndf: {fit_result.chi2}/{fit_result.ndf}")
+
+    x = np.linspace(edges[0], edges[-1], 1000)
     normal_pdf = norm.pdf(x, loc=mu, scale=sigma)
 
-    fig = plt.figure()
-    ax = fig.add_subplot() # background plot for axes
+    with render_figure(graphic_path) as fig:
+        ax = fig.add_subplot() # background plot for axes
 
-    if normed_y:
-        ax.hist(data, bins=class_number, weights=[1/len(data)]*len(data))
-    else:
-        ax.hist(data, bins=class_number)
+        ax.bar(edges[:-1], counts / n_values if normed_y else counts, width=widths, align="edge")
 
-    ax.set_title(title)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel(y_label)
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
 
-    ax = fig.add_subplot()
-    ax.hist(data, bins=class_number, density=True, ec='black')
-    ax.plot(x, normal_pdf)
-    ax.set_yticks([])
-    ax.set_xticks([])
+        ax = fig.add_subplot()
+        ax.bar(edges[:-1], counts / (n_values * widths), width=widths, align="edge", ec='black')
+        ax.plot(x, normal_pdf)
+        ax.set_yticks([])
+        ax.set_xticks([])
 
-    fig.savefig(graphic_path)
     logger.info("histogram saved")
+    return fit_result
 
 ### normed periods and errorbars plot
 @gin.configurable
-def errorbar_phi(data_path: str, graphic_path: str, amplitude_column: str, normed_value_column: str, error_column: str, title: str, x_label: str, y_label: str):
+def errorbar_phi(data_path: str, graphic_path: str, amplitude_column: str, normed_value_column: str, error_column: str, title: str, x_label: str, y_label: str, order: Optional[int] = 2, n_points: int = 1000):
     """
     @params:
         amplitude_column: amplitude in degree
         normed_value_column: with 5 degree period duration normed period durations
         error_column: error in degree for every amplitude
+        order: order of the T_sin series (None for the exact period duration)
+        n_points: number of amplitudes for the T_sin curve
     """
-
-    data = pd.read_csv(data_path, index_col=0)
+    data = read_raw_data(data_path)
     data.sort_values(by=[amplitude_column])
 
     x_specific = list(data[amplitude_column])
@@ -257,24 +340,23 @@ def errorbar_phi(data_path: str, graphic_path: str, amplitude_column: str, norme
 
     xmin = x_specific[0]
     xmax = x_specific[-1]
-    x = np.linspace(xmin, xmax, 1000)
+    x = np.linspace(xmin, xmax, n_points)
 
-    y=T_sin(x)
+    y=T_sin(x, order)
 
-    fig = plt.figure()
-    ax = fig.add_subplot()
+    with render_figure(graphic_path) as fig:
+        ax = fig.add_subplot()
 
-    text = r"T$_{\varphi}$/T$_{KW}$"
-    ax.plot(x, y, label=text)
-    ax.legend()
+        text = r"T$_{\varphi}$/T$_{KW}$"
+        ax.plot(x, y, label=text)
+        ax.legend()
 
-    plt.errorbar(x_specific, y_values, xerr=e, linestyle='None', marker='.', elinewidth=0.5, capsize=3)
-    ax.set_xticks(x_specific)
-    ax.set_title(title)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel(y_label)
+        ax.errorbar(x_specific, y_values, xerr=e, linestyle='None', marker='.', elinewidth=0.5, capsize=3)
+        ax.set_xticks(x_specific)
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
 
-    fig.savefig(graphic_path)
     logger.info("plot saved")
 
 @gin.configurable
@@ -290,13 +372,10 @@ def errorbar_l(data_path: str, graphic_path: str, length_column: str, length_err
     @output:
         Unsicherheit der Steigung: dm = sqrt(max(length_error)^2 + max(yi_error)^2)
     """
+    model_type = "linear_zero" if intercept_zero else "linear"
+    model = get_model(model_type).function
 
-    if intercept_zero:
-        model = linear_zero_model
-    else:
-        model = linear_model
-
-    data = pd.read_csv(data_path, index_col=0)
+    data = read_raw_data(data_path)
     data.sort_values(by=[length_column])
 
     x = data[length_column]
@@ -306,18 +385,10 @@ def errorbar_l(data_path: str, graphic_path: str, length_column: str, length_err
 
     max_length = int(np.ceil(max(x)*10))/10
 
-    fig = plt.figure()
-    ax = fig.add_subplot()
-
-    ### kafe2 calculation
-    xy_data = XYContainer(x,y)
-    xy_data.add_error("x", dx)
-    xy_data.add_error("y", dy)
-
-    my_fit = Fit(xy_data, model)
-    my_fit.do_fit()
-    model_params = my_fit.parameter_values
-    model_params_error = my_fit.parameter_errors
+    # kafe2 fit, because the lengths have x errors (see fit_model)
+    fit_result = fit_model(x, y, dx, dy, model_type, model)
+    model_params = fit_result.parameter_values
+    model_params_error = fit_result.parameter_errors
 
     m = model_params[0]
     dm = model_params_error[0]
@@ -334,17 +405,19 @@ def errorbar_l(data_path: str, graphic_path: str, length_column: str, length_err
     logger.info(f"Gravitationsbeschleunigung: {4*np.pi**2/m}")
     logger.info(f"Unsicherheit der Gravitationsbeschleunigung: {np.sqrt((4*np.pi**2/m**2 * dm)**2)}")
 
-    x_intervall = np.linspace(0, max_length, 1000)
-    if intercept_zero:
-        ax.plot(x_intervall, m*x_intervall, '--k')
-    else:
-        ax.plot(x_intervall, m*x_intervall+n, '--k')
-    plt.errorbar(x, y, yerr=dy, xerr=dx, linestyle='None', marker='.', elinewidth=0.5, capsize=3)
+    with render_figure(graphic_path) as fig:
+        ax = fig.add_subplot()
+
+        x_intervall = np.linspace(0, max_length, 1000)
+        if intercept_zero:
+            ax.plot(x_intervall, m*x_intervall, '--k')
+        else:
+            ax.plot(x_intervall, m*x_intervall+n, '--k')
+        ax.errorbar(x, y, yerr=dy, xerr=dx, linestyle='None', marker='.', elinewidth=0.5, capsize=3)
 
-    ax.set_xticks(np.linspace(0, max_length, x_ticks_number))
-    ax.set_title(title)
-    ax.set_xlabel(x_label)
-    ax.set_ylabel(y_label)
+        ax.set_xticks(np.linspace(0, max_length, x_ticks_number))
+        ax.set_title(title)
+        ax.set_xlabel(x_label)
+        ax.set_ylabel(y_label)
 
-    fig.savefig(graphic_path)
     logger.info("plot saved")
@@ -0,0 +1,258 @@
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+import gin
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+# keys of the time measurement
+LAP_KEY = "space"
+STOP_KEY = "a"
+PAUSE_KEY = "p"
+
+
+class KeyEvent(NamedTuple):
+    """key press with time.perf_counter_ns() timestamp (monotonic, only differences are meaningful)"""
+
+    time_ns: int
+    key: str
+
+
+### key readers
+class PosixKeyReader:
+    """
+    reader thread for a terminal (or any file descriptor, e.g. a pipe) that puts a KeyEvent for every key into a queue
+
+    The thread blocks in select (no polling while idle) and takes the timestamp directly after select returns, before
+    the bytes are read and decoded. Keys that arrive in the same read share the timestamp.
+    """
+
+    def __init__(self, events: queue.Queue, fd: Optional[int] = None):
+        self.events = events
+        self.fd = sys.stdin.fileno() if fd is None else fd
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="key-reader", daemon=True)
+        self._terminal_attributes = None
+
+    def start(self):
+        if os.isatty(self.fd):
+            import termios
+            import tty
+
+            # keys without enter and without echo, restored in stop
+            self._terminal_attributes = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        self._thread.start()
+
+    def stop(self):
+        # wakes the select of the reader thread
+        os.write(self._wake_w, b"x")
+        self._thread.join()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        if self._terminal_attributes is not None:
+            import termios
+
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._terminal_attributes)
+
+    def _run(self):
+        import select
+
+        while True:
+            readable, _, _ = select.select([self.fd, self._wake_r], [], [])
+            time_ns = time.perf_counter_ns()
+            if self._wake_r in readable:
+                return
+            data = os.read(self.fd, 64)
+            if not data:
+                # end of file (e.g. closed pipe)
+                return
+            for char in data.decode(errors="ignore"):
+                self.events.put(KeyEvent(time_ns, LAP_KEY if char == " " else char))
+
+    def __enter__(self) -> "PosixKeyReader":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class WindowsKeyReader:
+    """
+    keyboard hook that puts a KeyEvent for every key press into a queue (timestamp in the hook callback, a held key
+    is only counted once until it is released)
+    """
+
+    def __init__(self, events: queue.Queue):
+        self.events = events
+        self._pressed: set = set()
+        self._hook = None
+
+    def start(self):
+        import keyboard
+
+        self._hook = keyboard.hook(self._callback)
+
+    def stop(self):
+        import keyboard
+
+        keyboard.unhook(self._hook)
+
+    def _callback(self, event):
+        time_ns = time.perf_counter_ns()
+        if event.event_type == "down":
+            if event.name not in self._pressed:
+                self._pressed.add(event.name)
+                self.events.put(KeyEvent(time_ns, event.name))
+        else:
+            self._pressed.discard(event.name)
+
+    def __enter__(self) -> "WindowsKeyReader":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def key_reader(system: str, events: queue.Queue):
+    """key reader of the operating system ('MacOS' for every system with termios)"""
+    if system == "Windows":
+        return WindowsKeyReader(events)
+    elif system == "MacOS":
+        return PosixKeyReader(events)
+    raise ValueError(f"wrong input ('{system}') for variable system -> needs to be 'Windows' or 'MacOS'")
+
+
+def queue_events(events: queue.Queue) -> Iterator[KeyEvent]:
+    """events of the queue (blocks until the next event, no busy waiting)"""
+    while True:
+        yield events.get()
+
+
+### lap functions
+def laps_from_events(
+    events: Iterable[KeyEvent],
+    log: Optional[list] = None,
+    on_lap: Optional[Callable[[float], None]] = None,
+) -> list[float]:
+    """
+    lap times in s of key events ('space' starts the time and takes a lap, 'p' pauses, 'a' stops)
+
+    @params:
+        log: if not None, every used event is appended (event log that can be replayed with this function)
+        on_lap: if not None, called with every new lap time (e.g. for live statistics)
+    """
+    times: list[float] = []
+    start_ns: Optional[int] = None  # None before the first "space" press and after a pause
+
+    for event in events:
+        if log is not None:
+            log.append(event)
+        if event.key == LAP_KEY:
+            if start_ns is None:
+                logger.info("Time started...")
+            else:
+                # integer nanoseconds until here, so the lap has the full timer resolution
+                times.append((event.time_ns - start_ns) / 1e9)
+                logger.info(f"Round: {len(times)}")
+                if on_lap is not None:
+                    on_lap(times[-1])
+            start_ns = event.time_ns
+        elif event.key == STOP_KEY:
+            logger.info("... finished \n")
+            break
+        elif event.key == PAUSE_KEY:
+            logger.info("paused")
+            start_ns = None
+
+    return times
+
+
+def record_laps(system: str, log: Optional[list] = None, on_lap: Optional[Callable[[float], None]] = None) -> list[float]:
+    """lap times in s from the keyboard (see laps_from_events)"""
+    events: queue.Queue = queue.Queue()
+    with key_reader(system, events):
+        logger.info("now ready for key board input \n")
+        return laps_from_events(queue_events(events), log, on_lap)
+
+
+### event log
+def save_event_log(path: str, events: list[KeyEvent]):
+    """csv file with the columns time_ns and key"""
+    pd.DataFrame(events, columns=list(KeyEvent._fields)).to_csv(path, index=False)
+
+
+def load_event_log(path: str) -> list[KeyEvent]:
+    df = pd.read_csv(path, dtype={"time_ns": "int64", "key": str}, keep_default_na=False)
+    return [KeyEvent(int(time_ns), key) for time_ns, key in zip(df.time_ns, df.key)]
+
+
+### benchmark
+def scripted_input(fd: int, keys: list[str], interval_ns: int, write_times: list):
+    """stand-in for a person at the keyboard: writes the keys to fd every interval_ns and saves the write times"""
+    start_ns = time.perf_counter_ns()
+    for idx, key in enumerate(keys):
+        remaining_ns = start_ns + idx * interval_ns - time.perf_counter_ns()
+        if remaining_ns > 0:
+            time.sleep(remaining_ns / 1e9)
+        write_times.append(time.perf_counter_ns())
+        os.write(fd, b" " if key == LAP_KEY else key.encode())
+
+
+@gin.configurable
+def timing_benchmark(n_laps: int = 100, lap_time: float = 0.05, results_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    timestamp jitter of the key reader with a scripted input in a pipe (same reader thread as for the terminal)
+
+    @params:
+        n_laps: number of scripted laps
+        lap_time: time between two scripted keys in s
+        results_path: if not None, csv file with the write time, read time and latency of every key
+
+    @output:
+        latency (read timestamp - write timestamp), lap error (measured lap - scripted lap) and CPU usage in the log
+    """
+    if os.name == "nt":
+        raise ValueError("the benchmark needs select on pipes -> run it on Linux or MacOS")
+
+    keys = [LAP_KEY] * (n_laps + 1) + [STOP_KEY]
+    read_fd, write_fd = os.pipe()
+    write_times: list = []
+    log: list = []
+    events: queue.Queue = queue.Queue()
+    writer = threading.Thread(target=scripted_input, args=(write_fd, keys, int(lap_time * 1e9), write_times))
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with PosixKeyReader(events, read_fd):
+        writer.start()
+        laps = laps_from_events(queue_events(events), log)
+        writer.join()
+    cpu_time, wall_time = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    os.close(read_fd)
+    os.close(write_fd)
+
+    write_ns = np.array(write_times, dtype=np.int64)
+    read_ns = np.array([event.time_ns for event in log], dtype=np.int64)
+    latency_us = (read_ns - write_ns) / 1e3
+    lap_error_us = np.asarray(laps) * 1e6 - np.diff(write_ns[: n_laps + 1]) / 1e3
+
+    logger.info(f"latency: mean {latency_us.mean():.1f} µs, std {latency_us.std():.1f} µs, max {latency_us.max():.1f} µs")
+    logger.info(f"lap error: std {lap_error_us.std():.1f} µs, max |error| {np.abs(lap_error_us).max():.1f} µs")
+    logger.info(f"CPU usage: {cpu_time:.3f} s CPU time in {wall_time:.3f} s ({100 * cpu_time / wall_time:.1f} %)")
+
+    df_results = pd.DataFrame({"key": [event.key for event in log], "write_ns": write_ns, "read_ns": read_ns, "latency_us": latency_us})
+    if results_path is not None:
+        df_results.to_csv(results_path, index=False)
+        logger.info("benchmark results saved")
+    return df_results
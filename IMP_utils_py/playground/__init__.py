@@ -1 +1,10 @@
-from .grade_calculator import GradeCalculator
+import importlib
+
+__all__ = ["GradeCalculator", "grade_cohort"]
+
+
+def __getattr__(name: str):
+    # imported lazily, because pdfplumber and tabula are slow to import
+    if name in __all__:
+        return getattr(importlib.import_module(f"{__name__}.grade_calculator"), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -1,60 +1,203 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Optional
+
 import gin
 import numpy as np
 import pandas as pd
-import pdfplumber
-import tabula
 
 from IMP_utils_py.config.logging import setup_logger
+from IMP_utils_py.physics.data_cache import file_hash
 
 ### logging setup
 logger = setup_logger()
 
+TABLE_ENGINES = ("auto", "pdfplumber", "tabula")
+
+
+### pdf extraction functions
+def not_within_bboxes(obj, bboxes: list) -> bool:
+    """Check if the object is in any of the table's bbox."""
+    def obj_in_bbox(_bbox):
+        """See https://github.com/jsvine/pdfplumber/blob/stable/pdfplumber/table.py#L404"""
+        v_mid = (obj["top"] + obj["bottom"]) / 2
+        h_mid = (obj["x0"] + obj["x1"]) / 2
+        x0, top, x1, bottom = _bbox
+        return (h_mid >= x0) and (h_mid < x1) and (v_mid >= top) and (v_mid < bottom)
+
+    return not any(obj_in_bbox(__bbox) for __bbox in bboxes)
+
+
+def extract_pages(file_path: str, page_numbers: list) -> list[tuple[str, list]]:
+    """
+    function to get the text without tables and the tables of pdf pages (top-level function to be usable in a process pool)
+
+    The tables of a page are only searched once (every curve and edge as explicit line) and used for both.
+
+    @return: list with tuple (text, tables) per page, every table is a list of rows with the cell texts
+    """
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(file_path) as pdf:
+        for page_number in page_numbers:
+            page = pdf.pages[page_number]
+            tables = page.find_tables(
+                table_settings={
+                    "vertical_strategy": "explicit",
+                    "horizontal_strategy": "explicit",
+                    "explicit_vertical_lines": page.curves + page.edges,
+                    "explicit_horizontal_lines": page.curves + page.edges,
+                }
+            )
+            # Get the bounding boxes of the tables on the page.
+            bboxes = [table.bbox for table in tables]
+            text = page.filter(lambda obj: not_within_bboxes(obj, bboxes)).extract_text()
+            pages.append((text, [table.extract() for table in tables]))
+            # free the parsed objects of the page
+            page.close()
+    return pages
+
+
+def extract_pdf(file_path: str, max_workers: int = 1) -> tuple[str, list]:
+    """
+    function to get the text without tables and all tables of a pdf file in one pass
+
+    @params:
+        max_workers: number of processes, every process extracts a contiguous part of the pages (1 for no process pool)
+
+    @return: tuple (text of all pages, list of tables)
+    """
+    import pdfplumber
+
+    with pdfplumber.open(file_path) as pdf:
+        n_pages = len(pdf.pages)
+
+    # more processes than CPU cores only add start-up time
+    max_workers = min(max_workers, n_pages, os.cpu_count() or 1)
+    if max_workers <= 1:
+        pages = extract_pages(file_path, list(range(n_pages)))
+    else:
+        chunks = [chunk.tolist() for chunk in np.array_split(np.arange(n_pages), max_workers)]
+        logger.info(f"extract {n_pages} pages with {max_workers} processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            pages = list(chain.from_iterable(executor.map(extract_pages, [file_path] * len(chunks), chunks)))
+
+    # new line between the pages, otherwise the last and first line of two pages are merged
+    text = "\n".join(text for text, _ in pages)
+    tables = [table for _, page_tables in pages for table in page_tables]
+    return text, tables
+
+
+def parse_module(cell) -> Optional[tuple[str, float, int]]:
+    """function to get (name, grade, credit) of a module header cell with 'Modulnote' and 'Modulpunkte' (None for other cells)"""
+    if not isinstance(cell, str) or not ("Modulpunkte" in cell and "Modulnote" in cell):
+        return None
+    # line breaks in the cells
+    cell = " ".join(cell.split())
+    name = cell.split(" Modulnote")[0]
+    grade = float(cell.split("Modulnote: ")[1].split(" ")[0].replace(",", "."))
+    credit = int(cell.split("Modulpunkte: ")[1].split(" ")[0])
+    return name, grade, credit
+
+
+### module selection rules
+RULE_TYPES = ("alternatives", "best_of", "exclude")
+
+# Studienordnung IMP: only the better result of LinA I/II and Ana I/II
+IMP_SELECTION_RULES = (
+    {"type": "alternatives", "modules": ["Lineare Algebra und Analytische Geometrie I", "Lineare Algebra und Analytische Geometrie II"]},
+    {"type": "alternatives", "modules": ["Analysis I", "Analysis II"]},
+)
+
+
+@gin.configurable
+def selection_rules(rules: Optional[list] = None) -> list:
+    """
+    rules for the modules that are not used for the calculation (applied for IMP)
+
+    @params:
+        rules: list of dicts with the keys
+            - 'type': 'alternatives' (only the best grade of the modules is used) / 'best_of' (only the 'keep' best
+            grades of the modules are used) / 'exclude' (the modules are never used)
+            - 'modules': list of module names
+            - 'keep': number of used modules (only for 'best_of')
+        None for the rules of the Studienordnung IMP (IMP_SELECTION_RULES)
+    """
+    return list(IMP_SELECTION_RULES if rules is None else rules)
+
+
+def rules_frame(rules: list) -> pd.DataFrame:
+    """ one row per (rule, module name) with the columns rule, type, keep, name, order """
+    rows = []
+    for rule_idx, rule in enumerate(rules):
+        rule_type = rule.get("type")
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"rule type '{rule_type}' is not supported -> choose from {list(RULE_TYPES)}")
+        keep = int(rule.get("keep", 1)) if rule_type == "best_of" else 1
+        if keep < 1:
+            raise ValueError(f"'best_of' rule keeps {keep} modules -> choose keep >= 1")
+        rows += [
+            {"rule": rule_idx, "type": rule_type, "keep": keep, "name": name, "order": order}
+            for order, name in enumerate(rule.get("modules", []))
+        ]
+    return pd.DataFrame(rows, columns=["rule", "type", "keep", "name", "order"])
+
+
+def select_modules(df_modules: pd.DataFrame, rules: list) -> list:
+    """
+    idx of the modules that are not used for the calculation
+
+    The modules are matched to the rules with one merge on the name and every group is ranked by grade, so the
+    evaluation does not loop over the modules. For equal grades the module listed first in the rule is dropped.
+    """
+    df_rules = rules_frame(rules)
+    matched = df_modules[["name", "grade"]].rename_axis("module_idx").reset_index().merge(df_rules, on="name")
+
+    excluded = matched.type == "exclude"
+    ranked = matched[~excluded].sort_values(["rule", "grade", "order"], ascending=[True, False, True], kind="stable")
+    n_present = ranked.groupby("rule").rule.transform("size")
+    rank = ranked.groupby("rule").cumcount()
+    dropped = ranked.module_idx[rank < n_present - ranked.keep]
+
+    return sorted(int(idx) for idx in set(matched.module_idx[excluded]) | set(dropped))
+
+
 @gin.configurable
 class GradeCalculator:
 
-    def __init__(self, file_path: str):
-        self.df_exams = self.extract_exams(file_path)
-        self.df_modules = self.extract_modules(file_path)
-    
-    def get_text_no_tables_pdf(self, file_path: str) -> str:
-        """ function to get text of pdf file with skipping tables"""
-
-        def not_within_bboxes(obj):
-            """Check if the object is in any of the table's bbox."""
-            def obj_in_bbox(_bbox):
-                """See https://github.com/jsvine/pdfplumber/blob/stable/pdfplumber/table.py#L404"""
-                v_mid = (obj["top"] + obj["bottom"]) / 2
-                h_mid = (obj["x0"] + obj["x1"]) / 2
-                x0, top, x1, bottom = _bbox
-                return (h_mid >= x0) and (h_mid < x1) and (v_mid >= top) and (v_mid < bottom)
-
-            return not any(obj_in_bbox(__bbox) for __bbox in bboxes)
-        text = ""
+    def __init__(self, file_path: str, table_engine: str = "auto", max_workers: int = 1):
+        """
+        @params:
+            file_path: pdf file of the Leistungsspiegel
+            table_engine: 'pdfplumber' (module tables from the same pass as the text) / 'tabula' (module tables with
+            tabula, needs Java) / 'auto' (pdfplumber and tabula only if pdfplumber finds no modules)
+            max_workers: number of processes for the pdf extraction (1 for no process pool)
+        """
+        if table_engine not in TABLE_ENGINES:
+            raise ValueError(f"table_engine '{table_engine}' is not supported -> choose from {list(TABLE_ENGINES)}")
+
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    # Get the bounding boxes of the tables on the page.
-                    bboxes = [
-                        table.bbox
-                        for table in page.find_tables(
-                            table_settings={
-                                "vertical_strategy": "explicit",
-                                "horizontal_strategy": "explicit",
-                                "explicit_vertical_lines": page.curves + page.edges,
-                                "explicit_horizontal_lines": page.curves + page.edges,
-                            }
-                        )
-                    ]
-
-                    text += page.filter(not_within_bboxes).extract_text()
-            
-            return text
+            text, tables = extract_pdf(file_path, max_workers)
         except ValueError as e:
-            return ""
-        
-    def extract_exams(self, file_path: str) -> pd.DataFrame:
-        """ extract all passed exams (marked with 'MP' and 'BE' in Leistungsspiegel) """
-        txt = self.get_text_no_tables_pdf(file_path)
+            logger.warning(f"pdf could not be read with pdfplumber ({e})")
+            text, tables = "", []
+        self.df_exams = self.extract_exams(text)
+        self.df_modules = self.extract_modules(file_path, tables, table_engine)
+
+    @classmethod
+    def from_frames(cls, df_exams: pd.DataFrame, df_modules: pd.DataFrame) -> "GradeCalculator":
+        """ grade calculator with already extracted exams and modules (e.g. from the parse cache) """
+        grade_calculator = cls.__new__(cls)
+        grade_calculator.df_exams = df_exams
+        grade_calculator.df_modules = df_modules
+        return grade_calculator
+
+    def extract_exams(self, txt: str) -> pd.DataFrame:
+        """ extract all passed exams (marked with 'MP' and 'BE' in Leistungsspiegel) from the text without tables """
         if txt == "":
             logger.warning("no exams detected")
             return pd.DataFrame({"ID": [], "name": [], "grade": []})
@@ -76,23 +219,34 @@ class GradeCalculator:
                     subject_names.append(" ".join(subject_name.split(" ")[1:]))
 
         return pd.DataFrame({"ID": subject_numbers, "name": subject_names, "grade": grades})
-    
-    def extract_modules(self, file_path: str) -> pd.DataFrame:
-        """ extract all module header with 'Modulnote' and 'Modulpunkte' """
+
+    def extract_modules(self, file_path: str, tables: list, table_engine: str = "auto") -> pd.DataFrame:
+        """ extract all module header with 'Modulnote' and 'Modulpunkte' from the pdfplumber tables (or with tabula) """
+        modules = []
+        if table_engine in ("auto", "pdfplumber"):
+            modules = [module for table in tables for row in table for module in map(parse_module, row) if module is not None]
+            if not modules and table_engine == "auto":
+                logger.info("no modules found in the pdfplumber tables -> use tabula")
+        if table_engine == "tabula" or (table_engine == "auto" and not modules):
+            modules = self.extract_modules_tabula(file_path)
+
+        names, grades, credits = (list(values) for values in zip(*modules)) if modules else ([], [], [])
+        return pd.DataFrame({"name": names, "grade": grades, "credit": credits})
+
+    def extract_modules_tabula(self, file_path: str) -> list[tuple[str, float, int]]:
+        """ extract module header with tabula (starts a Java VM) """
+        import tabula
+
         tables = tabula.read_pdf(file_path, pages="all", silent=True)
-        names = []
-        grades = []
-        credits = []
+        modules = []
         for table in tables:
             name_col = list(table[table.columns[1:2][0]])
             for name in name_col:
-                if "Modulpunkte" in name and "Modulnote" in name:
-                    names.append(str(name.split(" Modulnote")[0]))
-                    grades.append(float(name.split("Modulnote: ")[1].split(" ")[0].replace(",", ".")))
-                    credits.append(int(name.split("Modulpunkte: ")[1].split(" ")[0]))
-        
-        return pd.DataFrame({"name": names, "grade": grades, "credit": credits})
-    
+                module = parse_module(name)
+                if module is not None:
+                    modules.append(module)
+        return modules
+
     def modules_exams_diff(self, drop_idx: list):
         logger.info("calculation infos:")
         print()
@@ -103,14 +257,14 @@ class GradeCalculator:
             print("\n\n")
             print("not using the following modules because of Studienordnung IMP:")
             print()
-            print(self.df_modules.iloc[drop_idx].to_markdown(index=False))
+            print(self.df_modules.loc[drop_idx].to_markdown(index=False))
         print("\n\n")
         print("not using the following exams because of missing credits:")
         print()
 
-        not_idx = [idx for idx in range(len(self.df_exams)) if not self.df_exams.name.iloc[idx] in list(self.df_modules.name)]
-        if not_idx:
-            print(self.df_exams.iloc[not_idx].to_markdown(index=False))
+        df_not_used = self.get_exams_without_module()
+        if len(df_not_used):
+            print(df_not_used.to_markdown(index=False))
         else:
             print("--- no such exam detected ---")
         print()
@@ -123,44 +277,184 @@ class GradeCalculator:
 
         @return: list with idx of result that will not be used for calculation
         """
-        LinA = [10,10]
-        LinA_idx = [None, None]
-        Ana = [10,10]
-        Ana_idx = [None, None]
-        for idx in range(len(self.df_modules)):
-            if self.df_modules.name.iloc[idx] == "Lineare Algebra und Analytische Geometrie I":
-                LinA[0] = self.df_modules.grade.iloc[idx]
-                LinA_idx[0] = idx
-            elif self.df_modules.name.iloc[idx] == "Lineare Algebra und Analytische Geometrie II":
-                LinA[1] = self.df_modules.grade.iloc[idx]
-                LinA_idx[1] = idx
-            elif self.df_modules.name.iloc[idx] == "Analysis I":
-                Ana[0] = self.df_modules.grade.iloc[idx]
-                Ana_idx[0] = idx
-            elif self.df_modules.name.iloc[idx] == "Analysis II":
-                Ana[1] = self.df_modules.grade.iloc[idx]
-                Ana_idx[1] = idx
-
-        drop_idx = []
-        if sum(LinA) < 10:
-            drop_idx.append(LinA_idx[np.argmax(LinA)])
-        if sum(Ana) < 10:
-            drop_idx.append(Ana_idx[np.argmax(Ana)])
-        return drop_idx
-    
-    def calculate_total_grade(self, IMP: bool) -> float:
+        return select_modules(self.df_modules, IMP_SELECTION_RULES)
+
+    def get_drop_idx(self, IMP: bool, rules: Optional[list] = None) -> list:
+        """ idx of the modules that are not used for the calculation (rules: None for the gin bound selection_rules) """
+        if IMP:
+            return select_modules(self.df_modules, selection_rules() if rules is None else rules)
+        return []
+
+    def get_exams_without_module(self) -> pd.DataFrame:
+        """ exams without module (no credits) """
+        return self.df_exams[~self.df_exams.name.isin(self.df_modules.name)]
+
+    def calculate_total_grade(self, IMP: bool, show_info: bool = True, rules: Optional[list] = None) -> float:
         """ 
         calculates grade with weighted by credits average of 'Modulnote' 
 
         @param:
-            IMP: if True, only the better result of (LinA I and LinA II) and (Ana I and Ana II) will be used
+            IMP: if True, the modules are selected with the selection rules (default: only the better result of
+            (LinA I and LinA II) and (Ana I and Ana II) will be used)
+            show_info: if True, the used and not used modules and exams are printed as markdown tables
+            rules: selection rules, None for the gin bound selection_rules
         """
-        drop_idx = []
-        if IMP:
-            drop_idx = self.get_better_LinA_Ana_result()
-        self.modules_exams_diff(drop_idx)
-        total_credits = sum(self.df_modules.drop(index=drop_idx, inplace=False).credit)
-        total_product = sum([self.df_modules.grade.iloc[idx] * self.df_modules.credit.iloc[idx] for idx in range(len(self.df_modules)) if idx not in drop_idx])
+        drop_idx = self.get_drop_idx(IMP, rules)
+        if show_info:
+            self.modules_exams_diff(drop_idx)
+        df_used = self.df_modules.drop(index=drop_idx)
+        total_credits = float(df_used.credit.sum())
+        total_product = float((df_used.grade * df_used.credit).sum())
         final_grade = total_product/total_credits
         logger.info(f"final grade: {final_grade}")
         return final_grade
+
+
+### parse cache
+PARSE_CACHE_VERSION = 1
+
+
+def parse_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """None for '$XDG_CACHE_HOME/IMP_utils_py/grades' (default '~/.cache/IMP_utils_py/grades')"""
+    if cache_dir is None:
+        cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+        cache_dir = os.path.join(cache_home, "IMP_utils_py", "grades")
+    return cache_dir
+
+
+def parse_key(file_path: str, table_engine: str) -> str:
+    """hash of the pdf content and the table engine"""
+    return f"v{PARSE_CACHE_VERSION}_{table_engine}_{file_hash(file_path)}"
+
+
+def load_parse(key: str, cache_dir: str) -> Optional[tuple[pd.DataFrame, pd.DataFrame]]:
+    """cached (df_exams, df_modules) of a pdf (None if not cached)"""
+    try:
+        with np.load(os.path.join(cache_dir, f"{key}.npz"), allow_pickle=False) as npz:
+            df_exams = pd.DataFrame({"ID": npz["exam_ID"].astype(object), "name": npz["exam_name"].astype(object), "grade": npz["exam_grade"]})
+            df_modules = pd.DataFrame({"name": npz["module_name"].astype(object), "grade": npz["module_grade"], "credit": npz["module_credit"]})
+    except (OSError, ValueError, KeyError):
+        return None
+    return df_exams, df_modules
+
+
+def save_parse(key: str, cache_dir: str, df_exams: pd.DataFrame, df_modules: pd.DataFrame):
+    """save extracted exams and modules of a pdf"""
+    try:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        # write to temporary file first, because several processes can write at the same time
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f:
+            np.savez(
+                f,
+                exam_ID=df_exams.ID.to_numpy(dtype=str),
+                exam_name=df_exams.name.to_numpy(dtype=str),
+                exam_grade=df_exams.grade.to_numpy(dtype=float),
+                module_name=df_modules.name.to_numpy(dtype=str),
+                module_grade=df_modules.grade.to_numpy(dtype=float),
+                module_credit=df_modules.credit.to_numpy(dtype=int),
+            )
+        os.replace(f.name, os.path.join(cache_dir, f"{key}.npz"))
+    except OSError as e:
+        logger.warning(f"could not write parse cache ({e})")
+
+
+### cohort functions
+def grade_file(file_path: str, IMP: bool, table_engine: str, use_cache: bool, cache_dir: str, rules: list) -> dict:
+    """
+    final grade of one Leistungsspiegel (top-level function to be usable in a process pool)
+
+    @params:
+        rules: selection rules, passed explicitly because the workers of a spawned process pool have no gin config
+
+    @return: row of the results table
+    """
+    row = {"file": os.path.basename(file_path)}
+    try:
+        key = parse_key(file_path, table_engine)
+        frames = load_parse(key, cache_dir) if use_cache else None
+        row["cached"] = frames is not None
+        if frames is None:
+            grade_calculator = GradeCalculator(file_path, table_engine=table_engine, max_workers=1)
+            if use_cache:
+                save_parse(key, cache_dir, grade_calculator.df_exams, grade_calculator.df_modules)
+        else:
+            grade_calculator = GradeCalculator.from_frames(*frames)
+
+        drop_idx = grade_calculator.get_drop_idx(IMP, rules)
+        df_modules = grade_calculator.df_modules
+        row["final_grade"] = grade_calculator.calculate_total_grade(IMP, show_info=False, rules=rules)
+        row["total_credits"] = int(df_modules.drop(index=drop_idx).credit.sum())
+        row["n_modules"] = len(df_modules) - len(drop_idx)
+        row["dropped_modules"] = "; ".join(df_modules.name.loc[drop_idx])
+        row["n_exams"] = len(grade_calculator.df_exams)
+        row["exams_without_module"] = "; ".join(grade_calculator.get_exams_without_module().name)
+    except Exception as e:
+        # first line without the gin call information
+        message = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+        logger.warning(f"grade of '{file_path}' could not be calculated ({message})")
+        row["error"] = message
+    return row
+
+
+@gin.configurable
+def grade_cohort(
+    directory: str,
+    results_path: str,
+    IMP: bool = True,
+    table_engine: str = "auto",
+    max_workers: int = 1,
+    use_cache: bool = True,
+    cache_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    final grades of all Leistungsspiegel pdf files in a directory
+
+    @params:
+        directory: directory with the pdf files
+        results_path: location for the .csv or .parquet file with one row per pdf file
+        IMP: if True, the modules are selected with the selection rules (see selection_rules)
+        table_engine: see GradeCalculator
+        max_workers: number of processes (one pdf file per process at a time, 1 for no process pool)
+        use_cache: if True, the extracted exams and modules are cached per file content, so only new or changed pdf
+        files are read again
+        cache_dir: None for '$XDG_CACHE_HOME/IMP_utils_py/grades'
+
+    @output:
+        results table saved in results_path (and returned)
+    """
+    if not results_path.endswith((".csv", ".parquet")):
+        raise ValueError(f"results_path '{results_path}' file format is not supported -> use .csv or .parquet")
+    if table_engine not in TABLE_ENGINES:
+        raise ValueError(f"table_engine '{table_engine}' is not supported -> choose from {list(TABLE_ENGINES)}")
+
+    file_paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".pdf")
+    )
+    if not file_paths:
+        raise ValueError(f"no pdf files found in '{directory}'")
+    cache_dir = parse_cache_dir(cache_dir)
+    # resolved in this process (gin config), invalid rules fail before any pdf is read
+    rules = selection_rules()
+    rules_frame(rules)
+
+    # more processes than CPU cores only add start-up time
+    max_workers = min(max_workers, len(file_paths), os.cpu_count() or 1)
+    arguments = [(path, IMP, table_engine, use_cache, cache_dir, rules) for path in file_paths]
+    if max_workers <= 1:
+        rows = [grade_file(*args) for args in arguments]
+    else:
+        logger.info(f"read {len(file_paths)} pdf files with {max_workers} processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(executor.map(grade_file, *zip(*arguments)))
+
+    results = pd.DataFrame(rows)
+    if results_path.endswith(".parquet"):
+        results.to_parquet(results_path, index=False)
+    else:
+        results.to_csv(results_path, index=False)
+
+    n_cached = int(results["cached"].eq(True).sum()) if "cached" in results else 0
+    n_failed = int(results["error"].notna().sum()) if "error" in results else 0
+    logger.info(f"{len(results) - n_failed} of {len(results)} grades calculated ({n_cached} from the parse cache)")
+    return results
+
@@ -0,0 +1,72 @@
+import statistics
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import gin
+import pandas as pd
+
+from IMP_utils_py.config.logging import setup_logger
+
+### logging setup
+logger = setup_logger()
+
+# imports of cli.py for one mode: the mode module only (lazy) or all mode modules (eager, like before MODE_MODULES)
+IMPORT_SCRIPT = """
+import importlib, sys
+from IMP_utils_py.cli import MODE_MODULES
+modules = set(MODE_MODULES.values()) if sys.argv[2] == "eager" else {MODE_MODULES[sys.argv[1]]}
+for module in sorted(modules - {None}):
+    importlib.import_module(module)
+"""
+
+
+def import_time(mode: str, imports: str) -> float:
+    """wall time in s of a new python process that imports the cli and the modules of the mode"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", IMPORT_SCRIPT, mode, imports], check=True)
+    return time.perf_counter() - start
+
+
+@gin.configurable
+def startup_benchmark(modes: Optional[list] = None, repeats: int = 5, results_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    startup time of the cli with the imports of the selected mode only (lazy) and with the imports of all modes (eager)
+
+    @params:
+        modes: cli modes to measure (default: every mode in cli.MODE_MODULES)
+        repeats: number of new python processes per mode and import variant (the median is used)
+        results_path: if not None, csv file with the median startup times
+
+    @output:
+        median startup time per mode for lazy and eager imports in the log
+    """
+    if repeats < 1:
+        raise ValueError(f"repeats ({repeats}) has to be a positive integer -> choose repeats >= 1")
+
+    # the cli module is __main__ if the benchmark runs from cli.py -> read the modes in a new process
+    all_modes = subprocess.run(
+        [sys.executable, "-c", "from IMP_utils_py.cli import MODE_MODULES; print(*MODE_MODULES)"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    if modes is None:
+        modes = all_modes
+    unknown = [mode for mode in modes if mode not in all_modes]
+    if unknown:
+        raise ValueError(f"unknown modes {unknown} -> choose from {all_modes}")
+
+    rows = []
+    for mode in modes:
+        lazy = statistics.median(import_time(mode, "lazy") for _ in range(repeats))
+        eager = statistics.median(import_time(mode, "eager") for _ in range(repeats))
+        logger.info(f"{mode}: {lazy:.3f} s (lazy imports), {eager:.3f} s (eager imports)")
+        rows.append({"mode": mode, "lazy_s": lazy, "eager_s": eager})
+
+    df_results = pd.DataFrame(rows)
+    if results_path is not None:
+        df_results.to_csv(results_path, index=False)
+        logger.info("benchmark results saved")
+    return df_results
@@ -0,0 +1,60 @@
+"""
+plots per second and peak RSS of consecutive errorbar plots with the recycled figures of rendering.render_figure
+
+python benchmarks/rendering_benchmark.py --plots 500 --pool-sizes 2 0
+"""
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def peak_rss_mib() -> float:
+    """peak resident set size of this process in MiB (ru_maxrss is in KiB on Linux and in bytes on MacOS)"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_plots(n_plots: int, pool_size: int):
+    """draw n_plots linear errorbar plots in this process and print plots/s and peak RSS"""
+    import gin
+
+    from IMP_utils_py.physics.plotting import errorbar_plot
+
+    gin.parse_config(f"figure_pool_size.size = {pool_size}")
+    with tempfile.TemporaryDirectory() as directory:
+        x = np.linspace(1, 10, 15)
+        data_path = str(Path(directory) / "data.csv")
+        pd.DataFrame({"x": x, "y": 2 * x + 1 + np.sin(x), "dy": 0.3}).to_csv(data_path)
+        graphic_path = str(Path(directory) / "plot.png")
+
+        start = time.perf_counter()
+        for _ in range(n_plots):
+            errorbar_plot(data_path, graphic_path, "x", "", "y", "data", "dy", "benchmark", "x", "y", "auto", "auto", "auto", "linear", True, False, "linear")
+        duration = time.perf_counter() - start
+    print(f"figure_pool_size {pool_size}: {n_plots / duration:.1f} plots/s, peak RSS {peak_rss_mib():.0f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--plots", type=int, default=500, help="number of consecutive plots")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[2, 0], help="figure_pool_size.size values to compare")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_plots(args.plots, args.pool_sizes[0])
+        return
+    # one process per pool size, because the peak RSS is the maximum over the whole process
+    for pool_size in args.pool_sizes:
+        subprocess.run([sys.executable, __file__, "--worker", "--plots", str(args.plots), "--pool-sizes", str(pool_size)], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+micro-benchmark of eval_df (vectorized column statistics) against the former per-column python loop
+
+python benchmarks/statistics_benchmark.py --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from IMP_utils_py.physics.time_stop_script import eval_df
+
+
+def loop_std(data: list, mean: float) -> float:
+    """sigma = sqrt(sum(x_i - mean)^2/(N-1)) with a python loop (former time_stop_script.std)"""
+    total = 0
+    for value in data:
+        total += np.power(value - mean, 2)
+    return np.sqrt(total / (len(data) - 1))
+
+
+def loop_eval_df(df: pd.DataFrame) -> pd.DataFrame:
+    """former eval_df: one python loop per column"""
+    rows = []
+    for column in df.columns:
+        data = list(df[column].dropna())
+        if not data:
+            rows.append((0, np.nan, np.nan, np.nan))
+        elif len(data) == 1:
+            rows.append((1, data[0], 0, 0))
+        else:
+            mean = np.mean(data)
+            std = loop_std(data, mean)
+            rows.append((len(data), mean, std, std / np.sqrt(len(data))))
+    return pd.DataFrame(rows, columns=["Messwerte Anzahl", "Mittelwert", "Standardabweichung", "Vertrauensbereich"])
+
+
+def best_time(function, *args, repeats: int) -> tuple[float, object]:
+    """minimum wall time in s of repeats calls and the result of the last call"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="number of rows of the raw-data frame")
+    parser.add_argument("--repeats", type=int, default=3, help="number of runs (the fastest is reported)")
+    args = parser.parse_args()
+
+    # raw-data like frame: laps, half periods (NaN padded), and a column with one value
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"laps": rng.normal(2.0, 0.05, args.rows), "half periods": rng.normal(1.0, 0.03, args.rows), "single": np.nan})
+    df.loc[args.rows // 2 :, "half periods"] = np.nan
+    df.loc[0, "single"] = 1.5
+
+    loop_time, expected = best_time(loop_eval_df, df, repeats=args.repeats)
+    vector_time, result = best_time(eval_df, df, repeats=args.repeats)
+    np.testing.assert_allclose(result[expected.columns].to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-10)
+    print(f"{args.rows} x {df.shape[1]} values: loop {loop_time:.3f} s, vectorized {vector_time:.4f} s ({loop_time / vector_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
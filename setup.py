@@ -24,6 +24,7 @@ setup(
         "matplotlib",
         "scipy",
         "kafe2",
+        "sympy",  # symbolic derivatives for error propagation
         "iminuit",  # better performance with c++ library for kafe2
         "openpyxl",  # needed for pandas read_excel
         "pdfplumber",  # extract text from pdf file
@@ -32,6 +33,7 @@ setup(
     extras_require={
         "test": ["pytest", "pylint!=2.5.0", "isort", "refurb", "black"],
         "notebook": ["ipykernel"],
+        "parquet": ["pyarrow"],  # grade-calculator-cohort results as .parquet
     },
     author="Samuel Brinkmann",
     license="MIT",
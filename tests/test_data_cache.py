@@ -0,0 +1,32 @@
+import os
+from unittest import mock
+
+import pandas as pd
+
+from IMP_utils_py.physics import data_cache
+
+
+def test_touch_updates_cached_mtime(tmp_path):
+    data_path = str(tmp_path / "data.csv")
+    pd.DataFrame({"x": [1.0, 2.0, 3.0], "name": ["a", None, "c"]}).to_csv(data_path, index=False)
+    data_cache.cached_read(data_path, pd.read_csv, memory_cache_size=0)
+
+    os.utime(data_path, ns=(0, 10**18))
+    with mock.patch.object(data_cache, "file_hash", wraps=data_cache.file_hash) as file_hash:
+        first = data_cache.cached_read(data_path, pd.read_csv, memory_cache_size=0)
+        second = data_cache.cached_read(data_path, pd.read_csv, memory_cache_size=0)
+    # only the first read after the touch hashes the file
+    assert file_hash.call_count == 1
+    pd.testing.assert_frame_equal(first, pd.read_csv(data_path))
+    pd.testing.assert_frame_equal(second, first)
+
+
+def test_changed_content_is_read_again(tmp_path):
+    data_path = str(tmp_path / "data.csv")
+    pd.DataFrame({"x": [1.0, 2.0]}).to_csv(data_path, index=False)
+    data_cache.cached_read(data_path, pd.read_csv, memory_cache_size=0)
+
+    pd.DataFrame({"x": [3.0, 4.0]}).to_csv(data_path, index=False)
+    os.utime(data_path, ns=(0, 10**18))
+    df = data_cache.cached_read(data_path, pd.read_csv, memory_cache_size=0)
+    assert df["x"].tolist() == [3.0, 4.0]
@@ -0,0 +1,32 @@
+import numpy as np
+
+from IMP_utils_py.physics.decimation import bin_points, reduce_points
+
+
+def test_bin_points_errors_of_the_bin_means():
+    x = np.array([0.0, 0.1, 0.2, 0.9, 1.0])
+    y = np.array([1.0, 2.0, 3.0, 5.0, 7.0])
+    dx = np.array([0.1, 0.2, 0.2, 0.3, 0.4])
+    dy = np.array([1.0, 1.0, 2.0, 1.0, 1.0])
+    x_mean, y_mean, x_error, y_error = bin_points(x, y, dx, dy, 2)
+
+    np.testing.assert_allclose(x_mean, [0.1, 0.95])
+    np.testing.assert_allclose(x_error, [np.sqrt(0.01 + 0.04 + 0.04) / 3, np.sqrt(0.09 + 0.16) / 2])
+    np.testing.assert_allclose(y_mean, [(1 + 2 + 3 / 4) / 2.25, 6.0])
+    np.testing.assert_allclose(y_error, [1 / np.sqrt(2.25), 1 / np.sqrt(2)])
+
+
+def test_bin_points_without_errors():
+    x = np.arange(6.0)
+    y = np.array([1.0, 3.0, 2.0, 2.0, 4.0, 4.0])
+    x_mean, y_mean, x_error, y_error = bin_points(x, y, None, None, 2)
+    assert x_error is None
+    np.testing.assert_allclose(y_mean, [2.0, 10 / 3])
+    np.testing.assert_allclose(y_error, [np.std(y[:3], ddof=1) / np.sqrt(3), np.std(y[3:], ddof=1) / np.sqrt(3)])
+
+
+def test_reduce_points_bin_keeps_measured_x_errors():
+    x = np.linspace(0, 1, 1000)
+    dx = np.full_like(x, 0.01)
+    _, _, x_error, _ = reduce_points(x, x**2, dx, None, "bin", 10)
+    np.testing.assert_allclose(x_error, 0.01 / np.sqrt(100))
@@ -0,0 +1,39 @@
+import importlib
+import os
+import sys
+
+import numpy as np
+
+from IMP_utils_py.physics.fit_cache import fit_key
+
+MODULE = """
+def helper(x):
+    return {factor} * x
+
+
+def model(x, a=1.0):
+    return a * helper(x)
+"""
+
+
+def test_key_changes_with_helper_in_model_file(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    path = tmp_path / "fit_cache_test_model.py"
+    x = np.arange(3.0)
+
+    path.write_text(MODULE.format(factor=2))
+    module = importlib.import_module("fit_cache_test_model")
+    key = fit_key(x, x, None, None, "plugin", module.model, None)
+    assert fit_key(x, x, None, None, "plugin", module.model, None) == key
+
+    path.write_text(MODULE.format(factor=3))
+    # new mtime, also on file systems with a coarse timestamp resolution
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+    module = importlib.reload(module)
+    sys.modules.pop("fit_cache_test_model")
+    assert fit_key(x, x, None, None, "plugin", module.model, None) != key
+
+
+def test_key_without_source_file():
+    x = np.arange(3.0)
+    assert fit_key(x, x, None, None, "builtin", abs, None) == fit_key(x, x, None, None, "builtin", abs, None)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from IMP_utils_py.physics.fitting import closed_form_fit, fit_model, kafe2_fit
+
+pytest.importorskip("kafe2")
+
+MODELS = {
+    "linear": lambda x, a=1.0, b=0.5: a * x + b,
+    "linear_zero": lambda x, a=1.0: a * x,
+    "constant": lambda x, a=1.0: a + 0 * x,
+}
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    x = np.linspace(1, 10, 12)
+    dx = np.full_like(x, 0.2)
+    dy = rng.uniform(0.3, 0.6, len(x))
+    y = 2.5 * (x + rng.normal(0, dx)) + 1.0 + rng.normal(0, dy)
+    return x, y, dx, dy
+
+
+@pytest.mark.parametrize("model_type", MODELS)
+def test_closed_form_matches_kafe2_without_dx(data, model_type):
+    x, y, _, dy = data
+    closed_form = closed_form_fit(x, y, None, dy, model_type)
+    kafe2 = kafe2_fit(x, y, None, dy, MODELS[model_type])
+    np.testing.assert_allclose(closed_form.parameter_values, kafe2.parameter_values, rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(closed_form.parameter_errors, kafe2.parameter_errors, rtol=1e-4)
+    assert closed_form.chi2 == pytest.approx(kafe2.chi2, rel=1e-4)
+    assert closed_form.ndf == kafe2.ndf
+
+
+@pytest.mark.parametrize("model_type", ["linear", "linear_zero"])
+def test_closed_form_with_dx_is_bounded(data, model_type):
+    x, y, dx, dy = data
+    closed_form = closed_form_fit(x, y, dx, dy, model_type)
+    kafe2 = kafe2_fit(x, y, dx, dy, MODELS[model_type])
+    # the effective-variance fit has no log-determinant term -> differences within one parameter error
+    assert np.all(np.abs(closed_form.parameter_values - kafe2.parameter_values) < kafe2.parameter_errors)
+    np.testing.assert_allclose(closed_form.parameter_errors, kafe2.parameter_errors, rtol=0.2)
+
+
+def test_fit_model_auto_uses_kafe2_with_dx(data):
+    x, y, dx, dy = data
+    auto = fit_model(x, y, dx, dy, "linear", MODELS["linear"], use_cache=False)
+    kafe2 = kafe2_fit(x, y, dx, dy, MODELS["linear"])
+    np.testing.assert_allclose(auto.parameter_values, kafe2.parameter_values)
+
+
+def test_unknown_closed_form_model():
+    with pytest.raises(ValueError, match="no closed-form solution"):
+        closed_form_fit([1, 2], [1, 2], model_type="O8_bessel")
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from IMP_utils_py.physics.error_propagation import propagate_errors
+from IMP_utils_py.physics.measurement import (read_measurement,
+                                              write_measurement_chunks)
+
+
+def test_csv_chunks_round_trip(tmp_path):
+    df = pd.DataFrame({"l": np.arange(10.0), "u_l": 0.1})
+    df.to_csv(tmp_path / "data.csv", index=False)
+    path = str(tmp_path / "data.imp")
+    header = write_measurement_chunks(pd.read_csv(tmp_path / "data.csv", chunksize=3), path, {"l": "u_l"})
+    assert header["n_rows"] == 10
+    assert not header["index"]["stored"]
+    pd.testing.assert_frame_equal(read_measurement(path), df)
+
+
+@pytest.mark.parametrize(
+    "second_chunk, message",
+    [
+        (pd.DataFrame({"l": [1.0], "T": [2.0]}), "columns"),
+        (pd.DataFrame({"l": ["a"], "u_l": [0.1]}), "not numeric"),
+        (pd.DataFrame({"l": [1.0], "u_l": [0.1]}, index=[7.5]), "index"),
+    ],
+)
+def test_chunks_have_to_match_the_first_chunk(tmp_path, second_chunk, message):
+    first_chunk = pd.DataFrame({"l": [0.0, 1.0], "u_l": [0.1, 0.1]})
+    with pytest.raises(ValueError, match=message):
+        write_measurement_chunks([first_chunk, second_chunk], str(tmp_path / "data.imp"))
+    assert not (tmp_path / "data.imp").exists()
+
+
+def test_stored_index_needs_numeric_chunks(tmp_path):
+    first_chunk = pd.DataFrame({"l": [0.0, 1.0]}, index=pd.Index([0.5, 1.5], name="t"))
+    second_chunk = pd.DataFrame({"l": [2.0]}, index=pd.Index(["x"], name="t"))
+    with pytest.raises(ValueError, match="index of chunk 1 is not numeric"):
+        write_measurement_chunks([first_chunk, second_chunk], str(tmp_path / "data.imp"))
+
+
+def test_propagate_errors_with_measurement_errors_only(tmp_path):
+    path = str(tmp_path / "data.imp")
+    write_measurement_chunks([pd.DataFrame({"l": [1.0, 2.0], "u_l": [0.1, 0.2]})], path, {"l": "u_l"})
+    results = propagate_errors(path, str(tmp_path / "results.csv"), {"A": "2 * l"})
+    np.testing.assert_allclose(results["A_error"], [0.2, 0.4])
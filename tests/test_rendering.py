@@ -0,0 +1,77 @@
+import gin
+import pytest
+
+from IMP_utils_py.physics import rendering
+
+matplotlib = pytest.importorskip("matplotlib")
+
+
+@pytest.fixture(autouse=True)
+def empty_pool():
+    rendering.clear_figure_pool()
+    yield
+    rendering.clear_figure_pool()
+    gin.clear_config()
+
+
+def draw(fig):
+    """plot with axes, artists, legends, texts, and changed subplot parameters"""
+    ax, ax_twin = fig.subplots(1, 2)
+    ax.errorbar([1, 2, 3], [1, 4, 9], yerr=0.5, label="data")
+    ax.fill_between([1, 2, 3], [0, 3, 8], [2, 5, 10], alpha=0.3)
+    ax.imshow([[0, 1], [1, 0]], extent=(1, 2, 1, 2))
+    ax.legend()
+    ax_twin.twinx().plot([1, 2], [2, 1])
+    fig.suptitle("title")
+    fig.text(0.5, 0.5, "text")
+    fig.legend(["figure legend"])
+    fig.colorbar(ax.images[0], ax=ax)
+    fig.subplots_adjust(left=0.3, hspace=0.6)
+
+
+def test_pooled_figure_is_clean(tmp_path):
+    with rendering.render_figure(str(tmp_path / "first.png"), figsize=(8, 3)) as fig:
+        draw(fig)
+
+    reused = rendering.acquire_figure()
+    assert reused is fig
+    assert reused.axes == []
+    assert not reused.artists and not reused.lines and not reused.patches and not reused.images
+    assert not reused.texts and not reused.legends
+    assert reused.get_suptitle() == ""
+    assert tuple(reused.get_size_inches()) == tuple(matplotlib.rcParams["figure.figsize"])
+    for name in rendering.SUBPLOT_PARAMS:
+        assert getattr(reused.subplotpars, name) == matplotlib.rcParams[f"figure.subplot.{name}"]
+
+
+def test_pooled_figure_renders_like_new_figure(tmp_path):
+    def simple_plot(fig):
+        ax = fig.add_subplot()
+        ax.plot([1, 2, 3], [3, 1, 2])
+        ax.set_title("plot")
+
+    with rendering.render_figure(str(tmp_path / "new.png")) as fig:
+        simple_plot(fig)
+    with rendering.render_figure(str(tmp_path / "other.png")) as other:
+        assert other is fig
+        draw(other)
+    with rendering.render_figure(str(tmp_path / "reused.png")) as reused:
+        assert reused is fig
+        simple_plot(reused)
+    assert (tmp_path / "reused.png").read_bytes() == (tmp_path / "new.png").read_bytes()
+
+
+def test_failed_plot_releases_figure(tmp_path):
+    with pytest.raises(RuntimeError), rendering.render_figure(str(tmp_path / "plot.png")) as fig:
+        fig.add_subplot()
+        raise RuntimeError("plot failed")
+    assert rendering.acquire_figure() is fig
+    assert fig.axes == []
+    assert not (tmp_path / "plot.png").exists()
+
+
+def test_pool_size_zero_drops_figures(tmp_path):
+    gin.parse_config("figure_pool_size.size = 0")
+    with rendering.render_figure(str(tmp_path / "plot.png")) as fig:
+        fig.add_subplot()
+    assert rendering.acquire_figure() is not fig
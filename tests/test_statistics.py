@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from IMP_utils_py.physics.statistics import (QUANTILE_BINS, RunningMoments,
+                                             bin_edges, column_metrics,
+                                             streamed_quantiles,
+                                             weighted_average)
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(1)
+    values = rng.normal(5, 2, (1000, 3))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    values[:, 2] = np.nan
+    values[0, 2] = 7.0
+    return values
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, 1000])
+def test_running_moments_chunks_match_numpy(values, chunk_size):
+    moments = RunningMoments(values.shape[1])
+    for start in range(0, len(values), chunk_size):
+        moments.update(values[start : start + chunk_size])
+    count, mean, std, std_mean = moments.metrics(ddof=1)
+
+    np.testing.assert_array_equal(count, np.sum(~np.isnan(values), axis=0))
+    np.testing.assert_allclose(mean, np.nanmean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(std[:2], np.nanstd(values[:, :2], axis=0, ddof=1), rtol=1e-12)
+    np.testing.assert_allclose(moments.std(ddof=0), np.nanstd(values, axis=0), rtol=1e-12)
+    # one value -> std 0
+    assert std[2] == 0 == std_mean[2]
+
+
+def test_running_moments_merge_of_separate_parts(values):
+    first, second = RunningMoments(3), RunningMoments(3)
+    first.update(values[:300])
+    second.update(values[300:])
+    first.merge(second.count, second.mean, second.m2)
+    np.testing.assert_allclose(first.mean, np.nanmean(values, axis=0), rtol=1e-12)
+    np.testing.assert_allclose(first.std(ddof=0), np.nanstd(values, axis=0), rtol=1e-12)
+
+
+def test_column_metrics_without_values():
+    count, mean, std, std_mean = column_metrics(np.full(4, np.nan))
+    assert count[0] == 0
+    assert np.isnan(mean[0]) and np.isnan(std[0]) and np.isnan(std_mean[0])
+
+
+def test_weighted_average_2d_axis_matches_loop():
+    rng = np.random.default_rng(2)
+    y = rng.normal(3, 1, (4, 50))
+    y_error = rng.uniform(0.1, 0.5, (4, 50))
+    w_avg, dw_avg, chi2_ndf = weighted_average(y, y_error, axis=1, return_chi2_ndf=True)
+    for row in range(len(y)):
+        expected = weighted_average(y[row], y_error[row], return_chi2_ndf=True)
+        np.testing.assert_allclose([w_avg[row], dw_avg[row], chi2_ndf[row]], expected, rtol=1e-12)
+
+
+def test_weighted_average_values():
+    y = np.array([1.0, 2.0, 4.0])
+    y_error = np.array([1.0, 0.5, 2.0])
+    weights = 1 / y_error**2
+    expected = np.sum(weights * y) / np.sum(weights)
+    w_avg, dw_avg, chi2_ndf = weighted_average(y, y_error, return_chi2_ndf=True)
+    assert w_avg == pytest.approx(expected)
+    assert dw_avg == pytest.approx(1 / np.sqrt(np.sum(weights)))
+    assert chi2_ndf == pytest.approx(np.sum(weights * (y - expected) ** 2) / 2)
+
+
+def test_weighted_average_skip_nan():
+    y = np.array([1.0, np.nan, 2.0, 4.0, 3.0])
+    y_error = np.array([1.0, 0.5, 0.5, 2.0, np.nan])
+    assert np.isnan(weighted_average(y, y_error)[0])
+    np.testing.assert_allclose(weighted_average(y, y_error, skip_nan=True), weighted_average(y[[0, 2, 3]], y_error[[0, 2, 3]]))
+    # without errors: mean and population std of the values
+    np.testing.assert_allclose(weighted_average(y, None, skip_nan=True), (np.nanmean(y), np.nanstd(y)))
+    assert np.isnan(weighted_average(y, None, return_chi2_ndf=True)[2])
+
+
+def test_weighted_average_zero_error():
+    with pytest.raises(ValueError, match="found 0 in y_error"):
+        weighted_average([1.0, 2.0], [0.0, 1.0])
+
+
+def chunked(values: np.ndarray, chunk_size: int = 7000):
+    """function that returns a new iterator over the chunks of values (like a file read in chunks)"""
+    return lambda: (values[start : start + chunk_size] for start in range(0, len(values), chunk_size))
+
+
+QUANTILE_DATA = {
+    "normal": np.random.default_rng(3).normal(0, 1, 3 * QUANTILE_BINS),
+    "tight with outliers": np.r_[np.random.default_rng(4).normal(2, 1e-4, 3 * QUANTILE_BINS), 0, 60],
+    "integers": np.random.default_rng(5).integers(0, 4, 3 * QUANTILE_BINS).astype(float),
+    "adjacent floats": np.r_[np.full(QUANTILE_BINS, 1.0), np.full(QUANTILE_BINS, np.nextafter(1.0, 2)), 0, 1e300],
+    "huge range": np.r_[np.random.default_rng(6).normal(0, 1, 2 * QUANTILE_BINS), -1.7e308, 1.7e308],
+    "constant": np.full(2 * QUANTILE_BINS, 3.3),
+    "few values": np.array([2.0, 1.0, 5.0]),
+}
+
+
+@pytest.mark.parametrize("name", QUANTILE_DATA)
+@pytest.mark.parametrize("quantiles", [[0.75, 0.25], [0.0, 0.1, 0.5, 0.9, 1.0, 0.333]])
+def test_streamed_quantiles_match_numpy(name, quantiles):
+    values = QUANTILE_DATA[name]
+    result = streamed_quantiles(chunked(values), quantiles, len(values), values.min(), values.max())
+    np.testing.assert_array_equal(result, np.quantile(values, quantiles))
+
+
+@pytest.mark.parametrize("name", ["normal", "integers", "few values"])
+@pytest.mark.parametrize("rule", ["fd", "auto", "scott", "sturges", "rice", "sqrt"])
+def test_bin_edges_match_numpy(name, rule):
+    values = QUANTILE_DATA[name]
+    iqr = np.subtract(*streamed_quantiles(chunked(values), [0.75, 0.25], len(values), values.min(), values.max()))
+    edges = bin_edges(rule, len(values), values.min(), values.max(), np.std(values), iqr)
+    np.testing.assert_array_equal(edges, np.histogram_bin_edges(values, rule))
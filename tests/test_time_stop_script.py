@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from IMP_utils_py.physics.time_stop_script import (histogram_csv_chunked,
+                                                   histogram_data,
+                                                   read_raw_data)
+
+rng = np.random.default_rng(7)
+HISTOGRAM_DATA = {
+    "normal": rng.normal(1, 0.1, 30000),
+    # quartiles in one bin of a histogram over the whole range
+    "tight with outliers": np.r_[rng.normal(2, 1e-4, 20000), 0, 60],
+    "mostly equal": np.r_[np.full(20000, 1.0), rng.normal(1, 1, 30)],
+    "constant": np.full(100, 2.0),
+}
+
+
+@pytest.mark.parametrize("name", HISTOGRAM_DATA)
+@pytest.mark.parametrize("bins", ["fd", "auto", "scott", "sturges", 7])
+def test_chunked_histogram_matches_numpy(tmp_path, name, bins):
+    data_path = str(tmp_path / "raw.csv")
+    pd.DataFrame({"laps": HISTOGRAM_DATA[name]}).to_csv(data_path)
+    values = read_raw_data(data_path)["laps"].dropna().to_numpy(dtype=float)
+
+    counts, edges = histogram_csv_chunked(data_path, "laps", bins, chunk_size=4000)
+    expected_counts, expected_edges = histogram_data(values, bins)
+    np.testing.assert_array_equal(edges, expected_edges)
+    np.testing.assert_array_equal(counts, expected_counts)